@@ -19,8 +19,12 @@ extern "C" {
 #include <MPGrid.h>
 #endif
 
+#ifndef WIN32
+#define GL_GLEXT_PROTOTYPES
+#endif
 #include <GL/gl.h>
 #include <GL/glu.h>
+#include <GL/glext.h>
 
 #ifdef MP_PYTHON_LIB
 #if PY_MAJOR_VERSION >= 3
@@ -28,23 +32,83 @@ extern "C" {
 #endif
 #endif
 
+/*--------------------------------------------------
+  extension functions
+*/
+enum { MPGL_ExtBuffer, MPGL_ExtTexture, MPGL_ExtPixelBuffer, MPGL_ExtShader, MPGL_ExtInstanced };
+
+#define MPGL_EXT_FUNCS \
+	MPGL_EXT(PFNGLGENBUFFERSPROC, glGenBuffers) \
+	MPGL_EXT(PFNGLDELETEBUFFERSPROC, glDeleteBuffers) \
+	MPGL_EXT(PFNGLBINDBUFFERPROC, glBindBuffer) \
+	MPGL_EXT(PFNGLBUFFERDATAPROC, glBufferData) \
+	MPGL_EXT(PFNGLBUFFERSUBDATAPROC, glBufferSubData) \
+	MPGL_EXT(PFNGLMAPBUFFERPROC, glMapBuffer) \
+	MPGL_EXT(PFNGLUNMAPBUFFERPROC, glUnmapBuffer)
+
+#define MPGL_EXT_SHADER_FUNCS \
+	MPGL_EXT(PFNGLACTIVETEXTUREPROC, glActiveTexture) \
+	MPGL_EXT(PFNGLTEXIMAGE3DPROC, glTexImage3D) \
+	MPGL_EXT(PFNGLTEXSUBIMAGE3DPROC, glTexSubImage3D) \
+	MPGL_EXT(PFNGLCREATESHADERPROC, glCreateShader) \
+	MPGL_EXT(PFNGLDELETESHADERPROC, glDeleteShader) \
+	MPGL_EXT(PFNGLSHADERSOURCEPROC, glShaderSource) \
+	MPGL_EXT(PFNGLCOMPILESHADERPROC, glCompileShader) \
+	MPGL_EXT(PFNGLGETSHADERIVPROC, glGetShaderiv) \
+	MPGL_EXT(PFNGLCREATEPROGRAMPROC, glCreateProgram) \
+	MPGL_EXT(PFNGLDELETEPROGRAMPROC, glDeleteProgram) \
+	MPGL_EXT(PFNGLISPROGRAMPROC, glIsProgram) \
+	MPGL_EXT(PFNGLATTACHSHADERPROC, glAttachShader) \
+	MPGL_EXT(PFNGLLINKPROGRAMPROC, glLinkProgram) \
+	MPGL_EXT(PFNGLGETPROGRAMIVPROC, glGetProgramiv) \
+	MPGL_EXT(PFNGLUSEPROGRAMPROC, glUseProgram) \
+	MPGL_EXT(PFNGLGETUNIFORMLOCATIONPROC, glGetUniformLocation) \
+	MPGL_EXT(PFNGLUNIFORM1IPROC, glUniform1i) \
+	MPGL_EXT(PFNGLUNIFORM1FPROC, glUniform1f) \
+	MPGL_EXT(PFNGLUNIFORM2FPROC, glUniform2f) \
+	MPGL_EXT(PFNGLUNIFORM3FPROC, glUniform3f)
+
+#define MPGL_EXT_INSTANCED_FUNCS \
+	MPGL_EXT(PFNGLGETATTRIBLOCATIONPROC, glGetAttribLocation) \
+	MPGL_EXT(PFNGLENABLEVERTEXATTRIBARRAYPROC, glEnableVertexAttribArray) \
+	MPGL_EXT(PFNGLDISABLEVERTEXATTRIBARRAYPROC, glDisableVertexAttribArray) \
+	MPGL_EXT(PFNGLVERTEXATTRIBPOINTERPROC, glVertexAttribPointer) \
+	MPGL_EXT(PFNGLVERTEXATTRIBDIVISORPROC, glVertexAttribDivisor) \
+	MPGL_EXT(PFNGLDRAWARRAYSINSTANCEDPROC, glDrawArraysInstanced)
+
+#ifdef WIN32
+#define MPGL_EXT(type, name) extern type name;
+MPGL_EXT_FUNCS
+MPGL_EXT_SHADER_FUNCS
+MPGL_EXT_INSTANCED_FUNCS
+#undef MPGL_EXT
+#endif
+
+int MPGL_ExtSupport(int ext);
+int MPGL_ExtCurrent(void);
+
 /*--------------------------------------------------
   text functions
 */
 enum { MPGL_TextHelvetica10, MPGL_TextHelvetica12, MPGL_TextHelvetica18 };
 
 void MPGL_TextBitmap(const char s[], int font_type);
+void MPGL_TextBegin(void);
+void MPGL_TextEnd(void);
+void MPGL_TextExtent(const char s[], int font_type, int extent[]);
 
 /*--------------------------------------------------
   colormap typedef and functions
 */
 #define MPGL_COLORMAP_MAX 16
+#define MPGL_COLORMAP_TABLE 4096
 
 enum { MPGL_ColormapStep, MPGL_ColormapGrad };
 
 typedef struct MPGL_Colormap {
 #ifdef MP_PYTHON_LIB
 	PyObject_HEAD
+	int busy;
 #endif
 	int mode;
 	char title[32];
@@ -58,6 +122,10 @@ typedef struct MPGL_Colormap {
 	float size[2];
 	int font_type;
 	float font_color[3];
+	int table_ngrad;
+	float table_grad[MPGL_COLORMAP_MAX][3];
+	float table[MPGL_COLORMAP_TABLE][3];
+	unsigned char table_byte[MPGL_COLORMAP_TABLE][4];
 } MPGL_Colormap;
 
 #ifdef MP_PYTHON_LIB
@@ -69,6 +137,9 @@ void MPGL_ColormapColor(MPGL_Colormap *colormap);
 void MPGL_ColormapGrayscale(MPGL_Colormap *colormap);
 void MPGL_ColormapStepColor(MPGL_Colormap *colormap, int id, float color[]);
 void MPGL_ColormapGradColor(MPGL_Colormap *colormap, double value, float color[]);
+void MPGL_ColormapUpdateTable(MPGL_Colormap *colormap);
+void MPGL_ColormapGradBytes(MPGL_Colormap *colormap, const double value[], int stride, int n, unsigned char color[]);
+void MPGL_ColormapStepBytes(MPGL_Colormap *colormap, const short id[], int stride, int n, unsigned char color[]);
 void MPGL_ColormapDraw(MPGL_Colormap *colormap);
 
 /*--------------------------------------------------
@@ -166,8 +237,158 @@ int MPGL_ModelMotion(MPGL_Model *model, MPGL_Scene *scene, int x, int y, int ctr
 #define MPGL_GRID_CUBE_LIST 107
 #define MPGL_GRID_CYLINDER_LIST 108
 
-enum { MPGL_DrawMethodQuads, MPGL_DrawMethodCubes };
+enum { MPGL_DrawMethodQuads, MPGL_DrawMethodCubes, MPGL_DrawMethodVolume, MPGL_DrawMethodIsosurface, MPGL_DrawMethodSlice,
+	MPGL_DrawMethodGlyph };
 enum { MPGL_DrawKindType, MPGL_DrawKindUpdate, MPGL_DrawKindVal, MPGL_DrawKindCx, MPGL_DrawKindCy, MPGL_DrawKindCz };
+enum { MPGL_DrawRenderList, MPGL_DrawRenderBuffer, MPGL_DrawRenderInstance };
+
+enum { MPGL_GridRefreshAll, MPGL_GridRefreshUpdate, MPGL_GridRefreshMask };
+
+typedef struct MPGL_GridMesh {
+	int nvertex;
+	int nindex;
+	int nface;
+	int vsize;
+	int isize;
+	int fsize;
+	int tsize;
+	float *vertex;
+	float *normal;
+	unsigned char *color;
+	unsigned int *index;
+	int *cell;
+	float *value;
+	int dirty[2];
+	unsigned int buffer[5];
+	int texture;
+	unsigned int texture_name;
+	double texture_range[2];
+	int texture_ngrad;
+	float texture_grad[MPGL_COLORMAP_MAX][3];
+} MPGL_GridMesh;
+
+
+typedef struct MPGL_GridStats {
+	int count;
+	int nonfinite;
+	double min;
+	double max;
+	double mean;
+	int vsize;
+	double *value;
+} MPGL_GridStats;
+
+typedef struct MPGL_GridDrawKey {
+	MP_GridData *data;
+	short *type;
+	short *update;
+	double *val;
+	int size[3];
+	int step;
+	int local_coef;
+	int method;
+	int kind;
+	int merge;
+	int texture;
+	int range[6];
+	int disp[MPGL_GRID_TYPE_MAX];
+	int nstep;
+	float step_color[MPGL_COLORMAP_MAX][3];
+	int ngrad;
+	float grad_color[MPGL_COLORMAP_MAX][3];
+	double cmp_range[2];
+	double iso_level;
+	int iso_color;
+	int brick;
+	int glyph_stride;
+	double glyph_scale;
+} MPGL_GridDrawKey;
+
+typedef struct MPGL_GridInstance {
+	int ninstance;
+	int size;
+	short *position;
+	unsigned char *color;
+	unsigned int buffer[4];
+	unsigned int program;
+	int status;
+	int cached;
+	MPGL_GridDrawKey key;
+	int nbuild;
+} MPGL_GridInstance;
+
+#define MPGL_GRID_LOD_MAX 4
+
+typedef struct MPGL_GridLod {
+	int valid;
+	int factor;
+	int origin[3];
+	MP_GridData data;
+	MPGL_GridDrawKey data_key;
+	MPGL_GridMesh mesh;
+	int cached;
+	MPGL_GridDrawKey key;
+	MPGL_GridInstance instance;
+} MPGL_GridLod;
+
+typedef struct MPGL_GridVolume {
+	unsigned int texture;
+	unsigned int transfer;
+	unsigned int program;
+	int status;
+	int size[3];
+	int stride;
+	double value_range[2];
+	int cached;
+	MPGL_GridDrawKey key;
+	int transfer_ngrad;
+	float transfer_grad[MPGL_COLORMAP_MAX][3];
+} MPGL_GridVolume;
+
+enum { MPGL_GridBrickClean, MPGL_GridBrickUpdate, MPGL_GridBrickColor, MPGL_GridBrickGeometry };
+
+typedef struct MPGL_GridBrick {
+	int range[6];
+	int dirty;
+	int nupdate;
+	unsigned char types[MPGL_GRID_TYPE_MAX / 8];
+	MPGL_GridMesh mesh;
+} MPGL_GridBrick;
+
+typedef struct MPGL_GridSlice {
+	unsigned int texture;
+	int size[2];
+	int stride;
+	int cached;
+	MPGL_GridDrawKey key;
+} MPGL_GridSlice;
+
+typedef struct MPGL_GridGlyph {
+	int ninstance;
+	int size;
+	float *origin;
+	float *vector;
+	unsigned char *color;
+	int nvertex;
+	unsigned int buffer[5];
+	unsigned int program;
+	int status;
+	int cached;
+	MPGL_GridDrawKey key;
+} MPGL_GridGlyph;
+
+#define MPGL_GRID_PROFILE_MAX 4096
+
+enum { MPGL_ProfileTraversal, MPGL_ProfileColor, MPGL_ProfileUpload, MPGL_ProfileSubmit, MPGL_PROFILE_STAGE_MAX };
+
+typedef struct MPGL_GridProfile {
+	long long cells;
+	long long faces;
+	long long calls;
+	long long bytes;
+	long long time[MPGL_PROFILE_STAGE_MAX];
+	long long total;
+} MPGL_GridProfile;
 
 typedef struct MPGL_GridDrawData {
 #ifdef MP_PYTHON_LIB
@@ -177,18 +398,214 @@ typedef struct MPGL_GridDrawData {
 	int kind;
 	int disp[MPGL_GRID_TYPE_MAX];
 	int range[6];
+	int render;
+	int merge;
+	int texture;
+	int threads;
+	int lod;
+	double lod_budget;
+	int volume_samples;
+	double volume_opacity;
+	double iso_level;
+	int iso_color;
+	int slice[3];
+	int brick;
+	int glyph_stride;
+	double glyph_scale;
+	int profile;
+	int profile_history;
+	MPGL_GridMesh mesh;
+	int cached;
+	MPGL_GridDrawKey key;
+	int nhit;
+	int nbuild;
+	int nrefresh;
+	MPGL_GridStats stats;
+	int lod_level;
+	double lod_time[MPGL_GRID_LOD_MAX + 1];
+	MPGL_GridLod lod_grid[MPGL_GRID_LOD_MAX];
+	MPGL_GridVolume volume;
+	MPGL_GridSlice slices[3];
+	MPGL_GridGlyph glyph;
+	MPGL_GridInstance instance;
+	int nbrick;
+	int brick_count[3];
+	MPGL_GridBrick *bricks;
+	int brick_cached;
+	MPGL_GridDrawKey brick_key;
+	int nculled;
+	MPGL_GridProfile frame;
+	MPGL_GridProfile profile_total;
+	int nframe;
+	double frame_start;
+	MPGL_GridProfile *history;
+	int history_size;
+	int history_next;
+	int history_count;
+#ifdef MP_PYTHON_LIB
+	PyObject *grid;
+	int busy;
+#endif
 } MPGL_GridDrawData;
 
 #ifdef MP_PYTHON_LIB
 extern PyTypeObject MPGL_GridDrawDataPyType;
+void MPGL_GridDrawKeepGrid(MPGL_GridDrawData *draw, PyObject *grid);
 #endif
 
 void MPGL_GridDrawInit(MPGL_GridDrawData *draw);
+void MPGL_GridDrawFree(MPGL_GridDrawData *draw);
+void MPGL_GridDrawInvalidate(MPGL_GridDrawData *draw);
 void MPGL_GridDrawList(void);
+void MPGL_GridDrawDispRange(MPGL_GridDrawData *draw, MP_GridData *data, int range[]);
 void MPGL_GridDrawColormapRange(MPGL_GridDrawData *draw, MP_GridData *data, MPGL_Colormap *colormap);
+int MPGL_GridDrawColormapPercentile(MPGL_GridDrawData *draw, MP_GridData *data, MPGL_Colormap *colormap,
+	double lower, double upper);
+int MPGL_GridDrawStats(MPGL_GridDrawData *draw, MP_GridData *data);
+int MPGL_GridDrawThreads(MPGL_GridDrawData *draw);
 void MPGL_GridDraw(MPGL_GridDrawData *draw, MP_GridData *data, MPGL_Colormap *colormap);
+int MPGL_GridDrawLod(MPGL_GridDrawData *draw, MP_GridData *data, MPGL_Colormap *colormap, int interact);
+int MPGL_GridDrawMesh(MPGL_GridDrawData *draw, MP_GridData *data, MPGL_Colormap *colormap, MPGL_GridMesh *mesh);
+int MPGL_GridDrawIsosurface(MPGL_GridDrawData *draw, MP_GridData *data, MPGL_Colormap *colormap,
+	double level, int color, MPGL_GridMesh *mesh);
+int MPGL_GridDrawRefresh(MPGL_GridDrawData *draw, MP_GridData *data, MPGL_Colormap *colormap, const unsigned char mask[]);
+void MPGL_GridDrawTouch(MPGL_GridDrawData *draw, int p0[], int p1[]);
 void MPGL_GridDrawAxis(int size[]);
 void MPGL_GridDrawRegion(MPGL_GridDrawData *draw, MP_GridData *data, float region[]);
+int MPGL_GridDrawPick(MPGL_GridDrawData *draw, MP_GridData *data, MPGL_Model *model, MPGL_Scene *scene,
+	int x, int y, int index[], int *face);
+void MPGL_GridDrawProfileReset(MPGL_GridDrawData *draw);
+
+/*--------------------------------------------------
+  mesh functions
+*/
+void MPGL_GridMeshInit(MPGL_GridMesh *mesh);
+void MPGL_GridMeshFree(MPGL_GridMesh *mesh);
+void MPGL_GridMeshRelease(MPGL_GridMesh *mesh);
+int MPGL_GridMeshAlloc(MPGL_GridMesh *mesh, int nvertex, int nindex, int nface);
+int MPGL_GridMeshBuild(MPGL_GridMesh *mesh, MPGL_GridDrawData *draw, MP_GridData *data, MPGL_Colormap *colormap);
+int MPGL_GridMeshBuildRange(MPGL_GridMesh *mesh, MPGL_GridDrawData *draw, MP_GridData *data, MPGL_Colormap *colormap,
+	int range[], int bound[]);
+int MPGL_GridMeshRefresh(MPGL_GridMesh *mesh, MPGL_GridDrawData *draw, MP_GridData *data, MPGL_Colormap *colormap,
+	int mode, const unsigned char mask[]);
+void MPGL_GridMeshUpload(MPGL_GridMesh *mesh);
+void MPGL_GridMeshUploadColor(MPGL_GridMesh *mesh);
+void MPGL_GridMeshUploadTexture(MPGL_GridMesh *mesh, MPGL_Colormap *colormap);
+void MPGL_GridMeshDraw(MPGL_GridMesh *mesh);
+
+/*--------------------------------------------------
+  stats functions
+*/
+void MPGL_GridStatsInit(MPGL_GridStats *stats);
+void MPGL_GridStatsFree(MPGL_GridStats *stats);
+int MPGL_GridStatsBuild(MPGL_GridStats *stats, MPGL_GridDrawData *draw, MP_GridData *data);
+void MPGL_GridStatsPercentile(MPGL_GridStats *stats, double p, double *value);
+void MPGL_GridStatsHistogram(MPGL_GridStats *stats, double min, double max, int nbin, int hist[]);
+
+/*--------------------------------------------------
+  lod functions
+*/
+void MPGL_GridLodInit(MPGL_GridLod *lod);
+void MPGL_GridLodFree(MPGL_GridLod *lod);
+int MPGL_GridLodBuild(MPGL_GridLod *lod, MPGL_GridDrawData *draw, MP_GridData *data, int factor);
+
+/*--------------------------------------------------
+  volume functions
+*/
+void MPGL_GridVolumeInit(MPGL_GridVolume *volume);
+void MPGL_GridVolumeFree(MPGL_GridVolume *volume);
+int MPGL_GridVolumeUpload(MPGL_GridVolume *volume, MPGL_GridDrawData *draw, MP_GridData *data);
+int MPGL_GridVolumeDraw(MPGL_GridVolume *volume, MPGL_GridDrawData *draw, MP_GridData *data, MPGL_Colormap *colormap);
+
+/*--------------------------------------------------
+  brick functions
+*/
+void MPGL_GridBrickInit(MPGL_GridBrick *brick);
+void MPGL_GridBrickFree(MPGL_GridBrick *brick);
+int MPGL_GridBrickBuild(MPGL_GridBrick *brick, MPGL_GridDrawData *draw, MP_GridData *data, MPGL_Colormap *colormap, int bound[]);
+int MPGL_GridBrickHasTypes(MPGL_GridBrick *brick, const unsigned char types[]);
+int MPGL_GridBrickVisible(MPGL_GridBrick *brick, float plane[][4], int nplane);
+
+/*--------------------------------------------------
+  slice functions
+*/
+void MPGL_GridSliceInit(MPGL_GridSlice *slice);
+void MPGL_GridSliceFree(MPGL_GridSlice *slice);
+int MPGL_GridSliceUpload(MPGL_GridSlice *slice, int axis, MPGL_GridDrawData *draw, MP_GridData *data, MPGL_Colormap *colormap);
+void MPGL_GridSliceDraw(MPGL_GridSlice *slice, int axis, MPGL_GridDrawData *draw, MP_GridData *data, MPGL_Colormap *colormap);
+
+/*--------------------------------------------------
+  glyph functions
+*/
+void MPGL_GridGlyphInit(MPGL_GridGlyph *glyph);
+void MPGL_GridGlyphFree(MPGL_GridGlyph *glyph);
+int MPGL_GridGlyphBuild(MPGL_GridGlyph *glyph, MPGL_GridDrawData *draw, MP_GridData *data, MPGL_Colormap *colormap);
+int MPGL_GridGlyphDraw(MPGL_GridGlyph *glyph, MPGL_GridDrawData *draw, MP_GridData *data, MPGL_Colormap *colormap,
+	float scale[]);
+
+/*--------------------------------------------------
+  instance functions
+*/
+void MPGL_GridInstanceInit(MPGL_GridInstance *instance);
+void MPGL_GridInstanceFree(MPGL_GridInstance *instance);
+int MPGL_GridInstanceBuild(MPGL_GridInstance *instance, MPGL_GridDrawData *draw, MP_GridData *data, MPGL_Colormap *colormap);
+int MPGL_GridInstanceDraw(MPGL_GridInstance *instance, MPGL_GridDrawData *draw, MP_GridData *data, MPGL_Colormap *colormap);
+
+/*--------------------------------------------------
+  iso functions
+*/
+void MPGL_GridIsoInit(void);
+int MPGL_GridIsoBuild(MPGL_GridMesh *mesh, MPGL_GridDrawData *draw, MP_GridData *data, MPGL_Colormap *colormap);
+
+/*--------------------------------------------------
+  offscreen typedef and functions
+*/
+#define MPGL_OFFSCREEN_PBO_MAX 3
+
+typedef struct MPGL_OffscreenPixelBuffer {
+	unsigned int name;
+	int width, height;
+	int alpha;
+} MPGL_OffscreenPixelBuffer;
+
+typedef struct MPGL_Offscreen {
+#ifdef MP_PYTHON_LIB
+	PyObject_HEAD
+#endif
+	int width, height;
+	void *display;
+	void *config;
+	void *context;
+	void *surface;
+	int list;
+	int npbo;
+	MPGL_OffscreenPixelBuffer pbo[MPGL_OFFSCREEN_PBO_MAX];
+	int pbo_head;
+	int pbo_count;
+} MPGL_Offscreen;
+
+#ifdef MP_PYTHON_LIB
+extern PyTypeObject MPGL_OffscreenPyType;
+#endif
+
+int MPGL_OffscreenInit(MPGL_Offscreen *offscreen, int width, int height);
+void MPGL_OffscreenFree(MPGL_Offscreen *offscreen);
+int MPGL_OffscreenMakeCurrent(MPGL_Offscreen *offscreen);
+int MPGL_OffscreenResize(MPGL_Offscreen *offscreen, int width, int height);
+void MPGL_OffscreenRender(MPGL_Offscreen *offscreen, MPGL_Scene *scene, MPGL_Model *model, MPGL_GridDrawData *draw,
+	MP_GridData *data, MPGL_Colormap *colormap, int axis, int colorbar);
+void MPGL_OffscreenRead(MPGL_Offscreen *offscreen, int alpha, unsigned char pixels[]);
+int MPGL_OffscreenReadAsync(MPGL_Offscreen *offscreen, int alpha);
+int MPGL_OffscreenReadPending(MPGL_Offscreen *offscreen, int size[]);
+void MPGL_OffscreenReadComplete(MPGL_Offscreen *offscreen, unsigned char pixels[]);
+
+#ifdef MP_PYTHON_LIB
+/*--------------------------------------------------
+  python functions
+*/
+PyObject *MPGL_PyGetState(PyObject *self, const char *names[]);
+int MPGL_PySetState(PyObject *self, const char *names[], PyObject *state);
+#endif
 
 #ifdef __cplusplus
 }
@@ -0,0 +1,82 @@
+#include "MPGLGrid.h"
+
+void MPGL_GridBrickInit(MPGL_GridBrick *brick)
+{
+	int i;
+
+	for (i = 0; i < 6; i++) brick->range[i] = 0;
+	brick->dirty = MPGL_GridBrickGeometry;
+	brick->nupdate = 0;
+	memset(brick->types, 0, sizeof(brick->types));
+	MPGL_GridMeshInit(&(brick->mesh));
+}
+
+void MPGL_GridBrickFree(MPGL_GridBrick *brick)
+{
+	MPGL_GridMeshRelease(&(brick->mesh));
+	MPGL_GridMeshFree(&(brick->mesh));
+	brick->dirty = MPGL_GridBrickGeometry;
+}
+
+/* types of cells in brick and their neighbors in bound, faces of the brick depend on them */
+static void BrickTypes(MPGL_GridBrick *brick, MP_GridData *data, int bound[])
+{
+	int i, id;
+	int x, y, z;
+	int p0[3], p1[3];
+
+	memset(brick->types, 0, sizeof(brick->types));
+	brick->nupdate = 0;
+	for (i = 0; i < 3; i++) {
+		p0[i] = (brick->range[i] > bound[i]) ? brick->range[i] - 1 : brick->range[i];
+		p1[i] = (brick->range[i + 3] < bound[i + 3]) ? brick->range[i + 3] + 1 : brick->range[i + 3];
+	}
+	for (z = p0[2]; z <= p1[2]; z++) {
+		for (y = p0[1]; y <= p1[1]; y++) {
+			id = MP_GRID_INDEX(data, p0[0], y, z);
+			for (x = p0[0]; x <= p1[0]; x++, id++) {
+				brick->types[data->type[id] / 8] |= 1 << (data->type[id] % 8);
+				if (data->update != NULL && data->update[id]
+					&& x >= brick->range[0] && x <= brick->range[3] && y >= brick->range[1] && y <= brick->range[4]
+					&& z >= brick->range[2] && z <= brick->range[5]) brick->nupdate++;
+			}
+		}
+	}
+}
+
+/* build faces of cells in brick, exposed on the boundary of bound */
+int MPGL_GridBrickBuild(MPGL_GridBrick *brick, MPGL_GridDrawData *draw, MP_GridData *data, MPGL_Colormap *colormap, int bound[])
+{
+	BrickTypes(brick, data, bound);
+	if (!MPGL_GridMeshBuildRange(&(brick->mesh), draw, data, colormap, brick->range, bound)) return FALSE;
+	MPGL_GridMeshUpload(&(brick->mesh));
+	brick->dirty = MPGL_GridBrickClean;
+	return TRUE;
+}
+
+/* brick has cells of any type set in types */
+int MPGL_GridBrickHasTypes(MPGL_GridBrick *brick, const unsigned char types[])
+{
+	int i;
+
+	for (i = 0; i < MPGL_GRID_TYPE_MAX / 8; i++) {
+		if (brick->types[i] & types[i]) return TRUE;
+	}
+	return FALSE;
+}
+
+/* box of brick is inside or crosses all planes a x + b y + c z + d >= 0 */
+int MPGL_GridBrickVisible(MPGL_GridBrick *brick, float plane[][4], int nplane)
+{
+	int i, k;
+	float d;
+
+	for (i = 0; i < nplane; i++) {
+		d = plane[i][3];
+		for (k = 0; k < 3; k++) {
+			d += plane[i][k] * ((plane[i][k] > 0.0f) ? brick->range[k + 3] + 0.5f : brick->range[k] - 0.5f);
+		}
+		if (d < 0.0f) return FALSE;
+	}
+	return TRUE;
+}
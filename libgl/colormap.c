@@ -1,4 +1,9 @@
 #include "MPGLGrid.h"
+#ifdef MP_PYTHON_LIB
+#define NO_IMPORT_ARRAY
+#define PY_ARRAY_UNIQUE_SYMBOL MPGLGrid_ARRAY_API
+#include <numpy/arrayobject.h>
+#endif
 
 void MPGL_ColormapInit(MPGL_Colormap *colormap)
 {
@@ -10,6 +15,7 @@ void MPGL_ColormapInit(MPGL_Colormap *colormap)
 	colormap->font_color[0] = 1.0;
 	colormap->font_color[1] = 1.0;
 	colormap->font_color[2] = 1.0;
+	colormap->table_ngrad = -1;
 }
 
 void MPGL_ColormapColor(MPGL_Colormap *colormap)
@@ -99,6 +105,97 @@ void MPGL_ColormapGradColor(MPGL_Colormap *colormap, double value, float color[]
 	color[2] = (float)(colormap->grad_color[cmp][2] + dy*(colormap->grad_color[cmp+1][2]-colormap->grad_color[cmp][2]));
 }
 
+static unsigned char ColorByte(float c)
+{
+	if (!(c > 0.0f)) return 0;
+	else if (c >= 1.0f) return 255;
+	return (unsigned char)(c * 255.0f + 0.5f);
+}
+
+/* rebuild gradation table if ngrad or grad_color has changed */
+void MPGL_ColormapUpdateTable(MPGL_Colormap *colormap)
+{
+	int i, k, cmp;
+	int ngrad = colormap->ngrad;
+	double x, dy;
+
+	if (ngrad > MPGL_COLORMAP_MAX) ngrad = MPGL_COLORMAP_MAX;
+	if (colormap->table_ngrad == ngrad
+		&& memcmp(colormap->table_grad, colormap->grad_color, sizeof(colormap->table_grad)) == 0) return;
+	for (i = 0; i < MPGL_COLORMAP_TABLE; i++) {
+		if (ngrad < 2) {
+			cmp = 0, dy = 0.0;
+		}
+		else {
+			x = (double)i / (MPGL_COLORMAP_TABLE - 1) * (ngrad - 1);
+			cmp = (int)x;
+			if (cmp >= ngrad - 1) cmp = ngrad - 2;
+			dy = x - cmp;
+		}
+		for (k = 0; k < 3; k++) {
+			if (ngrad < 2) colormap->table[i][k] = colormap->grad_color[0][k];
+			else colormap->table[i][k] = (float)(colormap->grad_color[cmp][k]
+				+ dy * (colormap->grad_color[cmp + 1][k] - colormap->grad_color[cmp][k]));
+			colormap->table_byte[i][k] = ColorByte(colormap->table[i][k]);
+		}
+		colormap->table_byte[i][3] = 255;
+	}
+	colormap->table_ngrad = ngrad;
+	memcpy(colormap->table_grad, colormap->grad_color, sizeof(colormap->table_grad));
+}
+
+static double TableScale(MPGL_Colormap *colormap)
+{
+	if (colormap->range[1] == colormap->range[0]) return 0.0;
+	return (MPGL_COLORMAP_TABLE - 1) / (colormap->range[1] - colormap->range[0]);
+}
+
+static int TableIndex(MPGL_Colormap *colormap, double scale, double value)
+{
+	double t = (value - colormap->range[0]) * scale;
+
+	if (!(t > 0.0)) return 0;
+	else if (t >= MPGL_COLORMAP_TABLE - 1) return MPGL_COLORMAP_TABLE - 1;
+	return (int)(t + 0.5);
+}
+
+/* number of step colors which ids are mapped to */
+static int StepCount(MPGL_Colormap *colormap)
+{
+	return (colormap->nstep < MPGL_COLORMAP_MAX) ? colormap->nstep : MPGL_COLORMAP_MAX;
+}
+
+/* RGBA bytes of n values with stride from the gradation table, call MPGL_ColormapUpdateTable before */
+void MPGL_ColormapGradBytes(MPGL_Colormap *colormap, const double value[], int stride, int n, unsigned char color[])
+{
+	int i;
+	double scale = TableScale(colormap);
+
+	for (i = 0; i < n; i++) {
+		memcpy(&(color[4 * i]), colormap->table_byte[TableIndex(colormap, scale, value[i * stride])], 4);
+	}
+}
+
+/* RGBA bytes of n step ids with stride */
+void MPGL_ColormapStepBytes(MPGL_Colormap *colormap, const short id[], int stride, int n, unsigned char color[])
+{
+	int i, k;
+	int nstep = StepCount(colormap);
+
+	for (i = 0; i < n; i++) {
+		k = id[i * stride];
+		if (k >= 0 && k < nstep) {
+			color[4 * i] = ColorByte(colormap->step_color[k][0]);
+			color[4 * i + 1] = ColorByte(colormap->step_color[k][1]);
+			color[4 * i + 2] = ColorByte(colormap->step_color[k][2]);
+		}
+		else {
+			color[4 * i] = 255, color[4 * i + 1] = 255, color[4 * i + 2] = 255;
+		}
+		color[4 * i + 3] = 255;
+	}
+}
+
 void MPGL_ColormapDraw(MPGL_Colormap *colormap)
 {
 	int i;
@@ -145,6 +242,7 @@ void MPGL_ColormapDraw(MPGL_Colormap *colormap)
 		}
 	}
 	glColor3fv(colormap->font_color);
+	MPGL_TextBegin();
 	if (colormap->mode == MPGL_ColormapStep) {
 		dh = 1.0f/colormap->nstep;
 		for (i = 0;i < colormap->nstep;i++) {
@@ -169,6 +267,7 @@ void MPGL_ColormapDraw(MPGL_Colormap *colormap)
 	pos[2] = 0.0;
 	glRasterPos3f(pos[0], pos[1], pos[2]);
 	MPGL_TextBitmap(colormap->title, colormap->font_type);
+	MPGL_TextEnd();
 	glPopAttrib();
 }
 
@@ -193,6 +292,22 @@ static PyObject *PyNew(PyTypeObject *type, PyObject *args, PyObject *kwds)
 	return (PyObject *)self;
 }
 
+/* colormap is held by draws running without the GIL, calls changing it from other threads fail meanwhile */
+static int PyBusy(MPGL_Colormap *self)
+{
+	if (self->busy > 0) {
+		PyErr_SetString(PyExc_RuntimeError, "colormap is busy in another thread");
+		return TRUE;
+	}
+	return FALSE;
+}
+
+static int PySetAttr(MPGL_Colormap *self, PyObject *name, PyObject *value)
+{
+	if (PyBusy(self)) return -1;
+	return PyObject_GenericSetAttr((PyObject *)self, name, value);
+}
+
 static PyMemberDef PyMembers[] = {
 	{ "mode", T_INT, offsetof(MPGL_Colormap, mode), 0, "mode = {0:step | 1:gradation} : colormap mode" },
 	{ "title", T_STRING, offsetof(MPGL_Colormap, title), 0, "title = txt : colormap title" },
@@ -205,12 +320,14 @@ static PyMemberDef PyMembers[] = {
 
 static PyObject *PyColor(MPGL_Colormap *self, PyObject *args)
 {
+	if (PyBusy(self)) return NULL;
 	MPGL_ColormapColor(self);
 	Py_RETURN_NONE;
 }
 
 static PyObject *PyGrayscale(MPGL_Colormap *self, PyObject *args)
 {
+	if (PyBusy(self)) return NULL;
 	MPGL_ColormapGrayscale(self);
 	Py_RETURN_NONE;
 }
@@ -228,6 +345,7 @@ static PyObject *PySetStepColor(MPGL_Colormap *self, PyObject *args, PyObject *k
 		PyErr_SetString(PyExc_ValueError, "invalid id");
 		return NULL;
 	}
+	if (PyBusy(self)) return NULL;
 	self->step_color[id][0] = red;
 	self->step_color[id][1] = green;
 	self->step_color[id][2] = blue;
@@ -247,6 +365,7 @@ static PyObject *PySetGradColor(MPGL_Colormap *self, PyObject *args, PyObject *k
 		PyErr_SetString(PyExc_ValueError, "invalid id");
 		return NULL;
 	}
+	if (PyBusy(self)) return NULL;
 	self->grad_color[id][0] = red;
 	self->grad_color[id][1] = green;
 	self->grad_color[id][2] = blue;
@@ -266,6 +385,7 @@ static PyObject *PySetLabel(MPGL_Colormap *self, PyObject *args, PyObject *kwds)
 		PyErr_SetString(PyExc_ValueError, "invalid id");
 		return NULL;
 	}
+	if (PyBusy(self)) return NULL;
 	strcpy(self->label[id], label);
 	Py_RETURN_NONE;
 }
@@ -300,12 +420,219 @@ static PyObject *PyGradColor(MPGL_Colormap *self, PyObject *args, PyObject *kwds
 	return Py_BuildValue("ddd", color[0], color[1], color[2]);
 }
 
+static PyArrayObject *PyColorArray(PyArrayObject *src, int byte)
+{
+	int i;
+	int nd = PyArray_NDIM(src);
+	npy_intp dims[NPY_MAXDIMS];
+
+	for (i = 0; i < nd; i++) dims[i] = PyArray_DIM(src, i);
+	dims[nd] = 3;
+	return (PyArrayObject *)PyArray_SimpleNew(nd + 1, dims, byte ? NPY_UINT8 : NPY_FLOAT32);
+}
+
+static PyObject *PyGradColors(MPGL_Colormap *self, PyObject *args, PyObject *kwds)
+{
+	int id;
+	int byte = 1;
+	npy_intp i, n;
+	double scale;
+	double *value;
+	unsigned char *cb;
+	float *cf;
+	PyObject *values;
+	PyArrayObject *src, *dst;
+	static char *kwlist[] = { "values", "byte", NULL };
+
+	if (!PyArg_ParseTupleAndKeywords(args, kwds, "O|i", kwlist, &values, &byte)) {
+		return NULL;
+	}
+	src = (PyArrayObject *)PyArray_FROMANY(values, NPY_DOUBLE, 0, NPY_MAXDIMS - 1, NPY_ARRAY_CARRAY_RO);
+	if (src == NULL) return NULL;
+	dst = PyColorArray(src, byte);
+	if (dst == NULL) {
+		Py_DECREF(src);
+		return NULL;
+	}
+	MPGL_ColormapUpdateTable(self);
+	scale = TableScale(self);
+	n = PyArray_SIZE(src);
+	value = (double *)PyArray_DATA(src);
+	cb = (unsigned char *)PyArray_DATA(dst);
+	cf = (float *)PyArray_DATA(dst);
+	for (i = 0; i < n; i++) {
+		id = TableIndex(self, scale, value[i]);
+		if (byte) memcpy(&(cb[3 * i]), self->table_byte[id], 3);
+		else memcpy(&(cf[3 * i]), self->table[id], 3 * sizeof(float));
+	}
+	Py_DECREF(src);
+	return (PyObject *)dst;
+}
+
+static PyObject *PyStepColors(MPGL_Colormap *self, PyObject *args, PyObject *kwds)
+{
+	int k, id, nstep;
+	int byte = 1;
+	npy_intp i, n;
+	int *ids;
+	unsigned char *cb;
+	float *cf;
+	float color[3];
+	PyObject *values;
+	PyArrayObject *src, *dst;
+	static char *kwlist[] = { "ids", "byte", NULL };
+
+	if (!PyArg_ParseTupleAndKeywords(args, kwds, "O|i", kwlist, &values, &byte)) {
+		return NULL;
+	}
+	src = (PyArrayObject *)PyArray_FROMANY(values, NPY_INT, 0, NPY_MAXDIMS - 1, NPY_ARRAY_CARRAY_RO | NPY_ARRAY_FORCECAST);
+	if (src == NULL) return NULL;
+	dst = PyColorArray(src, byte);
+	if (dst == NULL) {
+		Py_DECREF(src);
+		return NULL;
+	}
+	n = PyArray_SIZE(src);
+	ids = (int *)PyArray_DATA(src);
+	cb = (unsigned char *)PyArray_DATA(dst);
+	cf = (float *)PyArray_DATA(dst);
+	nstep = StepCount(self);
+	for (i = 0; i < n; i++) {
+		id = ids[i];
+		if (id >= 0 && id < nstep) {
+			MPGL_ColormapStepColor(self, id, color);
+		}
+		else {
+			color[0] = 1.0, color[1] = 1.0, color[2] = 1.0;
+		}
+		for (k = 0; k < 3; k++) {
+			if (byte) cb[3 * i + k] = ColorByte(color[k]);
+			else cf[3 * i + k] = color[k];
+		}
+	}
+	Py_DECREF(src);
+	return (PyObject *)dst;
+}
+
 static PyObject *PyDraw(MPGL_Colormap *self, PyObject *args)
 {
 	MPGL_ColormapDraw(self);
 	Py_RETURN_NONE;
 }
 
+/* public attributes of colormap for pickle, title, labels and colors are added by their names */
+static const char *PyStateNames[] = { "mode", "nstep", "ngrad", "nscale", "font_type",
+	"range", "size", "font_color", NULL };
+
+static PyObject *PyReduce(MPGL_Colormap *self, PyObject *args)
+{
+	int i;
+	PyObject *state, *title, *step_color, *grad_color, *label;
+
+	state = MPGL_PyGetState((PyObject *)self, PyStateNames);
+	if (state == NULL) return NULL;
+	step_color = PyTuple_New(MPGL_COLORMAP_MAX);
+	grad_color = PyTuple_New(MPGL_COLORMAP_MAX);
+	label = PyTuple_New(MPGL_COLORMAP_MAX);
+	for (i = 0; step_color != NULL && grad_color != NULL && label != NULL && i < MPGL_COLORMAP_MAX; i++) {
+		PyTuple_SET_ITEM(step_color, i, Py_BuildValue("(fff)",
+			self->step_color[i][0], self->step_color[i][1], self->step_color[i][2]));
+		PyTuple_SET_ITEM(grad_color, i, Py_BuildValue("(fff)",
+			self->grad_color[i][0], self->grad_color[i][1], self->grad_color[i][2]));
+		PyTuple_SET_ITEM(label, i, Py_BuildValue("s", self->label[i]));
+	}
+	title = Py_BuildValue("s", self->title);
+	if (step_color == NULL || grad_color == NULL || label == NULL || title == NULL
+		|| PyDict_SetItemString(state, "title", title) < 0
+		|| PyDict_SetItemString(state, "step_color", step_color) < 0
+		|| PyDict_SetItemString(state, "grad_color", grad_color) < 0
+		|| PyDict_SetItemString(state, "label", label) < 0) {
+		Py_XDECREF(step_color);
+		Py_XDECREF(grad_color);
+		Py_XDECREF(label);
+		Py_XDECREF(title);
+		Py_DECREF(state);
+		return NULL;
+	}
+	Py_DECREF(step_color);
+	Py_DECREF(grad_color);
+	Py_DECREF(label);
+	Py_DECREF(title);
+	return Py_BuildValue("(O()N)", Py_TYPE(self), state);
+}
+
+/* colors of MPGL_COLORMAP_MAX (red, green, blue) in state, return -1 on error */
+static int PySetStateColor(PyObject *state, const char *name, float color[][3])
+{
+	int i;
+	float c[MPGL_COLORMAP_MAX][3];
+	PyObject *value, *seq;
+
+	value = PyDict_GetItemString(state, name);
+	if (value == NULL) return 0;
+	seq = PySequence_Fast(value, "invalid state");
+	if (seq == NULL) return -1;
+	if (PySequence_Fast_GET_SIZE(seq) != MPGL_COLORMAP_MAX) {
+		Py_DECREF(seq);
+		PyErr_SetString(PyExc_ValueError, "invalid state");
+		return -1;
+	}
+	for (i = 0; i < MPGL_COLORMAP_MAX; i++) {
+		if (!PyArg_ParseTuple(PySequence_Fast_GET_ITEM(seq, i), "fff", &(c[i][0]), &(c[i][1]), &(c[i][2]))) {
+			Py_DECREF(seq);
+			return -1;
+		}
+	}
+	Py_DECREF(seq);
+	memcpy(color, c, sizeof(c));
+	return 0;
+}
+
+/* string of at most size - 1 characters in state, return -1 on error */
+static int PySetStateString(PyObject *value, char *string, int size)
+{
+	const char *s;
+
+	if (!PyArg_Parse(value, "s", &s)) return -1;
+	if ((int)strlen(s) >= size) {
+		PyErr_SetString(PyExc_ValueError, "invalid state");
+		return -1;
+	}
+	strcpy(string, s);
+	return 0;
+}
+
+static PyObject *PySetState(MPGL_Colormap *self, PyObject *state)
+{
+	int i;
+	PyObject *value, *seq;
+
+	if (PyBusy(self)) return NULL;
+	if (MPGL_PySetState((PyObject *)self, PyStateNames, state) < 0) return NULL;
+	value = PyDict_GetItemString(state, "title");
+	if (value != NULL && PySetStateString(value, self->title, sizeof(self->title)) < 0) return NULL;
+	if (PySetStateColor(state, "step_color", self->step_color) < 0) return NULL;
+	if (PySetStateColor(state, "grad_color", self->grad_color) < 0) return NULL;
+	value = PyDict_GetItemString(state, "label");
+	if (value != NULL) {
+		seq = PySequence_Fast(value, "invalid state");
+		if (seq == NULL) return NULL;
+		if (PySequence_Fast_GET_SIZE(seq) != MPGL_COLORMAP_MAX) {
+			Py_DECREF(seq);
+			PyErr_SetString(PyExc_ValueError, "invalid state");
+			return NULL;
+		}
+		for (i = 0; i < MPGL_COLORMAP_MAX; i++) {
+			if (PySetStateString(PySequence_Fast_GET_ITEM(seq, i), self->label[i], sizeof(self->label[i])) < 0) {
+				Py_DECREF(seq);
+				return NULL;
+			}
+		}
+		Py_DECREF(seq);
+	}
+	Py_RETURN_NONE;
+}
+
 static PyMethodDef PyMethods[] = {
 	{ "color", (PyCFunction)PyColor, METH_NOARGS,
 	"color() : set default color" },
@@ -321,8 +648,16 @@ static PyMethodDef PyMethods[] = {
 	"step_color(id) : get step color" },
 	{ "grad_color", (PyCFunction)PyGradColor, METH_VARARGS | METH_KEYWORDS,
 	"grad_color(value) : get grad color" },
+	{ "step_colors", (PyCFunction)PyStepColors, METH_VARARGS | METH_KEYWORDS,
+	"step_colors(ids, byte=1) : get step colors of array, byte = {0:float32 | 1:uint8}" },
+	{ "grad_colors", (PyCFunction)PyGradColors, METH_VARARGS | METH_KEYWORDS,
+	"grad_colors(values, byte=1) : get grad colors of array, byte = {0:float32 | 1:uint8}" },
 	{ "draw", (PyCFunction)PyDraw, METH_NOARGS,
 	"draw() : draw colormap" },
+	{ "__reduce__", (PyCFunction)PyReduce, METH_NOARGS,
+	"__reduce__() : return state for pickle" },
+	{ "__setstate__", (PyCFunction)PySetState, METH_O,
+	"__setstate__(state) : set state from pickle" },
 	{ NULL }  /* Sentinel */
 };
 
@@ -354,7 +689,7 @@ static int PySetSize(MPGL_Colormap *self, PyObject *value, void *closure)
 	if (!PyArg_ParseTuple(value, "ff", &width, &height)) {
 		return -1;
 	}
-	self->size[0] = width, self->range[1] = height;
+	self->size[0] = width, self->size[1] = height;
 	return 0;
 }
 
@@ -382,8 +717,10 @@ static PyGetSetDef PyGetSet[] = {
 };
 
 PyTypeObject MPGL_ColormapPyType = {
+#ifdef PY3
+	PyVarObject_HEAD_INIT(NULL, 0)
+#else
 	PyObject_HEAD_INIT(NULL)
-#ifndef PY3
 	0,							/*ob_size*/
 #endif
 	"MPGLGrid.colormap",			/*tp_name*/
@@ -402,7 +739,7 @@ PyTypeObject MPGL_ColormapPyType = {
 	0,							/*tp_call*/
 	0,							/*tp_str*/
 	0,							/*tp_getattro*/
-	0,							/*tp_setattro*/
+	(setattrofunc)PySetAttr,	/*tp_setattro*/
 	0,							/*tp_as_buffer*/
 	Py_TPFLAGS_DEFAULT | Py_TPFLAGS_BASETYPE,	/*tp_flags*/
 	"colormap()",				/* tp_doc */
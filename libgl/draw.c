@@ -1,5 +1,10 @@
 #include "MPGLGrid.h"
 #include <MPGrid.h>
+#ifdef MP_PYTHON_LIB
+#define NO_IMPORT_ARRAY
+#define PY_ARRAY_UNIQUE_SYMBOL MPGLGrid_ARRAY_API
+#include <numpy/arrayobject.h>
+#endif
 
 void MPGL_GridDrawInit(MPGL_GridDrawData *draw)
 {
@@ -14,6 +19,216 @@ void MPGL_GridDrawInit(MPGL_GridDrawData *draw)
 	for (i = 0; i < 6; i++) {
 		draw->range[i] = range[i];
 	}
+	draw->render = MPGL_DrawRenderList;
+	draw->merge = TRUE;
+	draw->texture = FALSE;
+	draw->threads = 1;
+	draw->lod = 0;
+	draw->lod_budget = 1.0 / 30.0;
+	draw->volume_samples = 256;
+	draw->volume_opacity = 0.05;
+	draw->iso_level = 0.5;
+	draw->iso_color = -1;
+	for (i = 0; i < 3; i++) {
+		draw->slice[i] = -1;
+	}
+	draw->brick = 0;
+	draw->glyph_stride = 1;
+	draw->glyph_scale = 1.0;
+	draw->profile = FALSE;
+	draw->profile_history = 0;
+	MPGL_GridMeshInit(&(draw->mesh));
+	draw->cached = FALSE;
+	memset(&(draw->key), 0, sizeof(MPGL_GridDrawKey));
+	draw->nhit = 0;
+	draw->nbuild = 0;
+	draw->nrefresh = 0;
+	MPGL_GridStatsInit(&(draw->stats));
+	draw->lod_level = 0;
+	for (i = 0; i <= MPGL_GRID_LOD_MAX; i++) {
+		draw->lod_time[i] = 0.0;
+	}
+	for (i = 0; i < MPGL_GRID_LOD_MAX; i++) {
+		MPGL_GridLodInit(&(draw->lod_grid[i]));
+	}
+	MPGL_GridVolumeInit(&(draw->volume));
+	for (i = 0; i < 3; i++) {
+		MPGL_GridSliceInit(&(draw->slices[i]));
+	}
+	MPGL_GridGlyphInit(&(draw->glyph));
+	MPGL_GridInstanceInit(&(draw->instance));
+	draw->nbrick = 0;
+	for (i = 0; i < 3; i++) {
+		draw->brick_count[i] = 0;
+	}
+	draw->bricks = NULL;
+	draw->brick_cached = FALSE;
+	memset(&(draw->brick_key), 0, sizeof(MPGL_GridDrawKey));
+	draw->nculled = 0;
+	draw->history = NULL;
+	draw->history_size = 0;
+	MPGL_GridDrawProfileReset(draw);
+#ifdef MP_PYTHON_LIB
+	draw->grid = NULL;
+	draw->busy = FALSE;
+#endif
+}
+
+static void GridBricksFree(MPGL_GridDrawData *draw)
+{
+	int i;
+
+	for (i = 0; i < draw->nbrick; i++) {
+		MPGL_GridBrickFree(&(draw->bricks[i]));
+	}
+	free(draw->bricks);
+	draw->bricks = NULL;
+	draw->nbrick = 0;
+	draw->brick_cached = FALSE;
+}
+
+void MPGL_GridDrawFree(MPGL_GridDrawData *draw)
+{
+	int i;
+
+	MPGL_GridMeshRelease(&(draw->mesh));
+	MPGL_GridMeshFree(&(draw->mesh));
+	draw->cached = FALSE;
+	MPGL_GridStatsFree(&(draw->stats));
+	for (i = 0; i < MPGL_GRID_LOD_MAX; i++) {
+		MPGL_GridLodFree(&(draw->lod_grid[i]));
+	}
+	MPGL_GridVolumeFree(&(draw->volume));
+	for (i = 0; i < 3; i++) {
+		MPGL_GridSliceFree(&(draw->slices[i]));
+	}
+	MPGL_GridGlyphFree(&(draw->glyph));
+	MPGL_GridInstanceFree(&(draw->instance));
+	GridBricksFree(draw);
+	free(draw->history);
+	draw->history = NULL;
+	draw->history_size = 0;
+	MPGL_GridDrawProfileReset(draw);
+#ifdef MP_PYTHON_LIB
+	Py_CLEAR(draw->grid);
+#endif
+}
+
+/* number of threads to build geometry and statistics, all processors if threads is 0 */
+int MPGL_GridDrawThreads(MPGL_GridDrawData *draw)
+{
+#ifdef _OPENMP
+	if (draw->threads <= 0) return omp_get_num_procs();
+	return draw->threads;
+#else
+	return 1;
+#endif
+}
+
+static double GridDrawClock(void)
+{
+#ifdef _OPENMP
+	return omp_get_wtime();
+#else
+	return (double)clock() / CLOCKS_PER_SEC;
+#endif
+}
+
+/* clear counters of frames and history */
+void MPGL_GridDrawProfileReset(MPGL_GridDrawData *draw)
+{
+	memset(&(draw->frame), 0, sizeof(MPGL_GridProfile));
+	memset(&(draw->profile_total), 0, sizeof(MPGL_GridProfile));
+	draw->nframe = 0;
+	draw->frame_start = 0.0;
+	draw->history_next = 0;
+	draw->history_count = 0;
+}
+
+/* start time of a stage, the clock is read only if profile is on */
+static double GridProfileStart(MPGL_GridDrawData *draw)
+{
+	return (draw->profile) ? GridDrawClock() : 0.0;
+}
+
+/* add time of stage from start and counters to the frame if profile is on */
+static void GridProfileAdd(MPGL_GridDrawData *draw, int stage, double start,
+	long long cells, long long faces, long long calls, long long bytes)
+{
+	if (!draw->profile) return;
+	draw->frame.time[stage] += (long long)((GridDrawClock() - start) * 1.0e9);
+	draw->frame.cells += cells;
+	draw->frame.faces += faces;
+	draw->frame.calls += calls;
+	draw->frame.bytes += bytes;
+}
+
+static void GridProfileBegin(MPGL_GridDrawData *draw)
+{
+	if (!draw->profile) return;
+	memset(&(draw->frame), 0, sizeof(MPGL_GridProfile));
+	draw->frame_start = GridDrawClock();
+}
+
+/* add the frame to total and history of last profile_history frames */
+static void GridProfileEnd(MPGL_GridDrawData *draw)
+{
+	int i;
+	int n = draw->profile_history;
+	MPGL_GridProfile *frame = &(draw->frame);
+	MPGL_GridProfile *total = &(draw->profile_total);
+
+	if (!draw->profile) return;
+	frame->total = (long long)((GridDrawClock() - draw->frame_start) * 1.0e9);
+	total->cells += frame->cells;
+	total->faces += frame->faces;
+	total->calls += frame->calls;
+	total->bytes += frame->bytes;
+	for (i = 0; i < MPGL_PROFILE_STAGE_MAX; i++) total->time[i] += frame->time[i];
+	total->total += frame->total;
+	draw->nframe++;
+	if (n > MPGL_GRID_PROFILE_MAX) n = MPGL_GRID_PROFILE_MAX;
+	if (n != draw->history_size) {
+		free(draw->history);
+		draw->history = (n > 0) ? (MPGL_GridProfile *)malloc(n * sizeof(MPGL_GridProfile)) : NULL;
+		draw->history_size = (draw->history != NULL) ? n : 0;
+		draw->history_next = draw->history_count = 0;
+	}
+	if (draw->history_size <= 0) return;
+	draw->history[draw->history_next] = *frame;
+	draw->history_next = (draw->history_next + 1) % draw->history_size;
+	if (draw->history_count < draw->history_size) draw->history_count++;
+}
+
+/* forget caches made from grid data, buffers and textures are kept to be filled again */
+static void GridDrawExpire(MPGL_GridDrawData *draw)
+{
+	int i;
+
+	draw->cached = FALSE;
+	for (i = 0; i < MPGL_GRID_LOD_MAX; i++) {
+		draw->lod_grid[i].valid = FALSE;
+		draw->lod_grid[i].cached = FALSE;
+		draw->lod_grid[i].instance.cached = FALSE;
+	}
+	draw->volume.cached = FALSE;
+	for (i = 0; i < 3; i++) {
+		draw->slices[i].cached = FALSE;
+	}
+	draw->glyph.cached = FALSE;
+	draw->instance.cached = FALSE;
+	draw->brick_cached = FALSE;
+}
+
+void MPGL_GridDrawInvalidate(MPGL_GridDrawData *draw)
+{
+	int i;
+
+	GridDrawExpire(draw);
+	MPGL_GridMeshRelease(&(draw->mesh));
+	for (i = 0; i < MPGL_GRID_LOD_MAX; i++) {
+		MPGL_GridMeshRelease(&(draw->lod_grid[i].mesh));
+	}
 }
 
 static void GridQuads(int dir)
@@ -212,7 +427,7 @@ static void CzColor(MP_GridData *data, MPGL_Colormap *colormap, int x, int y, in
 	glColor3fv(color);
 }
 
-static void GridDispRange(MPGL_GridDrawData *draw, MP_GridData *data, int range[])
+void MPGL_GridDrawDispRange(MPGL_GridDrawData *draw, MP_GridData *data, int range[])
 {
 	int i;
 
@@ -225,9 +440,11 @@ static void GridDispRange(MPGL_GridDrawData *draw, MP_GridData *data, int range[
 	}
 }
 
-static void GridQuadsDraw(MPGL_GridDrawData *draw, MP_GridData *data, MPGL_Colormap *colormap)
+/* faces on the boundary of range by the quads lists, return the number of lists called */
+static int GridQuadsDraw(MPGL_GridDrawData *draw, MP_GridData *data, MPGL_Colormap *colormap)
 {
 	int x, y, z;
+	int n = 0;
 	int range[6];
 	void (*color_func)(MP_GridData *data, MPGL_Colormap *colormap, int x, int y, int z);
 
@@ -237,8 +454,8 @@ static void GridQuadsDraw(MPGL_GridDrawData *draw, MP_GridData *data, MPGL_Color
 	else if (draw->kind == MPGL_DrawKindCx && data->local_coef) color_func = CxColor;
 	else if (draw->kind == MPGL_DrawKindCy && data->local_coef) color_func = CyColor;
 	else if (draw->kind == MPGL_DrawKindCz && data->local_coef) color_func = CzColor;
-	else return;
-	GridDispRange(draw, data, range);
+	else return 0;
+	MPGL_GridDrawDispRange(draw, data, range);
 	x = range[0];
 	for (z = range[2];z <= range[5];z++) {
 		for (y = range[1];y <= range[4];y++) {
@@ -246,6 +463,7 @@ static void GridQuadsDraw(MPGL_GridDrawData *draw, MP_GridData *data, MPGL_Color
 			glPushMatrix();
 			glTranslatef((float)x, (float)y, (float)z);
 			glCallList(MPGL_GRID_QUADS_LIST0);
+			n++;
 			glPopMatrix();
 		}
 	}
@@ -256,6 +474,7 @@ static void GridQuadsDraw(MPGL_GridDrawData *draw, MP_GridData *data, MPGL_Color
 			glPushMatrix();
 			glTranslatef((float)x, (float)y, (float)z);
 			glCallList(MPGL_GRID_QUADS_LIST1);
+			n++;
 			glPopMatrix();
 		}
 	}
@@ -266,6 +485,7 @@ static void GridQuadsDraw(MPGL_GridDrawData *draw, MP_GridData *data, MPGL_Color
 			glPushMatrix();
 			glTranslatef((float)x, (float)y, (float)z);
 			glCallList(MPGL_GRID_QUADS_LIST2);
+			n++;
 			glPopMatrix();
 		}
 	}
@@ -276,6 +496,7 @@ static void GridQuadsDraw(MPGL_GridDrawData *draw, MP_GridData *data, MPGL_Color
 			glPushMatrix();
 			glTranslatef((float)x, (float)y, (float)z);
 			glCallList(MPGL_GRID_QUADS_LIST3);
+			n++;
 			glPopMatrix();
 		}
 	}
@@ -286,6 +507,7 @@ static void GridQuadsDraw(MPGL_GridDrawData *draw, MP_GridData *data, MPGL_Color
 			glPushMatrix();
 			glTranslatef((float)x, (float)y, (float)z);
 			glCallList(MPGL_GRID_QUADS_LIST4);
+			n++;
 			glPopMatrix();
 		}
 	}
@@ -296,101 +518,19 @@ static void GridQuadsDraw(MPGL_GridDrawData *draw, MP_GridData *data, MPGL_Color
 			glPushMatrix();
 			glTranslatef((float)x, (float)y, (float)z);
 			glCallList(MPGL_GRID_QUADS_LIST5);
+			n++;
 			glPopMatrix();
 		}
 	}
+	return n;
 }
 
-static void ValMinMax(MP_GridData *data, int x, int y, int z, double *min, double *max)
-{
-	int id = MP_GRID_INDEX(data, x, y, z);
-
-	if (data->val[id] < *min) *min = data->val[id];
-	if (data->val[id] > *max) *max = data->val[id];
-}
-
-static void CxMinMax(MP_GridData *data, int x, int y, int z, double *min, double *max)
-{
-	int id = MP_GRID_INDEX(data, x, y, z);
-
-	if (data->cx[id] < *min) *min = data->cx[id];
-	if (data->cx[id] > *max) *max = data->cx[id];
-}
-
-static void CyMinMax(MP_GridData *data, int x, int y, int z, double *min, double *max)
-{
-	int id = MP_GRID_INDEX(data, x, y, z);
-
-	if (data->cy[id] < *min) *min = data->cy[id];
-	if (data->cy[id] > *max) *max = data->cy[id];
-}
-
-static void CzMinMax(MP_GridData *data, int x, int y, int z, double *min, double *max)
-{
-	int id = MP_GRID_INDEX(data, x, y, z);
-
-	if (data->cz[id] < *min) *min = data->cz[id];
-	if (data->cz[id] > *max) *max = data->cz[id];
-}
-
-static void GridQuadsColormapRange(MPGL_GridDrawData *draw, MP_GridData *data, MPGL_Colormap *colormap)
-{
-	int x, y, z;
-	int range[6];
-	double min = 1.0e32;
-	double max = -1.0e32;
-	void (*minmax_func)(MP_GridData *data, int x, int y, int z, double *min, double *max);
-
-	if (draw->kind == MPGL_DrawKindVal) minmax_func = ValMinMax;
-	else if (draw->kind == MPGL_DrawKindCx && data->local_coef) minmax_func = CxMinMax;
-	else if (draw->kind == MPGL_DrawKindCy && data->local_coef) minmax_func = CyMinMax;
-	else if (draw->kind == MPGL_DrawKindCz && data->local_coef) minmax_func = CzMinMax;
-	else return;
-	GridDispRange(draw, data, range);
-	x = range[0];
-	for (z = range[2]; z <= range[5]; z++) {
-		for (y = range[1]; y <= range[4]; y++) {
-			(minmax_func)(data, x, y, z, &min, &max);
-		}
-	}
-	y = range[1];
-	for (z = range[2]; z <= range[5]; z++) {
-		for (x = range[0]; x <= range[3]; x++) {
-			(minmax_func)(data, x, y, z, &min, &max);
-		}
-	}
-	z = range[2];
-	for (y = range[1]; y <= range[4]; y++) {
-		for (x = range[0]; x <= range[3]; x++) {
-			(minmax_func)(data, x, y, z, &min, &max);
-		}
-	}
-	x = range[3];
-	for (z = range[2]; z <= range[5]; z++) {
-		for (y = range[1]; y <= range[4]; y++) {
-			(minmax_func)(data, x, y, z, &min, &max);
-		}
-	}
-	y = range[4];
-	for (z = range[2]; z <= range[5]; z++) {
-		for (x = range[0]; x <= range[3]; x++) {
-			(minmax_func)(data, x, y, z, &min, &max);
-		}
-	}
-	z = range[5];
-	for (y = range[1]; y <= range[4]; y++) {
-		for (x = range[0]; x <= range[3]; x++) {
-			(minmax_func)(data, x, y, z, &min, &max);
-		}
-	}
-	colormap->range[0] = min;
-	colormap->range[1] = max;
-}
-
-static void GridCubesDraw(MPGL_GridDrawData *draw, MP_GridData *data, MPGL_Colormap *colormap)
+/* displayed cells by the cube list, return the number of lists called */
+static int GridCubesDraw(MPGL_GridDrawData *draw, MP_GridData *data, MPGL_Colormap *colormap)
 {
 	int id;
 	int x, y, z;
+	int n = 0;
 	int range[6];
 	void (*color_func)(MP_GridData *data, MPGL_Colormap *colormap, int x, int y, int z);
 
@@ -400,8 +540,8 @@ static void GridCubesDraw(MPGL_GridDrawData *draw, MP_GridData *data, MPGL_Color
 	else if (draw->kind == MPGL_DrawKindCx && data->local_coef) color_func = CxColor;
 	else if (draw->kind == MPGL_DrawKindCy && data->local_coef) color_func = CyColor;
 	else if (draw->kind == MPGL_DrawKindCz && data->local_coef) color_func = CzColor;
-	else return;
-	GridDispRange(draw, data, range);
+	else return 0;
+	MPGL_GridDrawDispRange(draw, data, range);
 	for (z = range[2]; z <= range[5]; z++) {
 		for (y = range[1]; y <= range[4]; y++) {
 			for (x = range[0]; x <= range[3]; x++) {
@@ -411,46 +551,13 @@ static void GridCubesDraw(MPGL_GridDrawData *draw, MP_GridData *data, MPGL_Color
 					glPushMatrix();
 					glTranslatef((float)x, (float)y, (float)z);
 					glCallList(MPGL_GRID_CUBE_LIST);
+					n++;
 					glPopMatrix();
 				}
 			}
 		}
 	}
-}
-
-static void GridCubesColormapRange(MPGL_GridDrawData *draw, MP_GridData *data, MPGL_Colormap *colormap)
-{
-	int id;
-	int x, y, z;
-	int range[6];
-	double min = 1.0e32;
-	double max = -1.0e32;
-	void (*minmax_func)(MP_GridData *data, int x, int y, int z, double *min, double *max);
-
-	if (draw->kind == MPGL_DrawKindVal) minmax_func = ValMinMax;
-	else if (draw->kind == MPGL_DrawKindCx && data->local_coef) minmax_func = CxMinMax;
-	else if (draw->kind == MPGL_DrawKindCy && data->local_coef) minmax_func = CyMinMax;
-	else if (draw->kind == MPGL_DrawKindCz && data->local_coef) minmax_func = CzMinMax;
-	else return;
-	GridDispRange(draw, data, range);
-	for (z = range[2]; z <= range[5]; z++) {
-		for (y = range[1]; y <= range[4]; y++) {
-			for (x = range[0]; x <= range[3]; x++) {
-				id = MP_GRID_INDEX(data, x, y, z);
-				if (draw->disp[data->type[id]]) {
-					(minmax_func)(data, x, y, z, &min, &max);
-				}
-			}
-		}
-	}
-	colormap->range[0] = min;
-	colormap->range[1] = max;
-}
-
-void MPGL_GridDrawColormapRange(MPGL_GridDrawData *draw, MP_GridData *data, MPGL_Colormap *colormap)
-{
-	if (draw->method == MPGL_DrawMethodQuads) GridQuadsColormapRange(draw, data, colormap);
-	else if (draw->method == MPGL_DrawMethodCubes) GridCubesColormapRange(draw, data, colormap);
+	return n;
 }
 
 static void ElementScale(MP_GridData *data, float scale[])
@@ -466,167 +573,1522 @@ static void ElementScale(MP_GridData *data, float scale[])
 	}
 }
 
-void MPGL_GridDraw(MPGL_GridDrawData *draw, MP_GridData *data, MPGL_Colormap *colormap)
+static int GridDrawTexture(MPGL_GridDrawData *draw)
+{
+	return (draw->texture && draw->kind >= MPGL_DrawKindVal && draw->method != MPGL_DrawMethodIsosurface
+		&& MPGL_ExtSupport(MPGL_ExtTexture));
+}
+
+/* key of grid data and displayed cells */
+static void GridDataKey(MPGL_GridDrawData *draw, MP_GridData *data, MPGL_GridDrawKey *key)
 {
 	int i;
-	float scale[3];
 
-	if (draw->kind == MPGL_DrawKindType) {
-		colormap->mode = MPGL_ColormapStep;
-		sprintf(colormap->title, "Type");
-		colormap->nstep = data->ntype;
-		for (i = 0;i < data->ntype;i++) {
-			sprintf(colormap->label[i], "%d", i);
-		}
-	}
-	else if (draw->kind == MPGL_DrawKindUpdate) {
-		colormap->mode = MPGL_ColormapStep;
-		sprintf(colormap->title, "Update");
-		colormap->nstep = 2;
-		sprintf(colormap->label[0], "F");
-		sprintf(colormap->label[1], "T");
-	}
-	else if (draw->kind == MPGL_DrawKindVal) {
-		colormap->mode = MPGL_ColormapGrad;
-		sprintf(colormap->title, "Value");
-	}
-	else if (draw->kind == MPGL_DrawKindCx) {
-		colormap->mode = MPGL_ColormapGrad;
-		sprintf(colormap->title, "Cx");
-	}
-	else if (draw->kind == MPGL_DrawKindCy) {
-		colormap->mode = MPGL_ColormapGrad;
-		sprintf(colormap->title, "Cy");
-	}
-	else if (draw->kind == MPGL_DrawKindCz) {
-		colormap->mode = MPGL_ColormapGrad;
-		sprintf(colormap->title, "Cz");
-	}
-	ElementScale(data, scale);
-	glPushMatrix();
-	glScalef(scale[0], scale[1], scale[2]);
-	if (draw->method == MPGL_DrawMethodQuads) GridQuadsDraw(draw, data, colormap);
-	else if (draw->method == MPGL_DrawMethodCubes) GridCubesDraw(draw, data, colormap);
-	glPopMatrix();
+	memset(key, 0, sizeof(MPGL_GridDrawKey));
+	key->data = data;
+	key->type = data->type;
+	key->update = data->update;
+	key->val = data->val;
+	for (i = 0; i < 3; i++) key->size[i] = data->size[i];
+	key->step = data->step;
+	key->local_coef = data->local_coef;
+	key->method = draw->method;
+	key->kind = draw->kind;
+	MPGL_GridDrawDispRange(draw, data, key->range);
+	for (i = 0; i < MPGL_GRID_TYPE_MAX; i++) key->disp[i] = draw->disp[i];
 }
 
-void MPGL_GridDrawAxis(int size[])
+static void GridDrawKey(MPGL_GridDrawData *draw, MP_GridData *data, MPGL_Colormap *colormap, MPGL_GridDrawKey *key)
 {
-	glPushMatrix();
-	glRotatef(90.0f, 0.0f, 1.0f, 0.0f);
-	glScalef(0.5f, 0.5f, (float)size[0]);
-	glColor3f(1.0f, 0.0f, 0.0f);
-	glCallList(MPGL_GRID_CYLINDER_LIST);
-	glPopMatrix();
-	glPushMatrix();
-	glRotatef(-90.0f, 1.0f, 0.0f, 0.0f);
-	glScalef(0.5f, 0.5f, (float)size[1]);
-	glColor3f(0.0f, 1.0f, 0.0f);
-	glCallList(MPGL_GRID_CYLINDER_LIST);
-	glPopMatrix();
-	glPushMatrix();
-	glScalef(0.5f, 0.5f, (float)size[2]);
-	glColor3f(0.0f, 0.0f, 1.0f);
-	glCallList(MPGL_GRID_CYLINDER_LIST);
-	glPopMatrix();
+	GridDataKey(draw, data, key);
+	key->merge = draw->merge;
+	key->texture = draw->texture;
+	if (draw->method == MPGL_DrawMethodIsosurface) {
+		key->iso_level = draw->iso_level;
+		key->iso_color = draw->iso_color;
+	}
+	/* gradation colors of textured geometry are applied at draw time */
+	if (GridDrawTexture(draw)) return;
+	key->nstep = colormap->nstep;
+	memcpy(key->step_color, colormap->step_color, sizeof(key->step_color));
+	key->ngrad = colormap->ngrad;
+	memcpy(key->grad_color, colormap->grad_color, sizeof(key->grad_color));
+	key->cmp_range[0] = colormap->range[0];
+	key->cmp_range[1] = colormap->range[1];
 }
 
-void MPGL_GridDrawRegion(MPGL_GridDrawData *draw, MP_GridData *data, float region[])
+/* statistics of displayed values by one pass over grid data as it is now,
+   percentiles and histograms of the call are taken from the values of the pass */
+int MPGL_GridDrawStats(MPGL_GridDrawData *draw, MP_GridData *data)
 {
-	int i;
-	int range[6];
-	float scale[3];
+	return MPGL_GridStatsBuild(&(draw->stats), draw, data);
+}
 
-	GridDispRange(draw, data, range);
-	ElementScale(data, scale);
-	for (i = 0; i < 3; i++) {
-		region[i] = (range[i] - 0.5f) * scale[i];
-		region[i + 3] = (range[i + 3] + 0.5f) * scale[i];
+/* set colormap range to lower and upper percentiles of displayed values */
+/* range is left unchanged if no value is displayed */
+static int GridPercentileRange(MPGL_GridDrawData *draw, MP_GridData *data, double lower, double upper, double range[])
+{
+	double v[2];
+
+	if (!MPGL_GridDrawStats(draw, data)) return FALSE;
+	if (draw->stats.count > 0) {
+		MPGL_GridStatsPercentile(&(draw->stats), lower, &(v[0]));
+		MPGL_GridStatsPercentile(&(draw->stats), upper, &(v[1]));
+		range[0] = v[0];
+		range[1] = v[1];
 	}
+	return TRUE;
 }
 
-/**********************************************************
-* for Python
-**********************************************************/
-#ifdef MP_PYTHON_LIB
-
-static void PyDealloc(MPGL_GridDrawData *self)
+int MPGL_GridDrawColormapPercentile(MPGL_GridDrawData *draw, MP_GridData *data, MPGL_Colormap *colormap,
+	double lower, double upper)
 {
-#ifndef PY3
-	self->ob_type->tp_free((PyObject*)self);
-#endif
+	return GridPercentileRange(draw, data, lower, upper, colormap->range);
 }
 
-static PyObject *PyNew(PyTypeObject *type, PyObject *args, PyObject *kwds)
+void MPGL_GridDrawColormapRange(MPGL_GridDrawData *draw, MP_GridData *data, MPGL_Colormap *colormap)
 {
-	MPGL_GridDrawData *self;
-
-	self = (MPGL_GridDrawData *)type->tp_alloc(type, 0);
-	MPGL_GridDrawInit(self);
-	return (PyObject *)self;
+	MPGL_GridDrawColormapPercentile(draw, data, colormap, 0.0, 100.0);
 }
 
-static PyObject *PyGridDrawList(MPGL_GridDrawData *self, PyObject *args)
+enum { GridKeySame, GridKeyStep, GridKeyColor, GridKeyGeometry };
+
+/* compare key with the cached one, return what has changed */
+static int GridDrawKeyCompare(int cached, MPGL_GridDrawKey *cache, MPGL_GridDrawKey *key)
 {
-	MPGL_GridDrawList();
-	Py_RETURN_NONE;
+	MPGL_GridDrawKey tmp;
+
+	if (!cached) return GridKeyGeometry;
+	if (memcmp(key, cache, sizeof(MPGL_GridDrawKey)) == 0) return GridKeySame;
+	memcpy(&tmp, cache, sizeof(MPGL_GridDrawKey));
+	tmp.step = key->step;
+	if (memcmp(key, &tmp, sizeof(MPGL_GridDrawKey)) == 0) return GridKeyStep;
+	tmp.nstep = key->nstep;
+	memcpy(tmp.step_color, key->step_color, sizeof(tmp.step_color));
+	tmp.ngrad = key->ngrad;
+	memcpy(tmp.grad_color, key->grad_color, sizeof(tmp.grad_color));
+	tmp.cmp_range[0] = key->cmp_range[0];
+	tmp.cmp_range[1] = key->cmp_range[1];
+	if (memcmp(key, &tmp, sizeof(MPGL_GridDrawKey)) == 0) return GridKeyColor;
+	return GridKeyGeometry;
 }
 
-static PyObject *PyGridDrawColormapRange(MPGL_GridDrawData *self, PyObject *args, PyObject *kwds)
+/* number of cells in displayed range */
+static long long GridRangeCells(int range[])
 {
-	MP_GridData *data;
-	MPGL_Colormap *cmp;
-	static char *kwlist[] = { "grid", "cmp", NULL };
+	int i;
+	long long n = 1;
 
-	if (!PyArg_ParseTupleAndKeywords(args, kwds, "OO!", kwlist, &data, &MPGL_ColormapPyType, &cmp)) {
-		return NULL;
+	for (i = 0; i < 3; i++) {
+		if (range[i + 3] < range[i]) return 0;
+		n *= range[i + 3] - range[i] + 1;
 	}
-	MPGL_GridDrawColormapRange(self, data, cmp);
-	Py_RETURN_NONE;
+	return n;
 }
 
-static PyObject *PyGridDraw(MPGL_GridDrawData *self, PyObject *args, PyObject *kwds)
+/* bytes of buffers uploaded by MPGL_GridMeshUpload */
+static long long GridMeshBytes(MPGL_GridMesh *mesh)
 {
-	MP_GridData *data;
-	MPGL_Colormap *cmp;
-	static char *kwlist[] = { "grid", "cmp", NULL };
-
-	if (!PyArg_ParseTupleAndKeywords(args, kwds, "OO!", kwlist, &data, &MPGL_ColormapPyType, &cmp)) {
-		return NULL;
-	}
-	MPGL_GridDraw(self, data, cmp);
-	Py_RETURN_NONE;
+	if (!MPGL_ExtSupport(MPGL_ExtBuffer)) return 0;
+	return (long long)mesh->nvertex * (6 * sizeof(float) + (mesh->texture ? sizeof(float) : 4))
+		+ (long long)mesh->nindex * sizeof(unsigned int);
 }
 
-static PyObject *PyGridDrawAxis(MPGL_GridDrawData *self, PyObject *args, PyObject *kwds)
+/* bytes of colors or values to be uploaded by MPGL_GridMeshUploadColor */
+static long long GridMeshColorBytes(MPGL_GridMesh *mesh)
 {
-	int sx, sy, sz;
-	static char *kwlist[] = { "size", NULL };
-	int size[3];
-
-	if (!PyArg_ParseTupleAndKeywords(args, kwds, "(iii)", kwlist, &sx, &sy, &sz)) {
-		return NULL;
-	}
-	size[0] = sx, size[1] = sy, size[2] = sz;
-	MPGL_GridDrawAxis(size);
-	Py_RETURN_NONE;
+	if (mesh->dirty[0] > mesh->dirty[1] || mesh->buffer[0] == 0 || !MPGL_ExtSupport(MPGL_ExtBuffer)) return 0;
+	return (long long)(mesh->dirty[1] - mesh->dirty[0] + 1) * 16;
 }
 
-static PyObject *PyGridDrawRegion(MPGL_GridDrawData *self, PyObject *args, PyObject *kwds)
+/* upload colors of mesh and draw it, timed as upload and submit stages */
+/* isosurfaces cut by range are open, both sides are drawn and lit with the front material */
+static void GridTwoSideBegin(void)
 {
-	MP_GridData *data;
-	static char *kwlist[] = { "grid", NULL };
-	float region[6];
+	float specular[4], emission[4], shininess;
+
+	glPushAttrib(GL_ENABLE_BIT | GL_LIGHTING_BIT);
+	glDisable(GL_CULL_FACE);
+	glLightModeli(GL_LIGHT_MODEL_TWO_SIDE, GL_TRUE);
+	glColorMaterial(GL_FRONT_AND_BACK, GL_AMBIENT_AND_DIFFUSE);
+	glGetMaterialfv(GL_FRONT, GL_SPECULAR, specular);
+	glGetMaterialfv(GL_FRONT, GL_EMISSION, emission);
+	glGetMaterialfv(GL_FRONT, GL_SHININESS, &shininess);
+	glMaterialfv(GL_BACK, GL_SPECULAR, specular);
+	glMaterialfv(GL_BACK, GL_EMISSION, emission);
+	glMaterialf(GL_BACK, GL_SHININESS, shininess);
+}
 
-	if (!PyArg_ParseTupleAndKeywords(args, kwds, "O", kwlist, &data)) {
-		return NULL;
-	}
-	MPGL_GridDrawRegion(self, data, region);
-	return Py_BuildValue("dddddd", region[0], region[1], region[2],
-		region[3], region[4], region[5]);
+static void GridMeshSubmit(MPGL_GridDrawData *draw, MPGL_GridMesh *mesh)
+{
+	double t = GridProfileStart(draw);
+	long long bytes = GridMeshColorBytes(mesh);
+
+	MPGL_GridMeshUploadColor(mesh);
+	GridProfileAdd(draw, MPGL_ProfileUpload, t, 0, 0, 0, bytes);
+	t = GridProfileStart(draw);
+	if (draw->method == MPGL_DrawMethodIsosurface) GridTwoSideBegin();
+	MPGL_GridMeshDraw(mesh);
+	if (draw->method == MPGL_DrawMethodIsosurface) glPopAttrib();
+	GridProfileAdd(draw, MPGL_ProfileSubmit, t, 0, mesh->nindex / 3, (mesh->nindex > 0), 0);
 }
 
-static PyObject *PyGridDrawGetDisp(MPGL_GridDrawData *self, PyObject *args, PyObject *kwds)
+/* draw mesh cached with key, geometry is built again only if it has changed */
+static int GridBufferDraw(MPGL_GridDrawData *draw, MP_GridData *data, MPGL_Colormap *colormap,
+	MPGL_GridMesh *mesh, MPGL_GridDrawKey *cache, int *cached)
+{
+	int change;
+	double t = GridProfileStart(draw);
+	MPGL_GridDrawKey key;
+
+	GridDrawKey(draw, data, colormap, &key);
+	change = GridDrawKeyCompare(*cached, cache, &key);
+	if (change == GridKeySame) {
+		draw->nhit++;
+	}
+	else if (change == GridKeyStep
+		&& MPGL_GridMeshRefresh(mesh, draw, data, colormap, MPGL_GridRefreshUpdate, NULL) >= 0) {
+		memcpy(cache, &key, sizeof(MPGL_GridDrawKey));
+		draw->nrefresh++;
+		GridProfileAdd(draw, MPGL_ProfileColor, t, 0, 0, 0, 0);
+	}
+	else if (change == GridKeyColor
+		&& MPGL_GridMeshRefresh(mesh, draw, data, colormap, MPGL_GridRefreshAll, NULL) >= 0) {
+		memcpy(cache, &key, sizeof(MPGL_GridDrawKey));
+		draw->nrefresh++;
+		GridProfileAdd(draw, MPGL_ProfileColor, t, 0, 0, 0, 0);
+	}
+	else {
+		*cached = FALSE;
+		mesh->texture = GridDrawTexture(draw);
+		if (!MPGL_GridMeshBuild(mesh, draw, data, colormap)) return FALSE;
+		GridProfileAdd(draw, MPGL_ProfileTraversal, t, GridRangeCells(key.range), 0, 0, 0);
+		t = GridProfileStart(draw);
+		MPGL_GridMeshUpload(mesh);
+		GridProfileAdd(draw, MPGL_ProfileUpload, t, 0, 0, 0, GridMeshBytes(mesh));
+		memcpy(cache, &key, sizeof(MPGL_GridDrawKey));
+		*cached = TRUE;
+		draw->nbuild++;
+	}
+	t = GridProfileStart(draw);
+	MPGL_GridMeshUploadTexture(mesh, colormap);
+	GridProfileAdd(draw, MPGL_ProfileUpload, t, 0, 0, 0, 0);
+	GridMeshSubmit(draw, mesh);
+	return TRUE;
+}
+
+static int GridBrickMode(MPGL_GridDrawData *draw)
+{
+	return (draw->brick > 0 && draw->render == MPGL_DrawRenderBuffer
+		&& (draw->method == MPGL_DrawMethodQuads || draw->method == MPGL_DrawMethodCubes));
+}
+
+/* bricks of brick cells in each direction tiling range from its lower corner */
+static int GridBricksAlloc(MPGL_GridDrawData *draw, int range[])
+{
+	int i, x, y, z;
+	int n = 1;
+	int count[3];
+	MPGL_GridBrick *brick;
+
+	GridBricksFree(draw);
+	for (i = 0; i < 3; i++) {
+		count[i] = (range[i] <= range[i + 3]) ? (range[i + 3] - range[i] + draw->brick) / draw->brick : 0;
+		n *= count[i];
+	}
+	if (n > 0) {
+		draw->bricks = (MPGL_GridBrick *)malloc(n * sizeof(MPGL_GridBrick));
+		if (draw->bricks == NULL) return FALSE;
+	}
+	brick = draw->bricks;
+	for (z = 0; z < count[2]; z++) {
+		for (y = 0; y < count[1]; y++) {
+			for (x = 0; x < count[0]; x++, brick++) {
+				MPGL_GridBrickInit(brick);
+				brick->range[0] = range[0] + x * draw->brick;
+				brick->range[1] = range[1] + y * draw->brick;
+				brick->range[2] = range[2] + z * draw->brick;
+				for (i = 0; i < 3; i++) {
+					brick->range[i + 3] = (brick->range[i] + draw->brick - 1 < range[i + 3]) ? brick->range[i] + draw->brick - 1 : range[i + 3];
+				}
+			}
+		}
+	}
+	draw->nbrick = n;
+	for (i = 0; i < 3; i++) {
+		draw->brick_count[i] = count[i];
+	}
+	return TRUE;
+}
+
+/* mark bricks affected by changes from the cached key, bricks with cells of types whose display flags
+   have changed are built again and bricks with updated cells are recolored at a new step of value kinds,
+   return FALSE if bricks have to be tiled again */
+static int GridBricksMark(MPGL_GridDrawData *draw, MPGL_GridDrawKey *key)
+{
+	int i;
+	int dirty = MPGL_GridBrickClean;
+	int ntype = 0;
+	unsigned char types[MPGL_GRID_TYPE_MAX / 8];
+	MPGL_GridDrawKey tmp;
+	MPGL_GridDrawKey *cache = &(draw->brick_key);
+	MPGL_GridBrick *brick;
+
+	if (!draw->brick_cached) return FALSE;
+	memcpy(&tmp, key, sizeof(MPGL_GridDrawKey));
+	tmp.step = cache->step;
+	memcpy(tmp.disp, cache->disp, sizeof(tmp.disp));
+	tmp.nstep = cache->nstep;
+	memcpy(tmp.step_color, cache->step_color, sizeof(tmp.step_color));
+	tmp.ngrad = cache->ngrad;
+	memcpy(tmp.grad_color, cache->grad_color, sizeof(tmp.grad_color));
+	tmp.cmp_range[0] = cache->cmp_range[0];
+	tmp.cmp_range[1] = cache->cmp_range[1];
+	if (memcmp(&tmp, cache, sizeof(MPGL_GridDrawKey)) != 0) return FALSE;
+	memset(types, 0, sizeof(types));
+	for (i = 0; i < MPGL_GRID_TYPE_MAX; i++) {
+		if (key->disp[i] != cache->disp[i]) {
+			types[i / 8] |= 1 << (i % 8);
+			ntype++;
+		}
+	}
+	if (key->nstep != cache->nstep || memcmp(key->step_color, cache->step_color, sizeof(key->step_color)) != 0
+		|| key->ngrad != cache->ngrad || memcmp(key->grad_color, cache->grad_color, sizeof(key->grad_color)) != 0
+		|| key->cmp_range[0] != cache->cmp_range[0] || key->cmp_range[1] != cache->cmp_range[1]) {
+		dirty = MPGL_GridBrickColor;
+	}
+	else if (key->step != cache->step && key->kind >= MPGL_DrawKindVal) {
+		dirty = MPGL_GridBrickUpdate;
+	}
+	for (i = 0; i < draw->nbrick; i++) {
+		brick = &(draw->bricks[i]);
+		if (ntype > 0 && MPGL_GridBrickHasTypes(brick, types)) brick->dirty = MPGL_GridBrickGeometry;
+		else if (dirty > brick->dirty && (dirty != MPGL_GridBrickUpdate || brick->nupdate > 0)) brick->dirty = dirty;
+	}
+	return TRUE;
+}
+
+/* planes of view frustum in current model coordinates by projection and modelview matrices */
+static void GridFrustum(float plane[6][4])
+{
+	int i, j, k;
+	float mv[16], pr[16];
+	float m[4][4];
+
+	glGetFloatv(GL_MODELVIEW_MATRIX, mv);
+	glGetFloatv(GL_PROJECTION_MATRIX, pr);
+	for (i = 0; i < 4; i++) {
+		for (j = 0; j < 4; j++) {
+			m[i][j] = 0.0f;
+			for (k = 0; k < 4; k++) m[i][j] += pr[k * 4 + i] * mv[j * 4 + k];
+		}
+	}
+	for (i = 0; i < 3; i++) {
+		for (j = 0; j < 4; j++) {
+			plane[2 * i][j] = m[3][j] + m[i][j];
+			plane[2 * i + 1][j] = m[3][j] - m[i][j];
+		}
+	}
+}
+
+/* draw bricks in view frustum, a brick is built or recolored only if it is dirty */
+static int GridBricksDraw(MPGL_GridDrawData *draw, MP_GridData *data, MPGL_Colormap *colormap)
+{
+	int i, n;
+	int nbuild = draw->nbuild, nrefresh = draw->nrefresh;
+	double t;
+	float plane[6][4];
+	MPGL_GridDrawKey key;
+	MPGL_GridBrick *brick;
+	MPGL_GridMesh *mesh;
+
+	GridDrawKey(draw, data, colormap, &key);
+	key.brick = draw->brick;
+	if (!GridBricksMark(draw, &key) && !GridBricksAlloc(draw, key.range)) return FALSE;
+	memcpy(&(draw->brick_key), &key, sizeof(MPGL_GridDrawKey));
+	draw->brick_cached = TRUE;
+	/* gradation table of textured bricks is held by the mesh of draw */
+	draw->mesh.texture = GridDrawTexture(draw);
+	MPGL_GridMeshUploadTexture(&(draw->mesh), colormap);
+	GridFrustum(plane);
+	draw->nculled = 0;
+	for (i = 0; i < draw->nbrick; i++) {
+		brick = &(draw->bricks[i]);
+		mesh = &(brick->mesh);
+		if (!MPGL_GridBrickVisible(brick, plane, 6)) {
+			draw->nculled++;
+			continue;
+		}
+		if (brick->dirty == MPGL_GridBrickUpdate || brick->dirty == MPGL_GridBrickColor) {
+			t = GridProfileStart(draw);
+			n = MPGL_GridMeshRefresh(mesh, draw, data, colormap,
+				(brick->dirty == MPGL_GridBrickUpdate) ? MPGL_GridRefreshUpdate : MPGL_GridRefreshAll, NULL);
+			brick->dirty = (n >= 0) ? MPGL_GridBrickClean : MPGL_GridBrickGeometry;
+			if (n >= 0) draw->nrefresh++;
+			GridProfileAdd(draw, MPGL_ProfileColor, t, 0, 0, 0, 0);
+		}
+		if (brick->dirty == MPGL_GridBrickGeometry) {
+			/* bricks are uploaded as they are built */
+			t = GridProfileStart(draw);
+			mesh->texture = draw->mesh.texture;
+			if (!MPGL_GridBrickBuild(brick, draw, data, colormap, key.range)) continue;
+			draw->nbuild++;
+			GridProfileAdd(draw, MPGL_ProfileTraversal, t, GridRangeCells(brick->range), 0, 0, GridMeshBytes(mesh));
+		}
+		if (mesh->texture) {
+			mesh->texture_name = draw->mesh.texture_name;
+			mesh->texture_range[0] = draw->mesh.texture_range[0];
+			mesh->texture_range[1] = draw->mesh.texture_range[1];
+		}
+		GridMeshSubmit(draw, mesh);
+	}
+	if (draw->nbuild == nbuild && draw->nrefresh == nrefresh) draw->nhit++;
+	return TRUE;
+}
+
+/* refresh colors of bricks in place, bricks with merged faces are built again at next draw */
+static int GridBricksRefresh(MPGL_GridDrawData *draw, MP_GridData *data, MPGL_Colormap *colormap, const unsigned char mask[])
+{
+	int i, n, mode;
+	int total = 0;
+	MPGL_GridDrawKey key;
+	MPGL_GridBrick *brick;
+
+	GridDrawKey(draw, data, colormap, &key);
+	key.brick = draw->brick;
+	if (!GridBricksMark(draw, &key)) {
+		draw->brick_cached = FALSE;
+		return -1;
+	}
+	memcpy(&(draw->brick_key), &key, sizeof(MPGL_GridDrawKey));
+	for (i = 0; i < draw->nbrick; i++) {
+		brick = &(draw->bricks[i]);
+		if (brick->dirty == MPGL_GridBrickGeometry) continue;
+		if (brick->dirty == MPGL_GridBrickColor) mode = MPGL_GridRefreshAll;
+		else mode = (mask != NULL) ? MPGL_GridRefreshMask : MPGL_GridRefreshUpdate;
+		n = MPGL_GridMeshRefresh(&(brick->mesh), draw, data, colormap, mode, mask);
+		if (n < 0) {
+			brick->dirty = MPGL_GridBrickGeometry;
+		}
+		else {
+			brick->dirty = MPGL_GridBrickClean;
+			total += n;
+		}
+	}
+	draw->nrefresh++;
+	return total;
+}
+
+/* mark cells from p0 to p1 as edited, caches of grid data are invalidated except bricks not touching them */
+void MPGL_GridDrawTouch(MPGL_GridDrawData *draw, int p0[], int p1[])
+{
+	int i, x, y, z;
+	int lo, hi;
+	int b0[3], b1[3];
+	int brick_cached = draw->brick_cached;
+	int *range = draw->brick_key.range;
+
+	MPGL_GridDrawInvalidate(draw);
+	if (!brick_cached) return;
+	draw->brick_cached = TRUE;
+	for (i = 0; i < 3; i++) {
+		lo = (p0[i] < p1[i]) ? p0[i] : p1[i];
+		hi = (p0[i] < p1[i]) ? p1[i] : p0[i];
+		/* exposed faces of neighbor cells change */
+		lo = (lo - 1 > range[i]) ? lo - 1 : range[i];
+		hi = (hi + 1 < range[i + 3]) ? hi + 1 : range[i + 3];
+		if (lo > hi) return;
+		b0[i] = (lo - range[i]) / draw->brick_key.brick;
+		b1[i] = (hi - range[i]) / draw->brick_key.brick;
+	}
+	for (z = b0[2]; z <= b1[2]; z++) {
+		for (y = b0[1]; y <= b1[1]; y++) {
+			for (x = b0[0]; x <= b1[0]; x++) {
+				draw->bricks[(z * draw->brick_count[1] + y) * draw->brick_count[0] + x].dirty = MPGL_GridBrickGeometry;
+			}
+		}
+	}
+}
+
+int MPGL_GridDrawRefresh(MPGL_GridDrawData *draw, MP_GridData *data, MPGL_Colormap *colormap, const unsigned char mask[])
+{
+	int n, mode;
+	MPGL_GridDrawKey key;
+
+	if (GridBrickMode(draw)) return GridBricksRefresh(draw, data, colormap, mask);
+
+	GridDrawKey(draw, data, colormap, &key);
+	switch (GridDrawKeyCompare(draw->cached, &(draw->key), &key)) {
+	case GridKeySame:
+	case GridKeyStep:
+		mode = (mask != NULL) ? MPGL_GridRefreshMask : MPGL_GridRefreshUpdate;
+		break;
+	case GridKeyColor:
+		mode = MPGL_GridRefreshAll;
+		break;
+	default:
+		draw->cached = FALSE;
+		return -1;
+	}
+	n = MPGL_GridMeshRefresh(&(draw->mesh), draw, data, colormap, mode, mask);
+	if (n < 0) {
+		draw->cached = FALSE;
+		return -1;
+	}
+	memcpy(&(draw->key), &key, sizeof(MPGL_GridDrawKey));
+	draw->nrefresh++;
+	return n;
+}
+
+/* kind of colors, isosurface may be colored by another kind */
+static int GridColorKind(MPGL_GridDrawData *draw)
+{
+	if (draw->method == MPGL_DrawMethodIsosurface
+		&& draw->iso_color >= MPGL_DrawKindType && draw->iso_color <= MPGL_DrawKindCz) return draw->iso_color;
+	return draw->kind;
+}
+
+static void GridColormap(MPGL_GridDrawData *draw, MP_GridData *data, MPGL_Colormap *colormap)
+{
+	int i;
+	int kind = GridColorKind(draw);
+
+	if (kind == MPGL_DrawKindType) {
+		colormap->mode = MPGL_ColormapStep;
+		sprintf(colormap->title, "Type");
+		colormap->nstep = data->ntype;
+		for (i = 0;i < data->ntype;i++) {
+			sprintf(colormap->label[i], "%d", i);
+		}
+	}
+	else if (kind == MPGL_DrawKindUpdate) {
+		colormap->mode = MPGL_ColormapStep;
+		sprintf(colormap->title, "Update");
+		colormap->nstep = 2;
+		sprintf(colormap->label[0], "F");
+		sprintf(colormap->label[1], "T");
+	}
+	else if (kind == MPGL_DrawKindVal) {
+		colormap->mode = MPGL_ColormapGrad;
+		sprintf(colormap->title, "Value");
+	}
+	else if (kind == MPGL_DrawKindCx) {
+		colormap->mode = MPGL_ColormapGrad;
+		sprintf(colormap->title, "Cx");
+	}
+	else if (kind == MPGL_DrawKindCy) {
+		colormap->mode = MPGL_ColormapGrad;
+		sprintf(colormap->title, "Cy");
+	}
+	else if (kind == MPGL_DrawKindCz) {
+		colormap->mode = MPGL_ColormapGrad;
+		sprintf(colormap->title, "Cz");
+	}
+}
+
+/* exposed cells as instanced cubes, return FALSE if instancing is not supported */
+static int GridInstanceDraw(MPGL_GridDrawData *draw, MP_GridData *data, MPGL_Colormap *colormap, MPGL_GridInstance *instance)
+{
+	int nbuild = instance->nbuild;
+	int range[6];
+	double t = GridProfileStart(draw);
+
+	if (!MPGL_GridInstanceDraw(instance, draw, data, colormap)) return FALSE;
+	/* frames building instances are timed as traversal */
+	if (instance->nbuild > nbuild) {
+		draw->nbuild++;
+		MPGL_GridDrawDispRange(draw, data, range);
+		GridProfileAdd(draw, MPGL_ProfileTraversal, t, GridRangeCells(range), 12LL * instance->ninstance, 1,
+			12LL * instance->ninstance);
+	}
+	else {
+		draw->nhit++;
+		GridProfileAdd(draw, MPGL_ProfileSubmit, t, 0, 12LL * instance->ninstance, 1, 0);
+	}
+	return TRUE;
+}
+
+/* cells by the lists, timed as submit stage */
+static void GridListDraw(MPGL_GridDrawData *draw, MP_GridData *data, MPGL_Colormap *colormap)
+{
+	int n;
+	int range[6];
+	double t = GridProfileStart(draw);
+
+	if (draw->method == MPGL_DrawMethodQuads) {
+		n = GridQuadsDraw(draw, data, colormap);
+		GridProfileAdd(draw, MPGL_ProfileSubmit, t, n, 2LL * n, n, 0);
+	}
+	else if (draw->method == MPGL_DrawMethodCubes) {
+		n = GridCubesDraw(draw, data, colormap);
+		MPGL_GridDrawDispRange(draw, data, range);
+		GridProfileAdd(draw, MPGL_ProfileSubmit, t, GridRangeCells(range), 12LL * n, n, 0);
+	}
+}
+
+/* cubes of instance render fall back to list rendering without instancing */
+static void GridCellsDraw(MPGL_GridDrawData *draw, MP_GridData *data, MPGL_Colormap *colormap,
+	MPGL_GridMesh *mesh, MPGL_GridDrawKey *cache, int *cached, MPGL_GridInstance *instance)
+{
+	/* isosurface has no list rendering */
+	if ((draw->render == MPGL_DrawRenderBuffer || draw->method == MPGL_DrawMethodIsosurface)
+		&& GridBufferDraw(draw, data, colormap, mesh, cache, cached));
+	else if (draw->render == MPGL_DrawRenderInstance && draw->method == MPGL_DrawMethodCubes
+		&& GridInstanceDraw(draw, data, colormap, instance));
+	else GridListDraw(draw, data, colormap);
+}
+
+/* cells of draw by bricks if they are set */
+static void GridBaseDraw(MPGL_GridDrawData *draw, MP_GridData *data, MPGL_Colormap *colormap)
+{
+	if (GridBrickMode(draw) && GridBricksDraw(draw, data, colormap));
+	else GridCellsDraw(draw, data, colormap, &(draw->mesh), &(draw->key), &(draw->cached), &(draw->instance));
+}
+
+/* draw cells with parameters derived from draw, counters are added to draw */
+static void GridParamsDraw(MPGL_GridDrawData *draw, MPGL_GridDrawData *params, MP_GridData *data, MPGL_Colormap *colormap,
+	MPGL_GridMesh *mesh, MPGL_GridDrawKey *cache, int *cached, MPGL_GridInstance *instance)
+{
+	params->nhit = params->nbuild = params->nrefresh = 0;
+	GridCellsDraw(params, data, colormap, mesh, cache, cached, instance);
+	draw->frame = params->frame;
+	draw->nhit += params->nhit;
+	draw->nbuild += params->nbuild;
+	draw->nrefresh += params->nrefresh;
+}
+
+/* volume of value kinds, cubes for other kinds or without shaders */
+static void GridVolumeDraw(MPGL_GridDrawData *draw, MP_GridData *data, MPGL_Colormap *colormap)
+{
+	double t = GridProfileStart(draw);
+	MPGL_GridDrawData params;
+
+	if (draw->kind >= MPGL_DrawKindVal && MPGL_GridVolumeDraw(&(draw->volume), draw, data, colormap)) {
+		GridProfileAdd(draw, MPGL_ProfileSubmit, t, 0, 0, 1, 0);
+		return;
+	}
+	params = *draw;
+	params.method = MPGL_DrawMethodCubes;
+	GridParamsDraw(draw, &params, data, colormap, &(draw->mesh), &(draw->key), &(draw->cached), &(draw->instance));
+}
+
+/* slices at positions in displayed range, each is uploaded again only if it has changed */
+static void GridSliceDraw(MPGL_GridDrawData *draw, MP_GridData *data, MPGL_Colormap *colormap)
+{
+	int i;
+	double t;
+
+	for (i = 0; i < 3; i++) {
+		t = GridProfileStart(draw);
+		MPGL_GridSliceDraw(&(draw->slices[i]), i, draw, data, colormap);
+		GridProfileAdd(draw, MPGL_ProfileSubmit, t, 0, 0, 0, 0);
+	}
+}
+
+/* glyphs of local coefficients, cubes without them */
+static void GridGlyphDraw(MPGL_GridDrawData *draw, MP_GridData *data, MPGL_Colormap *colormap, float scale[])
+{
+	double t = GridProfileStart(draw);
+	MPGL_GridDrawData params;
+
+	if (MPGL_GridGlyphDraw(&(draw->glyph), draw, data, colormap, scale)) {
+		GridProfileAdd(draw, MPGL_ProfileSubmit, t, 0, (long long)draw->glyph.ninstance * (draw->glyph.nvertex / 3), 1, 0);
+		return;
+	}
+	params = *draw;
+	params.method = MPGL_DrawMethodCubes;
+	GridParamsDraw(draw, &params, data, colormap, &(draw->mesh), &(draw->key), &(draw->cached), &(draw->instance));
+}
+
+static void GridDraw(MPGL_GridDrawData *draw, MP_GridData *data, MPGL_Colormap *colormap)
+{
+	float scale[3];
+
+	/* list render shows the grid as it is at each frame, grid edits need no invalidation */
+	if (draw->render == MPGL_DrawRenderList) GridDrawExpire(draw);
+	GridColormap(draw, data, colormap);
+	ElementScale(data, scale);
+	glPushMatrix();
+	glScalef(scale[0], scale[1], scale[2]);
+	if (draw->method == MPGL_DrawMethodVolume) GridVolumeDraw(draw, data, colormap);
+	else if (draw->method == MPGL_DrawMethodSlice) GridSliceDraw(draw, data, colormap);
+	else if (draw->method == MPGL_DrawMethodGlyph) GridGlyphDraw(draw, data, colormap, scale);
+	else GridBaseDraw(draw, data, colormap);
+	glPopMatrix();
+}
+
+void MPGL_GridDraw(MPGL_GridDrawData *draw, MP_GridData *data, MPGL_Colormap *colormap)
+{
+	GridProfileBegin(draw);
+	GridDraw(draw, data, colormap);
+	GridProfileEnd(draw);
+}
+
+/* key of grid data and displayed range from which coarse grids are made */
+static void GridLodKey(MPGL_GridDrawData *draw, MP_GridData *data, MPGL_GridDrawKey *key)
+{
+	int i;
+
+	memset(key, 0, sizeof(MPGL_GridDrawKey));
+	key->data = data;
+	key->type = data->type;
+	key->update = data->update;
+	key->val = data->val;
+	for (i = 0; i < 3; i++) key->size[i] = data->size[i];
+	key->step = data->step;
+	key->local_coef = data->local_coef;
+	key->kind = draw->kind;
+	MPGL_GridDrawDispRange(draw, data, key->range);
+}
+
+/* draw coarse grid of level, return -1 on failure, 1 if grid or geometry has been built */
+static int GridLodDraw(MPGL_GridDrawData *draw, MP_GridData *data, MPGL_Colormap *colormap, int level)
+{
+	int i;
+	int built = FALSE;
+	double t;
+	MPGL_GridLod *lod = &(draw->lod_grid[level - 1]);
+	MPGL_GridDrawKey key;
+	MPGL_GridDrawData params;
+
+	GridLodKey(draw, data, &key);
+	if (!lod->valid || memcmp(&key, &(lod->data_key), sizeof(MPGL_GridDrawKey)) != 0) {
+		t = GridProfileStart(draw);
+		if (!MPGL_GridLodBuild(lod, draw, data, 1 << level)) return -1;
+		memcpy(&(lod->data_key), &key, sizeof(MPGL_GridDrawKey));
+		built = TRUE;
+		GridProfileAdd(draw, MPGL_ProfileTraversal, t, GridRangeCells(key.range), 0, 0, 0);
+	}
+	/* parameters of draw over the whole coarse grid */
+	params = *draw;
+	for (i = 0; i < 3; i++) {
+		params.range[i] = 0;
+		params.range[i + 3] = lod->data.size[i] - 1;
+	}
+	glPushMatrix();
+	glTranslatef(lod->origin[0] + 0.5f * (lod->factor - 1), lod->origin[1] + 0.5f * (lod->factor - 1),
+		lod->origin[2] + 0.5f * (lod->factor - 1));
+	glScalef((float)lod->factor, (float)lod->factor, (float)lod->factor);
+	GridParamsDraw(draw, &params, &(lod->data), colormap, &(lod->mesh), &(lod->key), &(lod->cached), &(lod->instance));
+	glPopMatrix();
+	return (built || params.nbuild > 0);
+}
+
+/* level for next frame during interaction, coarser if the last frame exceeded budget and
+   finer if the finer level is expected to fit in it, 4 times faces are assumed for unmeasured level */
+static int GridLodSelect(MPGL_GridDrawData *draw, int level)
+{
+	double finer;
+
+	if (draw->lod_time[level] > draw->lod_budget && level < draw->lod) return level + 1;
+	if (level > 0) {
+		finer = (draw->lod_time[level - 1] > 0.0) ? draw->lod_time[level - 1] : 4.0 * draw->lod_time[level];
+		if (finer <= draw->lod_budget) return level - 1;
+	}
+	return level;
+}
+
+/* draw at level of detail, the level fits time budget during interaction and gets finer by one
+   for each frame after it, return TRUE while a finer level remains to be drawn */
+int MPGL_GridDrawLod(MPGL_GridDrawData *draw, MP_GridData *data, MPGL_Colormap *colormap, int interact)
+{
+	int level;
+	int built = FALSE;
+	int nbuild = draw->nbuild;
+	float scale[3];
+	double t;
+
+	/* cost of volume and slices depends on pixels, not on cells, glyphs are thinned by their stride */
+	if (draw->lod <= 0 || draw->method == MPGL_DrawMethodVolume || draw->method == MPGL_DrawMethodSlice
+		|| draw->method == MPGL_DrawMethodGlyph) {
+		draw->lod_level = 0;
+		MPGL_GridDraw(draw, data, colormap);
+		return FALSE;
+	}
+	GridProfileBegin(draw);
+	if (draw->lod > MPGL_GRID_LOD_MAX) draw->lod = MPGL_GRID_LOD_MAX;
+	level = (draw->lod_level < draw->lod) ? draw->lod_level : draw->lod;
+	if (interact) level = GridLodSelect(draw, level);
+	else if (level > 0) level--;
+	if (draw->render == MPGL_DrawRenderList) GridDrawExpire(draw);
+	GridColormap(draw, data, colormap);
+	ElementScale(data, scale);
+	glPushMatrix();
+	glScalef(scale[0], scale[1], scale[2]);
+	t = GridDrawClock();
+	if (level > 0) built = GridLodDraw(draw, data, colormap, level);
+	if (level == 0 || built < 0) {
+		level = 0;
+		GridBaseDraw(draw, data, colormap);
+		built = (draw->nbuild > nbuild);
+	}
+	/* frames are timed to the end of rendering, except those with building */
+	glFinish();
+	if (!built) draw->lod_time[level] = GridDrawClock() - t;
+	glPopMatrix();
+	draw->lod_level = level;
+	GridProfileEnd(draw);
+	return (!interact && level > 0);
+}
+
+static int GridMeshBuild(MPGL_GridDrawData *draw, MP_GridData *data, MPGL_Colormap *colormap, MPGL_GridMesh *mesh)
+{
+	int i;
+	float scale[3];
+
+	mesh->texture = FALSE;
+	if (!MPGL_GridMeshBuild(mesh, draw, data, colormap)) return FALSE;
+	ElementScale(data, scale);
+	for (i = 0; i < 3 * mesh->nvertex; i++) {
+		mesh->vertex[i] *= scale[i % 3];
+	}
+	return TRUE;
+}
+
+/* build colored geometry into mesh without OpenGL, vertices are scaled by element size */
+int MPGL_GridDrawMesh(MPGL_GridDrawData *draw, MP_GridData *data, MPGL_Colormap *colormap, MPGL_GridMesh *mesh)
+{
+	GridColormap(draw, data, colormap);
+	return GridMeshBuild(draw, data, colormap, mesh);
+}
+
+/* build isosurface of draw kind at level into mesh without OpenGL, vertices are scaled by element size,
+   colored by kind color or left uncolored if colormap is NULL */
+int MPGL_GridDrawIsosurface(MPGL_GridDrawData *draw, MP_GridData *data, MPGL_Colormap *colormap,
+	double level, int color, MPGL_GridMesh *mesh)
+{
+	MPGL_GridDrawData params;
+
+	params = *draw;
+	params.method = MPGL_DrawMethodIsosurface;
+	params.iso_level = level;
+	params.iso_color = color;
+	if (colormap != NULL) GridColormap(&params, data, colormap);
+	return GridMeshBuild(&params, data, colormap, mesh);
+}
+
+void MPGL_GridDrawAxis(int size[])
+{
+	glPushMatrix();
+	glRotatef(90.0f, 0.0f, 1.0f, 0.0f);
+	glScalef(0.5f, 0.5f, (float)size[0]);
+	glColor3f(1.0f, 0.0f, 0.0f);
+	glCallList(MPGL_GRID_CYLINDER_LIST);
+	glPopMatrix();
+	glPushMatrix();
+	glRotatef(-90.0f, 1.0f, 0.0f, 0.0f);
+	glScalef(0.5f, 0.5f, (float)size[1]);
+	glColor3f(0.0f, 1.0f, 0.0f);
+	glCallList(MPGL_GRID_CYLINDER_LIST);
+	glPopMatrix();
+	glPushMatrix();
+	glScalef(0.5f, 0.5f, (float)size[2]);
+	glColor3f(0.0f, 0.0f, 1.0f);
+	glCallList(MPGL_GRID_CYLINDER_LIST);
+	glPopMatrix();
+}
+
+void MPGL_GridDrawRegion(MPGL_GridDrawData *draw, MP_GridData *data, float region[])
+{
+	int i;
+	int range[6];
+	float scale[3];
+
+	MPGL_GridDrawDispRange(draw, data, range);
+	ElementScale(data, scale);
+	for (i = 0; i < 3; i++) {
+		region[i] = (range[i] - 0.5f) * scale[i];
+		region[i + 3] = (range[i + 3] + 0.5f) * scale[i];
+	}
+}
+
+/* ray through pixel x, y from top left of scene in coordinates of cells, inverse of the projection of
+   the scene, the view of MPGL_SceneResize and the transform of the model, return maximum parameter of the ray */
+static double GridPickRay(MP_GridData *data, MPGL_Model *model, MPGL_Scene *scene, int x, int y,
+	double org[], double dir[])
+{
+	int i;
+	double aspect = (double)scene->width / scene->height;
+	double dz = (scene->proj == MPGL_ProjFrustum) ? scene->znear : 1.0;
+	double eye[2][3], w[2][3];
+	float scale[3];
+
+	/* eye coordinates of the point on near plane and the direction */
+	eye[0][0] = aspect * ((2.0 * x + 1.0) / scene->width - 1.0);
+	eye[0][1] = 1.0 - (2.0 * y + 1.0) / scene->height;
+	eye[0][2] = -scene->znear;
+	if (scene->proj == MPGL_ProjFrustum) {
+		eye[1][0] = eye[0][0], eye[1][1] = eye[0][1];
+	}
+	else eye[1][0] = eye[1][1] = 0.0;
+	eye[1][2] = -dz;
+	/* world coordinates of the view looking from (10, 0, 0) to origin with z up */
+	for (i = 0; i < 2; i++) {
+		w[i][0] = (eye[i][2] + ((i == 0) ? 10.0 : 0.0)) / model->scale;
+		w[i][1] = eye[i][0] / model->scale;
+		w[i][2] = eye[i][1] / model->scale;
+	}
+	MPGL_ModelInverse(model);
+	ElementScale(data, scale);
+	for (i = 0; i < 3; i++) {
+		org[i] = w[0][0] * model->mat_inv[0][i] + w[0][1] * model->mat_inv[1][i] + w[0][2] * model->mat_inv[2][i]
+			+ model->mat_inv[3][i];
+		org[i] = (org[i] + model->center[i]) / scale[i];
+		dir[i] = w[1][0] * model->mat_inv[0][i] + w[1][1] * model->mat_inv[1][i] + w[1][2] * model->mat_inv[2][i];
+		dir[i] /= scale[i];
+	}
+	return (scene->zfar - scene->znear) / dz;
+}
+
+/* first displayed cell in displayed range along the ray through pixel x, y from top left of scene,
+   cells are walked by 3D DDA in order of the ray, the first cell on the boundary of the range is taken
+   for quads method whether displayed or not, face is the entered face of the cell, 0:-x 1:-y 2:-z 3:+x 4:+y 5:+z and -1 if the
+   ray starts in the cell, return FALSE if no cell is hit */
+int MPGL_GridDrawPick(MPGL_GridDrawData *draw, MP_GridData *data, MPGL_Model *model, MPGL_Scene *scene,
+	int x, int y, int index[], int *face)
+{
+	int i, a;
+	int range[6];
+	int p[3], step[3];
+	double org[3], dir[3];
+	double t, t0, t1, tn, tf;
+	double tnext[3], tdelta[3];
+
+	if (scene->width <= 0 || scene->height <= 0) return FALSE;
+	MPGL_GridDrawDispRange(draw, data, range);
+	for (i = 0; i < 3; i++) {
+		if (range[i] > range[i + 3]) return FALSE;
+	}
+	tf = GridPickRay(data, model, scene, x, y, org, dir);
+	/* clip the ray by box of range */
+	tn = 0.0, *face = -1;
+	for (i = 0; i < 3; i++) {
+		if (dir[i] == 0.0) {
+			if (org[i] < range[i] - 0.5 || org[i] > range[i + 3] + 0.5) return FALSE;
+			continue;
+		}
+		t0 = (range[i] - 0.5 - org[i]) / dir[i];
+		t1 = (range[i + 3] + 0.5 - org[i]) / dir[i];
+		if (t0 > t1) {
+			t = t0, t0 = t1, t1 = t;
+		}
+		if (t0 > tn) {
+			tn = t0;
+			*face = (dir[i] > 0.0) ? i : i + 3;
+		}
+		if (t1 < tf) tf = t1;
+	}
+	if (tn > tf) return FALSE;
+	/* walk cells from the entry point */
+	for (i = 0; i < 3; i++) {
+		p[i] = (int)floor(org[i] + tn * dir[i] + 0.5);
+		if (p[i] < range[i]) p[i] = range[i];
+		else if (p[i] > range[i + 3]) p[i] = range[i + 3];
+		if (dir[i] > 0.0) {
+			step[i] = 1;
+			tnext[i] = (p[i] + 0.5 - org[i]) / dir[i];
+			tdelta[i] = 1.0 / dir[i];
+		}
+		else if (dir[i] < 0.0) {
+			step[i] = -1;
+			tnext[i] = (p[i] - 0.5 - org[i]) / dir[i];
+			tdelta[i] = -1.0 / dir[i];
+		}
+		else {
+			step[i] = 0;
+			tnext[i] = tdelta[i] = HUGE_VAL;
+		}
+	}
+	while (TRUE) {
+		/* quads are drawn on every cell of the boundary without regard to types */
+		if (draw->method == MPGL_DrawMethodQuads || draw->disp[data->type[MP_GRID_INDEX(data, p[0], p[1], p[2])]]) {
+			for (i = 0; i < 3; i++) index[i] = p[i];
+			return TRUE;
+		}
+		a = (tnext[0] < tnext[1]) ? ((tnext[0] < tnext[2]) ? 0 : 2) : ((tnext[1] < tnext[2]) ? 1 : 2);
+		if (tnext[a] > tf) return FALSE;
+		p[a] += step[a];
+		if (p[a] < range[a] || p[a] > range[a + 3]) return FALSE;
+		tnext[a] += tdelta[a];
+		*face = (step[a] > 0) ? a : a + 3;
+	}
+}
+
+/**********************************************************
+* for Python
+**********************************************************/
+#ifdef MP_PYTHON_LIB
+
+static void PyDealloc(MPGL_GridDrawData *self)
+{
+	MPGL_GridDrawFree(self);
+#ifndef PY3
+	self->ob_type->tp_free((PyObject*)self);
+#endif
+}
+
+static PyObject *PyNew(PyTypeObject *type, PyObject *args, PyObject *kwds)
+{
+	MPGL_GridDrawData *self;
+
+	self = (MPGL_GridDrawData *)type->tp_alloc(type, 0);
+	MPGL_GridDrawInit(self);
+	return (PyObject *)self;
+}
+
+/* draw, builds and traversals run without the GIL while draw is busy,
+   every call reading or changing draw from other threads fails meanwhile */
+static int PyBusy(MPGL_GridDrawData *self)
+{
+	if (self->busy) {
+		PyErr_SetString(PyExc_RuntimeError, "draw is busy in another thread");
+		return TRUE;
+	}
+	return FALSE;
+}
+
+/* colormaps may be shared by draws in threads, the table is updated before the GIL is released
+   and calls changing the colormap fail while it is held */
+static int PyColormapBusy(MPGL_Colormap *cmp)
+{
+	if (cmp->busy > 0) {
+		PyErr_SetString(PyExc_RuntimeError, "colormap is busy in another thread");
+		return TRUE;
+	}
+	return FALSE;
+}
+
+static void PyColormapHold(MPGL_Colormap *cmp)
+{
+	if (cmp == NULL) return;
+	MPGL_ColormapUpdateTable(cmp);
+	cmp->busy++;
+}
+
+static void PyColormapRelease(MPGL_Colormap *cmp)
+{
+	if (cmp != NULL) cmp->busy--;
+}
+
+static int PySetAttr(MPGL_GridDrawData *self, PyObject *name, PyObject *value)
+{
+	if (PyBusy(self)) return -1;
+	return PyObject_GenericSetAttr((PyObject *)self, name, value);
+}
+
+/* keep the grid alive so that its address identifies the cached geometry */
+void MPGL_GridDrawKeepGrid(MPGL_GridDrawData *draw, PyObject *grid)
+{
+	PyObject *old;
+
+	if (draw->grid == grid) return;
+	old = draw->grid;
+	Py_INCREF(grid);
+	draw->grid = grid;
+	Py_XDECREF(old);
+}
+
+static PyObject *PyGridDrawList(MPGL_GridDrawData *self, PyObject *args)
+{
+	MPGL_GridDrawList();
+	Py_RETURN_NONE;
+}
+
+static PyObject *PyGridDrawColormapRange(MPGL_GridDrawData *self, PyObject *args, PyObject *kwds)
+{
+	int ret;
+	MP_GridData *data;
+	MPGL_Colormap *cmp;
+	int mode = 0;
+	double lower = 1.0;
+	double upper = 99.0;
+	double range[2];
+	static char *kwlist[] = { "grid", "cmp", "mode", "lower", "upper", NULL };
+
+	if (!PyArg_ParseTupleAndKeywords(args, kwds, "OO!|idd", kwlist, &data, &MPGL_ColormapPyType, &cmp,
+		&mode, &lower, &upper)) {
+		return NULL;
+	}
+	if (mode == 0) lower = 0.0, upper = 100.0;
+	else if (mode != 1) {
+		PyErr_SetString(PyExc_ValueError, "invalid mode");
+		return NULL;
+	}
+	if (PyBusy(self) || PyColormapBusy(cmp)) return NULL;
+	/* range is set to colormap after the GIL is acquired again */
+	range[0] = cmp->range[0], range[1] = cmp->range[1];
+	self->busy = TRUE;
+	Py_BEGIN_ALLOW_THREADS
+	ret = GridPercentileRange(self, data, lower, upper, range);
+	Py_END_ALLOW_THREADS
+	self->busy = FALSE;
+	if (!ret) return PyErr_NoMemory();
+	if (PyColormapBusy(cmp)) return NULL;
+	cmp->range[0] = range[0], cmp->range[1] = range[1];
+	Py_RETURN_NONE;
+}
+
+static PyObject *PyGridDrawRangeStats(MPGL_GridDrawData *self, PyObject *args, PyObject *kwds)
+{
+	int i, n, ret;
+	MP_GridData *data;
+	int bins = 64;
+	PyObject *percentiles = NULL;
+	PyObject *seq, *ptuple, *hist;
+	double *p;
+	npy_intp dims[1];
+	static char *kwlist[] = { "grid", "bins", "percentiles", NULL };
+
+	if (!PyArg_ParseTupleAndKeywords(args, kwds, "O|iO", kwlist, &data, &bins, &percentiles)) {
+		return NULL;
+	}
+	if (bins < 1) {
+		PyErr_SetString(PyExc_ValueError, "invalid bins");
+		return NULL;
+	}
+	if (PyBusy(self)) return NULL;
+	if (percentiles == NULL) seq = Py_BuildValue("(dd)", 1.0, 99.0);
+	else seq = PySequence_Fast(percentiles, "percentiles must be sequence");
+	if (seq == NULL) return NULL;
+	n = (int)PySequence_Fast_GET_SIZE(seq);
+	p = (double *)malloc((n + 1) * sizeof(double));
+	if (p == NULL) {
+		Py_DECREF(seq);
+		return PyErr_NoMemory();
+	}
+	for (i = 0; i < n; i++) {
+		p[i] = PyFloat_AsDouble(PySequence_Fast_GET_ITEM(seq, i));
+		if (p[i] == -1.0 && PyErr_Occurred()) {
+			Py_DECREF(seq);
+			free(p);
+			return NULL;
+		}
+	}
+	Py_DECREF(seq);
+	dims[0] = bins;
+	hist = PyArray_ZEROS(1, dims, NPY_INT, 0);
+	if (hist == NULL) {
+		free(p);
+		return NULL;
+	}
+	/* percentiles are replaced by their values */
+	self->busy = TRUE;
+	Py_BEGIN_ALLOW_THREADS
+	ret = MPGL_GridDrawStats(self, data);
+	for (i = 0; ret && i < n; i++) {
+		MPGL_GridStatsPercentile(&(self->stats), p[i], &(p[i]));
+	}
+	if (ret) MPGL_GridStatsHistogram(&(self->stats), self->stats.min, self->stats.max, bins,
+		(int *)PyArray_DATA((PyArrayObject *)hist));
+	Py_END_ALLOW_THREADS
+	self->busy = FALSE;
+	if (!ret) {
+		free(p);
+		Py_DECREF(hist);
+		return PyErr_NoMemory();
+	}
+	ptuple = PyTuple_New(n);
+	if (ptuple == NULL) {
+		free(p);
+		Py_DECREF(hist);
+		return NULL;
+	}
+	for (i = 0; i < n; i++) {
+		PyTuple_SET_ITEM(ptuple, i, PyFloat_FromDouble(p[i]));
+	}
+	free(p);
+	return Py_BuildValue("{s:i,s:i,s:d,s:d,s:d,s:N,s:N}",
+		"count", self->stats.count, "nonfinite", self->stats.nonfinite,
+		"min", self->stats.min, "max", self->stats.max, "mean", self->stats.mean,
+		"hist", hist, "percentiles", ptuple);
+}
+
+static PyObject *PyGridDraw(MPGL_GridDrawData *self, PyObject *args, PyObject *kwds)
+{
+	MP_GridData *data;
+	MPGL_Colormap *cmp;
+	MPGL_Model *model = NULL;
+	int refine = FALSE;
+	int interact;
+	static char *kwlist[] = { "grid", "cmp", "model", NULL };
+
+	if (!PyArg_ParseTupleAndKeywords(args, kwds, "OO!|O!", kwlist, &data, &MPGL_ColormapPyType, &cmp,
+		&MPGL_ModelPyType, &model)) {
+		return NULL;
+	}
+	if (PyBusy(self)) return NULL;
+	interact = (model != NULL && model->button_down);
+	self->busy = TRUE;
+	PyColormapHold(cmp);
+	Py_BEGIN_ALLOW_THREADS
+	if (self->lod > 0) refine = MPGL_GridDrawLod(self, data, cmp, interact);
+	else MPGL_GridDraw(self, data, cmp);
+	Py_END_ALLOW_THREADS
+	PyColormapRelease(cmp);
+	self->busy = FALSE;
+	MPGL_GridDrawKeepGrid(self, (PyObject *)data);
+	return Py_BuildValue("i", refine);
+}
+
+static void PyMeshFree(PyObject *capsule)
+{
+	free(PyCapsule_GetPointer(capsule, NULL));
+}
+
+/* array owning data, data is freed if failed */
+static PyObject *PyMeshArray(void *data, int nd, npy_intp dims[], int type)
+{
+	PyObject *array, *capsule;
+
+	if (data == NULL) return PyArray_ZEROS(nd, dims, type, 0);
+	array = PyArray_SimpleNewFromData(nd, dims, type, data);
+	if (array == NULL) {
+		free(data);
+		return NULL;
+	}
+	capsule = PyCapsule_New(data, NULL, PyMeshFree);
+	if (capsule == NULL) {
+		Py_DECREF(array);
+		free(data);
+		return NULL;
+	}
+	if (PyArray_SetBaseObject((PyArrayObject *)array, capsule) < 0) {
+		Py_DECREF(array);
+		return NULL;
+	}
+	return array;
+}
+
+/* expand indexed vertices to triangle list */
+static void *PyMeshExpand(void *data, int size, unsigned int index[], int nindex)
+{
+	int i;
+	char *expand;
+
+	if (nindex == 0) return NULL;
+	expand = (char *)malloc((size_t)nindex * size);
+	if (expand == NULL) return NULL;
+	for (i = 0; i < nindex; i++) {
+		memcpy(&(expand[(size_t)i * size]), &(((char *)data)[(size_t)index[i] * size]), size);
+	}
+	return expand;
+}
+
+static PyObject *PyGridDrawMesh(MPGL_GridDrawData *self, PyObject *args, PyObject *kwds)
+{
+	int i, n, ret;
+	int indices = TRUE;
+	MP_GridData *data;
+	MPGL_Colormap *cmp;
+	MPGL_GridMesh mesh;
+	void *ptr[4];
+	static int size[4] = { 3 * sizeof(float), 3 * sizeof(float), 4, 3 * sizeof(unsigned int) };
+	static int type[4] = { NPY_FLOAT32, NPY_FLOAT32, NPY_UINT8, NPY_UINT32 };
+	npy_intp dims[2];
+	PyObject *array[4] = { NULL, NULL, NULL, NULL };
+	static char *kwlist[] = { "grid", "cmp", "indices", NULL };
+
+	if (!PyArg_ParseTupleAndKeywords(args, kwds, "OO!|i", kwlist, &data, &MPGL_ColormapPyType, &cmp, &indices)) {
+		return NULL;
+	}
+	if (PyBusy(self)) return NULL;
+	MPGL_GridMeshInit(&mesh);
+	self->busy = TRUE;
+	PyColormapHold(cmp);
+	Py_BEGIN_ALLOW_THREADS
+	ret = MPGL_GridDrawMesh(self, data, cmp, &mesh);
+	Py_END_ALLOW_THREADS
+	PyColormapRelease(cmp);
+	self->busy = FALSE;
+	if (!ret) {
+		MPGL_GridMeshFree(&mesh);
+		return PyErr_NoMemory();
+	}
+	ptr[0] = mesh.vertex, ptr[1] = mesh.normal, ptr[2] = mesh.color, ptr[3] = mesh.index;
+	n = mesh.nvertex;
+	if (!indices) {
+		n = mesh.nindex;
+		for (i = 0; i < 3; i++) {
+			ptr[i] = PyMeshExpand(ptr[i], size[i], mesh.index, mesh.nindex);
+			if (ptr[i] == NULL && n > 0) {
+				while (--i >= 0) free(ptr[i]);
+				MPGL_GridMeshFree(&mesh);
+				return PyErr_NoMemory();
+			}
+		}
+		MPGL_GridMeshFree(&mesh);
+		ptr[3] = NULL;
+	}
+	else {
+		free(mesh.cell);
+		mesh.vertex = mesh.normal = NULL, mesh.color = NULL, mesh.index = NULL, mesh.cell = NULL;
+	}
+	for (i = 0; i < (indices ? 4 : 3); i++) {
+		dims[0] = (i < 3) ? n : mesh.nindex / 3;
+		dims[1] = (i == 2) ? 4 : 3;
+		if (n == 0) {
+			free(ptr[i]);
+			ptr[i] = NULL;
+		}
+		array[i] = PyMeshArray(ptr[i], 2, dims, type[i]);
+		ptr[i] = NULL;
+		if (array[i] == NULL) {
+			while (++i < 4) free(ptr[i]);
+			for (i = 0; i < 4; i++) Py_XDECREF(array[i]);
+			return NULL;
+		}
+	}
+	if (indices) return Py_BuildValue("NNNN", array[0], array[1], array[2], array[3]);
+	return Py_BuildValue("NNN", array[0], array[1], array[2]);
+}
+
+static PyObject *PyGridDrawIsosurface(MPGL_GridDrawData *self, PyObject *args, PyObject *kwds)
+{
+	int i, ret;
+	int color = -1;
+	double level;
+	MP_GridData *data;
+	PyObject *cmp = Py_None;
+	MPGL_GridMesh mesh;
+	void *ptr[4];
+	static int type[4] = { NPY_FLOAT32, NPY_FLOAT32, NPY_UINT8, NPY_UINT32 };
+	npy_intp dims[2];
+	PyObject *array[4] = { NULL, NULL, NULL, NULL };
+	static char *kwlist[] = { "grid", "level", "cmp", "color", NULL };
+
+	if (!PyArg_ParseTupleAndKeywords(args, kwds, "Od|Oi", kwlist, &data, &level, &cmp, &color)) {
+		return NULL;
+	}
+	if (cmp != Py_None && !PyObject_TypeCheck(cmp, &MPGL_ColormapPyType)) {
+		PyErr_SetString(PyExc_TypeError, "cmp must be colormap or None");
+		return NULL;
+	}
+	if (PyBusy(self)) return NULL;
+	MPGL_GridMeshInit(&mesh);
+	self->busy = TRUE;
+	PyColormapHold((cmp != Py_None) ? (MPGL_Colormap *)cmp : NULL);
+	Py_BEGIN_ALLOW_THREADS
+	ret = MPGL_GridDrawIsosurface(self, data, (cmp != Py_None) ? (MPGL_Colormap *)cmp : NULL, level, color, &mesh);
+	Py_END_ALLOW_THREADS
+	PyColormapRelease((cmp != Py_None) ? (MPGL_Colormap *)cmp : NULL);
+	self->busy = FALSE;
+	if (!ret) {
+		MPGL_GridMeshFree(&mesh);
+		return PyErr_NoMemory();
+	}
+	ptr[0] = mesh.vertex, ptr[1] = mesh.normal, ptr[2] = mesh.color, ptr[3] = mesh.index;
+	if (cmp == Py_None) free(mesh.color), ptr[2] = NULL;
+	free(mesh.cell);
+	mesh.vertex = mesh.normal = NULL, mesh.color = NULL, mesh.index = NULL, mesh.cell = NULL;
+	for (i = 0; i < 4; i++) {
+		if (i == 2 && cmp == Py_None) continue;
+		dims[0] = (i < 3) ? mesh.nvertex : mesh.nindex / 3;
+		dims[1] = (i == 2) ? 4 : 3;
+		if (dims[0] == 0) {
+			free(ptr[i]);
+			ptr[i] = NULL;
+		}
+		array[i] = PyMeshArray(ptr[i], 2, dims, type[i]);
+		ptr[i] = NULL;
+		if (array[i] == NULL) {
+			while (++i < 4) free(ptr[i]);
+			for (i = 0; i < 4; i++) Py_XDECREF(array[i]);
+			return NULL;
+		}
+	}
+	if (cmp != Py_None) return Py_BuildValue("NNNN", array[0], array[1], array[2], array[3]);
+	return Py_BuildValue("NNN", array[0], array[1], array[3]);
+}
+
+static PyObject *PyGridDrawRefresh(MPGL_GridDrawData *self, PyObject *args, PyObject *kwds)
+{
+	int n;
+	MP_GridData *data;
+	MPGL_Colormap *cmp;
+	PyObject *mask = NULL;
+	Py_buffer view;
+	static char *kwlist[] = { "grid", "cmp", "mask", NULL };
+
+	if (!PyArg_ParseTupleAndKeywords(args, kwds, "OO!|O", kwlist, &data, &MPGL_ColormapPyType, &cmp, &mask)) {
+		return NULL;
+	}
+	if (PyBusy(self)) return NULL;
+	if (mask == NULL || mask == Py_None) {
+		self->busy = TRUE;
+		PyColormapHold(cmp);
+		Py_BEGIN_ALLOW_THREADS
+		n = MPGL_GridDrawRefresh(self, data, cmp, NULL);
+		Py_END_ALLOW_THREADS
+		PyColormapRelease(cmp);
+		self->busy = FALSE;
+	}
+	else {
+		if (PyObject_GetBuffer(mask, &view, PyBUF_C_CONTIGUOUS) < 0) return NULL;
+		if (view.itemsize != 1 || view.len != data->ntot) {
+			PyBuffer_Release(&view);
+			PyErr_SetString(PyExc_ValueError, "invalid mask size");
+			return NULL;
+		}
+		self->busy = TRUE;
+		PyColormapHold(cmp);
+		Py_BEGIN_ALLOW_THREADS
+		n = MPGL_GridDrawRefresh(self, data, cmp, (const unsigned char *)view.buf);
+		Py_END_ALLOW_THREADS
+		PyColormapRelease(cmp);
+		self->busy = FALSE;
+		PyBuffer_Release(&view);
+	}
+	return Py_BuildValue("i", n);
+}
+
+static PyObject *PyGridDrawInvalidate(MPGL_GridDrawData *self, PyObject *args)
+{
+	if (PyBusy(self)) return NULL;
+	MPGL_GridDrawInvalidate(self);
+	Py_RETURN_NONE;
+}
+
+static size_t PyMeshBytes(MPGL_GridMesh *mesh)
+{
+	return (size_t)mesh->vsize * (6 * sizeof(float) + 4) + (size_t)mesh->isize * sizeof(unsigned int)
+		+ (size_t)mesh->fsize * sizeof(int) + (size_t)mesh->tsize * sizeof(float);
+}
+
+static PyObject *PyGridDrawCacheInfo(MPGL_GridDrawData *self, PyObject *args)
+{
+	int i;
+	int valid = self->cached;
+	int nvertex = self->mesh.nvertex, nindex = self->mesh.nindex;
+	size_t size = PyMeshBytes(&(self->mesh));
+
+	if (PyBusy(self)) return NULL;
+	if (GridBrickMode(self)) {
+		valid = self->brick_cached;
+		nvertex = nindex = 0;
+		for (i = 0; i < self->nbrick; i++) {
+			nvertex += self->bricks[i].mesh.nvertex;
+			nindex += self->bricks[i].mesh.nindex;
+			size += PyMeshBytes(&(self->bricks[i].mesh));
+		}
+	}
+	return Py_BuildValue("{s:i,s:i,s:i,s:i,s:i,s:i,s:n,s:i,s:i}", "valid", valid,
+		"hits", self->nhit, "builds", self->nbuild, "refreshes", self->nrefresh,
+		"vertices", nvertex, "indices", nindex, "bytes", (Py_ssize_t)size,
+		"bricks", self->nbrick, "culled", self->nculled);
+}
+
+static PyObject *PyProfileDict(MPGL_GridProfile *profile)
+{
+	return Py_BuildValue("{s:L,s:L,s:L,s:L,s:L,s:L,s:L,s:L,s:L}",
+		"cells", profile->cells, "faces", profile->faces, "calls", profile->calls, "bytes", profile->bytes,
+		"traversal", profile->time[MPGL_ProfileTraversal], "color", profile->time[MPGL_ProfileColor],
+		"upload", profile->time[MPGL_ProfileUpload], "submit", profile->time[MPGL_ProfileSubmit],
+		"total", profile->total);
+}
+
+static PyObject *PyGridDrawStats(MPGL_GridDrawData *self, PyObject *args, PyObject *kwds)
+{
+	int i, k;
+	int reset = FALSE;
+	PyObject *history, *item, *stats;
+	static char *kwlist[] = { "reset", NULL };
+
+	if (!PyArg_ParseTupleAndKeywords(args, kwds, "|i", kwlist, &reset)) {
+		return NULL;
+	}
+	if (PyBusy(self)) return NULL;
+	history = PyList_New(self->history_count);
+	if (history == NULL) return NULL;
+	/* oldest frame first */
+	for (i = 0; i < self->history_count; i++) {
+		k = (self->history_next - self->history_count + i + self->history_size) % self->history_size;
+		item = PyProfileDict(&(self->history[k]));
+		if (item == NULL) {
+			Py_DECREF(history);
+			return NULL;
+		}
+		PyList_SET_ITEM(history, i, item);
+	}
+	stats = Py_BuildValue("{s:i,s:N,s:N,s:N}", "frames", self->nframe,
+		"total", PyProfileDict(&(self->profile_total)), "last", PyProfileDict(&(self->frame)), "history", history);
+	if (reset) MPGL_GridDrawProfileReset(self);
+	return stats;
+}
+
+static PyObject *PyGridDrawTouch(MPGL_GridDrawData *self, PyObject *args, PyObject *kwds)
+{
+	int p0[3], p1[3];
+	static char *kwlist[] = { "p0", "p1", NULL };
+
+	if (!PyArg_ParseTupleAndKeywords(args, kwds, "(iii)(iii)", kwlist, &p0[0], &p0[1], &p0[2], &p1[0], &p1[1], &p1[2])) {
+		return NULL;
+	}
+	if (PyBusy(self)) return NULL;
+	MPGL_GridDrawTouch(self, p0, p1);
+	Py_RETURN_NONE;
+}
+
+static PyObject *PyGridDrawAxis(MPGL_GridDrawData *self, PyObject *args, PyObject *kwds)
+{
+	int sx, sy, sz;
+	static char *kwlist[] = { "size", NULL };
+	int size[3];
+
+	if (!PyArg_ParseTupleAndKeywords(args, kwds, "(iii)", kwlist, &sx, &sy, &sz)) {
+		return NULL;
+	}
+	size[0] = sx, size[1] = sy, size[2] = sz;
+	MPGL_GridDrawAxis(size);
+	Py_RETURN_NONE;
+}
+
+static PyObject *PyGridDrawRegion(MPGL_GridDrawData *self, PyObject *args, PyObject *kwds)
+{
+	MP_GridData *data;
+	static char *kwlist[] = { "grid", NULL };
+	float region[6];
+
+	if (!PyArg_ParseTupleAndKeywords(args, kwds, "O", kwlist, &data)) {
+		return NULL;
+	}
+	if (PyBusy(self)) return NULL;
+	MPGL_GridDrawRegion(self, data, region);
+	return Py_BuildValue("dddddd", region[0], region[1], region[2],
+		region[3], region[4], region[5]);
+}
+
+static PyObject *PyGridDrawPick(MPGL_GridDrawData *self, PyObject *args, PyObject *kwds)
+{
+	MP_GridData *data;
+	MPGL_Model *model;
+	MPGL_Scene *scene;
+	int x, y, id;
+	int index[3], face;
+	PyObject *pick, *coef;
+	static char *kwlist[] = { "grid", "model", "scene", "x", "y", NULL };
+
+	if (!PyArg_ParseTupleAndKeywords(args, kwds, "OO!O!ii", kwlist, &data, &MPGL_ModelPyType, &model,
+		&MPGL_ScenePyType, &scene, &x, &y)) {
+		return NULL;
+	}
+	if (PyBusy(self)) return NULL;
+	if (!MPGL_GridDrawPick(self, data, model, scene, x, y, index, &face)) Py_RETURN_NONE;
+	id = MP_GRID_INDEX(data, index[0], index[1], index[2]);
+	pick = Py_BuildValue("{s:(iii),s:i,s:i,s:i,s:d}", "index", index[0], index[1], index[2], "face", face,
+		"type", data->type[id], "update", (data->update != NULL) ? data->update[id] : 0, "val", data->val[id]);
+	if (pick != NULL && data->local_coef) {
+		coef = Py_BuildValue("(ddd)", data->cx[id], data->cy[id], data->cz[id]);
+		if (coef == NULL || PyDict_SetItemString(pick, "coef", coef) < 0) {
+			Py_XDECREF(coef);
+			Py_DECREF(pick);
+			return NULL;
+		}
+		Py_DECREF(coef);
+	}
+	return pick;
+}
+
+static PyObject *PyGridDrawGetDisp(MPGL_GridDrawData *self, PyObject *args, PyObject *kwds)
 {
 	int type;
 	static char *kwlist[] = { "type", NULL };
@@ -634,6 +2096,7 @@ static PyObject *PyGridDrawGetDisp(MPGL_GridDrawData *self, PyObject *args, PyOb
 	if (!PyArg_ParseTupleAndKeywords(args, kwds, "i", kwlist, &type)) {
 		return NULL;
 	}
+	if (PyBusy(self)) return NULL;
 	if (type >= 0 && type < MPGL_GRID_TYPE_MAX) {
 		return Py_BuildValue("i", self->disp[type]);
 	}
@@ -651,6 +2114,7 @@ static PyObject *PyGridDrawSetDisp(MPGL_GridDrawData *self, PyObject *args, PyOb
 	if (!PyArg_ParseTupleAndKeywords(args, kwds, "ii", kwlist, &type, &disp)) {
 		return NULL;
 	}
+	if (PyBusy(self)) return NULL;
 	if (type >= 0 && type < MPGL_GRID_TYPE_MAX) {
 		self->disp[type] = disp;
 	}
@@ -661,32 +2125,129 @@ static PyObject *PyGridDrawSetDisp(MPGL_GridDrawData *self, PyObject *args, PyOb
 	Py_RETURN_NONE;
 }
 
+/* public attributes of draw for pickle, display flags are added as disp */
+static const char *PyStateNames[] = { "method", "kind", "render", "merge", "texture", "brick", "threads",
+	"lod", "lod_budget", "volume_samples", "volume_opacity", "glyph_stride", "glyph_scale",
+	"profile", "profile_history", "iso_level", "iso_color", "range", "slice", NULL };
+
+static PyObject *PyReduce(MPGL_GridDrawData *self, PyObject *args)
+{
+	int i;
+	PyObject *state, *disp;
+
+	if (PyBusy(self)) return NULL;
+	state = MPGL_PyGetState((PyObject *)self, PyStateNames);
+	if (state == NULL) return NULL;
+	disp = PyTuple_New(MPGL_GRID_TYPE_MAX);
+	if (disp == NULL) {
+		Py_DECREF(state);
+		return NULL;
+	}
+	for (i = 0; i < MPGL_GRID_TYPE_MAX; i++) {
+		PyTuple_SET_ITEM(disp, i, PyLong_FromLong(self->disp[i]));
+	}
+	if (PyDict_SetItemString(state, "disp", disp) < 0) {
+		Py_DECREF(disp);
+		Py_DECREF(state);
+		return NULL;
+	}
+	Py_DECREF(disp);
+	return Py_BuildValue("(O()N)", Py_TYPE(self), state);
+}
+
+static PyObject *PySetState(MPGL_GridDrawData *self, PyObject *state)
+{
+	int i;
+	int disp[MPGL_GRID_TYPE_MAX];
+	PyObject *value, *seq;
+
+	if (PyBusy(self)) return NULL;
+	if (MPGL_PySetState((PyObject *)self, PyStateNames, state) < 0) return NULL;
+	value = PyDict_GetItemString(state, "disp");
+	if (value != NULL) {
+		seq = PySequence_Fast(value, "disp must be a sequence");
+		if (seq == NULL) return NULL;
+		if (PySequence_Fast_GET_SIZE(seq) != MPGL_GRID_TYPE_MAX) {
+			Py_DECREF(seq);
+			PyErr_SetString(PyExc_ValueError, "invalid state");
+			return NULL;
+		}
+		for (i = 0; i < MPGL_GRID_TYPE_MAX; i++) {
+			disp[i] = (int)PyLong_AsLong(PySequence_Fast_GET_ITEM(seq, i));
+		}
+		Py_DECREF(seq);
+		if (PyErr_Occurred()) return NULL;
+		for (i = 0; i < MPGL_GRID_TYPE_MAX; i++) self->disp[i] = disp[i];
+	}
+	MPGL_GridDrawInvalidate(self);
+	Py_RETURN_NONE;
+}
+
 static PyMethodDef PyMethods[] = {
 	{ "list", (PyCFunction)PyGridDrawList, METH_NOARGS,
 	"list() : set render list" },
 	{ "cmp_range", (PyCFunction)PyGridDrawColormapRange, METH_VARARGS | METH_KEYWORDS,
-	"cmp_range(grid, cmp) : set colormap range" },
+	"cmp_range(grid, cmp, mode=0, lower=1.0, upper=99.0) : set colormap range, mode = {0:min max | 1:lower and upper percentiles}" },
 	{ "draw", (PyCFunction)PyGridDraw, METH_VARARGS | METH_KEYWORDS,
-	"draw(grid, cmp) : draw grid data" },
+	"draw(grid, cmp, model=None) : draw grid data, coarse levels during interaction with model if lod is set, return 1 while finer levels remain to be drawn" },
+	{ "isosurface", (PyCFunction)PyGridDrawIsosurface, METH_VARARGS | METH_KEYWORDS,
+	"isosurface(grid, level, cmp=None, color=-1) : return (vertices, normals, indices) arrays of isosurface of kind at level, or (vertices, normals, colors, indices) colored by kind color if cmp is given, -1:kind itself" },
+	{ "mesh", (PyCFunction)PyGridDrawMesh, METH_VARARGS | METH_KEYWORDS,
+	"mesh(grid, cmp, indices=1) : return (vertices, normals, colors, indices) arrays, or (vertices, normals, colors) of triangles if indices is 0" },
+	{ "range_stats", (PyCFunction)PyGridDrawRangeStats, METH_VARARGS | METH_KEYWORDS,
+	"range_stats(grid, bins=64, percentiles=(1.0, 99.0)) : return statistics of displayed values, {count, nonfinite, min, max, mean, hist, percentiles}" },
+	{ "refresh", (PyCFunction)PyGridDrawRefresh, METH_VARARGS | METH_KEYWORDS,
+	"refresh(grid, cmp, mask=None) : refresh colors of updated or masked cells" },
+	{ "invalidate", (PyCFunction)PyGridDrawInvalidate, METH_NOARGS,
+	"invalidate() : invalidate geometry cache" },
+	{ "cache_info", (PyCFunction)PyGridDrawCacheInfo, METH_NOARGS,
+	"cache_info() : return geometry cache information" },
+	{ "stats", (PyCFunction)PyGridDrawStats, METH_VARARGS | METH_KEYWORDS,
+	"stats(reset=0) : return counters and stage times in nanoseconds of frames drawn with profile on, {frames, total, last, history}" },
+	{ "touch", (PyCFunction)PyGridDrawTouch, METH_VARARGS | METH_KEYWORDS,
+	"touch((x0, y0, z0), (x1, y1, z1)) : mark cells as edited, only bricks touching them are built again" },
 	{ "draw_axis", (PyCFunction)PyGridDrawAxis, METH_VARARGS | METH_KEYWORDS,
 	"draw_axis(grid) : draw axis" },
 	{ "region", (PyCFunction)PyGridDrawRegion, METH_VARARGS | METH_KEYWORDS,
 	"region(grid) : return draw region" },
+	{ "pick", (PyCFunction)PyGridDrawPick, METH_VARARGS | METH_KEYWORDS,
+	"pick(grid, model, scene, x, y) : return {index, face, type, update, val, coef} of first displayed cell under pixel x, y from top left, face 0:-x 1:-y 2:-z 3:+x 4:+y 5:+z -1:inside, None if no cell" },
 	{ "get_disp", (PyCFunction)PyGridDrawGetDisp, METH_VARARGS | METH_KEYWORDS,
 	"get_disp(type) : get display flag" },
 	{ "set_disp", (PyCFunction)PyGridDrawSetDisp, METH_VARARGS | METH_KEYWORDS,
 	"set_disp(type, disp) : set display flag, 0:non-display 1:display" },
+	{ "__reduce__", (PyCFunction)PyReduce, METH_NOARGS,
+	"__reduce__() : return state for pickle" },
+	{ "__setstate__", (PyCFunction)PySetState, METH_O,
+	"__setstate__(state) : set state from pickle" },
 	{ NULL }  /* Sentinel */
 };
 
 static PyMemberDef PyMembers[] = {
-	{ "method", T_INT, offsetof(MPGL_GridDrawData, method), 0, "draw method, 0:quads 1:cubes" },
+	{ "method", T_INT, offsetof(MPGL_GridDrawData, method), 0, "draw method, 0:quads 1:cubes 2:volume 3:isosurface 4:slice 5:glyph" },
 	{ "kind", T_INT, offsetof(MPGL_GridDrawData, kind), 0, "draw kind, 0:type 1:update 2:val" },
+	{ "render", T_INT, offsetof(MPGL_GridDrawData, render), 0, "render mode, 0:list 1:buffer 2:instance" },
+	{ "merge", T_INT, offsetof(MPGL_GridDrawData, merge), 0, "merge same color faces, 0:off 1:on" },
+	{ "texture", T_INT, offsetof(MPGL_GridDrawData, texture), 0, "texture gradation colors, 0:off 1:on" },
+	{ "brick", T_INT, offsetof(MPGL_GridDrawData, brick), 0, "number of cells of brick edge, 0:off" },
+	{ "threads", T_INT, offsetof(MPGL_GridDrawData, threads), 0, "number of build threads, 0:all processors" },
+	{ "lod", T_INT, offsetof(MPGL_GridDrawData, lod), 0, "number of coarse levels, 0:off" },
+	{ "lod_budget", T_DOUBLE, offsetof(MPGL_GridDrawData, lod_budget), 0, "time budget of frame during interaction in seconds" },
+	{ "volume_samples", T_INT, offsetof(MPGL_GridDrawData, volume_samples), 0, "number of samples along diagonal of volume" },
+	{ "volume_opacity", T_DOUBLE, offsetof(MPGL_GridDrawData, volume_opacity), 0, "opacity of volume per cell length at upper end of colormap range" },
+	{ "glyph_stride", T_INT, offsetof(MPGL_GridDrawData, glyph_stride), 0, "number of cells between glyphs" },
+	{ "glyph_scale", T_DOUBLE, offsetof(MPGL_GridDrawData, glyph_scale), 0, "length of the longest glyph in glyph_stride cells" },
+	{ "profile", T_INT, offsetof(MPGL_GridDrawData, profile), 0, "count and time stages of frames, 0:off 1:on" },
+	{ "profile_history", T_INT, offsetof(MPGL_GridDrawData, profile_history), 0, "number of last frames kept in history" },
+	{ "iso_level", T_DOUBLE, offsetof(MPGL_GridDrawData, iso_level), 0, "level of isosurface" },
+	{ "iso_color", T_INT, offsetof(MPGL_GridDrawData, iso_color), 0, "kind of isosurface colors, -1:kind itself" },
+	{ "lod_level", T_INT, offsetof(MPGL_GridDrawData, lod_level), READONLY, "level of last frame, 0:full resolution" },
 	{ NULL }  /* Sentinel */
 };
 
 static PyObject *PyGetRange(MPGL_GridDrawData *self, void *closure)
 {
+	if (PyBusy(self)) return NULL;
 	return Py_BuildValue("iiiiii", self->range[0], self->range[1], self->range[2],
 		self->range[3], self->range[4], self->range[5]);
 }
@@ -703,14 +2264,34 @@ static int PySetRange(MPGL_GridDrawData *self, PyObject *value, void *closure)
 	return 0;
 }
 
+static PyObject *PyGetSlice(MPGL_GridDrawData *self, void *closure)
+{
+	if (PyBusy(self)) return NULL;
+	return Py_BuildValue("iii", self->slice[0], self->slice[1], self->slice[2]);
+}
+
+static int PySetSlice(MPGL_GridDrawData *self, PyObject *value, void *closure)
+{
+	int x, y, z;
+
+	if (!PyArg_ParseTuple(value, "iii", &x, &y, &z)) {
+		return -1;
+	}
+	self->slice[0] = x, self->slice[1] = y, self->slice[2] = z;
+	return 0;
+}
+
 static PyGetSetDef PyGetSet[] = {
 	{ "range", (getter)PyGetRange, (setter)PySetRange, "range = (x0, y0, z0, x1, y1, z1)", NULL },
+	{ "slice", (getter)PyGetSlice, (setter)PySetSlice, "slice = (x, y, z), position of slice normal to each axis, out of range:off", NULL },
 	{ NULL }  /* Sentinel */
 };
 
 PyTypeObject MPGL_GridDrawDataPyType = {
+#ifdef PY3
+	PyVarObject_HEAD_INIT(NULL, 0)
+#else
 	PyObject_HEAD_INIT(NULL)
-#ifndef PY3
 	0,							/*ob_size*/
 #endif
 	"MPGLGrid.draw",			/*tp_name*/
@@ -729,7 +2310,7 @@ PyTypeObject MPGL_GridDrawDataPyType = {
 	0,							/*tp_call*/
 	0,							/*tp_str*/
 	0,							/*tp_getattro*/
-	0,							/*tp_setattro*/
+	(setattrofunc)PySetAttr,	/*tp_setattro*/
 	0,							/*tp_as_buffer*/
 	Py_TPFLAGS_DEFAULT | Py_TPFLAGS_BASETYPE,	/*tp_flags*/
 	"draw()",					/* tp_doc */
@@ -0,0 +1,80 @@
+#include "MPGLGrid.h"
+
+#ifdef WIN32
+#define MPGL_EXT(type, name) type name = NULL;
+MPGL_EXT_FUNCS
+MPGL_EXT_SHADER_FUNCS
+MPGL_EXT_INSTANCED_FUNCS
+#undef MPGL_EXT
+
+static int ExtLoad(void)
+{
+#define MPGL_EXT(type, name) if ((name = (type)wglGetProcAddress(#name)) == NULL) return FALSE;
+	MPGL_EXT_FUNCS
+#undef MPGL_EXT
+	return TRUE;
+}
+
+static int ExtLoadShader(void)
+{
+#define MPGL_EXT(type, name) if ((name = (type)wglGetProcAddress(#name)) == NULL) return FALSE;
+	MPGL_EXT_SHADER_FUNCS
+#undef MPGL_EXT
+	return TRUE;
+}
+
+static int ExtLoadInstanced(void)
+{
+#define MPGL_EXT(type, name) if ((name = (type)wglGetProcAddress(#name)) == NULL) return FALSE;
+	MPGL_EXT_INSTANCED_FUNCS
+#undef MPGL_EXT
+	return TRUE;
+}
+#endif
+
+static int ExtVersion(int major, int minor)
+{
+	int ma, mi;
+	const char *version = (const char *)glGetString(GL_VERSION);
+
+	if (version == NULL) return FALSE;
+	if (sscanf(version, "%d.%d", &ma, &mi) != 2) return FALSE;
+	return (ma > major || (ma == major && mi >= minor));
+}
+
+/* a GL context is current, GL objects can be deleted only in the context which made them */
+int MPGL_ExtCurrent(void)
+{
+	return glGetString(GL_VERSION) != NULL;
+}
+
+int MPGL_ExtSupport(int ext)
+{
+	static int init = FALSE;
+	static int buffer = FALSE;
+	static int texture = FALSE;
+	static int pixel_buffer = FALSE;
+	static int shader = FALSE;
+	static int instanced = FALSE;
+
+	if (!init) {
+		if (glGetString(GL_VERSION) == NULL) return FALSE;
+		buffer = ExtVersion(1, 5);
+		texture = ExtVersion(1, 3);
+		pixel_buffer = ExtVersion(2, 1);
+		shader = ExtVersion(2, 0);
+		instanced = ExtVersion(3, 3);
+#ifdef WIN32
+		if (!ExtLoad()) buffer = pixel_buffer = FALSE;
+		if (!ExtLoadShader()) shader = FALSE;
+		if (!ExtLoadInstanced()) instanced = FALSE;
+#endif
+		init = TRUE;
+	}
+	if (ext == MPGL_ExtBuffer) return buffer;
+	else if (ext == MPGL_ExtTexture) return texture;
+	else if (ext == MPGL_ExtPixelBuffer) return pixel_buffer;
+	else if (ext == MPGL_ExtShader) return shader;
+	else if (ext == MPGL_ExtInstanced) return (instanced && shader && buffer);
+	return FALSE;
+}
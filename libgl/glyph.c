@@ -0,0 +1,438 @@
+#include "MPGLGrid.h"
+
+#define GLYPH_SLICES 16
+#define GLYPH_RADIUS 0.1f
+
+/* unit cylinder of the cylinder list is oriented to the vector, scaled to its length and radius
+   and drawn at the origin of each instance, element size of the modelview is cancelled */
+static const char *GlyphVertexShader =
+"#version 120\n"
+"attribute vec3 origin;\n"
+"attribute vec4 vector;\n"
+"attribute vec4 color;\n"
+"uniform vec3 element;\n"
+"uniform int nlight;\n"
+"void main()\n"
+"{\n"
+"	int i;\n"
+"	float len = length(vector.xyz);\n"
+"	vec3 w = vector.xyz / len;\n"
+"	vec3 u = normalize(cross((abs(w.z) < 0.9) ? vec3(0.0, 0.0, 1.0) : vec3(1.0, 0.0, 0.0), w));\n"
+"	mat3 r = mat3(u, cross(w, u), w);\n"
+"	vec3 size = vec3(vector.w, vector.w, len);\n"
+"	vec4 p = vec4(origin + r * (gl_Vertex.xyz * size) / element, 1.0);\n"
+"	vec3 n = normalize(gl_NormalMatrix * (element * (r * (gl_Normal / size))));\n"
+"	vec3 l;\n"
+"	vec4 c = (nlight > 0) ? gl_FrontMaterial.emission + gl_LightModel.ambient * color : color;\n"
+"	for (i = 0; i < nlight; i++) {\n"
+"		l = normalize(gl_LightSource[i].position.xyz - (gl_ModelViewMatrix * p).xyz * gl_LightSource[i].position.w);\n"
+"		c += gl_LightSource[i].ambient * color + gl_LightSource[i].diffuse * color * max(dot(n, l), 0.0);\n"
+"		if (dot(n, l) > 0.0) {\n"
+"			c += gl_LightSource[i].specular * gl_FrontMaterial.specular\n"
+"				* pow(max(dot(n, normalize(l + vec3(0.0, 0.0, 1.0))), 0.0), gl_FrontMaterial.shininess);\n"
+"		}\n"
+"	}\n"
+"	gl_FrontColor = vec4(c.rgb, color.a);\n"
+"	gl_Position = gl_ModelViewProjectionMatrix * p;\n"
+"}\n";
+
+static const char *GlyphFragmentShader =
+"#version 120\n"
+"void main()\n"
+"{\n"
+"	gl_FragColor = gl_Color;\n"
+"}\n";
+
+void MPGL_GridGlyphInit(MPGL_GridGlyph *glyph)
+{
+	int i;
+
+	glyph->ninstance = 0;
+	glyph->size = 0;
+	glyph->origin = NULL;
+	glyph->vector = NULL;
+	glyph->color = NULL;
+	glyph->nvertex = 0;
+	for (i = 0; i < 5; i++) glyph->buffer[i] = 0;
+	glyph->program = 0;
+	glyph->status = 0;
+	glyph->cached = FALSE;
+	memset(&(glyph->key), 0, sizeof(MPGL_GridDrawKey));
+}
+
+static void GlyphFreeArrays(MPGL_GridGlyph *glyph)
+{
+	free(glyph->origin);
+	free(glyph->vector);
+	free(glyph->color);
+	glyph->origin = NULL;
+	glyph->vector = NULL;
+	glyph->color = NULL;
+	glyph->ninstance = 0;
+	glyph->size = 0;
+	glyph->cached = FALSE;
+}
+
+void MPGL_GridGlyphFree(MPGL_GridGlyph *glyph)
+{
+	int i;
+
+	GlyphFreeArrays(glyph);
+	if ((glyph->buffer[0] != 0 || glyph->program != 0) && MPGL_ExtCurrent()) {
+		if (glyph->buffer[0] != 0) glDeleteBuffers(5, glyph->buffer);
+		if (glyph->program != 0) glDeleteProgram(glyph->program);
+	}
+	for (i = 0; i < 5; i++) glyph->buffer[i] = 0;
+	glyph->program = 0;
+	glyph->status = 0;
+}
+
+static int GlyphAlloc(MPGL_GridGlyph *glyph, int n)
+{
+	if (n <= glyph->size) return TRUE;
+	GlyphFreeArrays(glyph);
+	glyph->origin = (float *)malloc((size_t)n * 3 * sizeof(float));
+	glyph->vector = (float *)malloc((size_t)n * 4 * sizeof(float));
+	glyph->color = (unsigned char *)malloc((size_t)n * 4);
+	if (glyph->origin == NULL || glyph->vector == NULL || glyph->color == NULL) {
+		GlyphFreeArrays(glyph);
+		return FALSE;
+	}
+	glyph->size = n;
+	return TRUE;
+}
+
+static double *GlyphArray(int kind, MP_GridData *data)
+{
+	if (kind == MPGL_DrawKindVal) return data->val;
+	else if (kind == MPGL_DrawKindCx) return data->cx;
+	else if (kind == MPGL_DrawKindCy) return data->cy;
+	else if (kind == MPGL_DrawKindCz) return data->cz;
+	return NULL;
+}
+
+/* displayed cell with finite and nonzero coefficient vector, return its length or zero */
+static double GlyphLength(MPGL_GridDrawData *draw, MP_GridData *data, int id)
+{
+	double len;
+
+	if (!draw->disp[data->type[id]]) return 0.0;
+	len = sqrt(data->cx[id] * data->cx[id] + data->cy[id] * data->cy[id] + data->cz[id] * data->cz[id]);
+	if (len - len != 0.0) return 0.0;
+	return len;
+}
+
+static void GlyphKey(MPGL_GridDrawData *draw, MP_GridData *data, MPGL_Colormap *colormap, MPGL_GridDrawKey *key)
+{
+	int i;
+
+	memset(key, 0, sizeof(MPGL_GridDrawKey));
+	key->data = data;
+	key->type = data->type;
+	key->update = data->update;
+	key->val = data->val;
+	for (i = 0; i < 3; i++) key->size[i] = data->size[i];
+	key->step = data->step;
+	key->local_coef = data->local_coef;
+	key->kind = draw->kind;
+	MPGL_GridDrawDispRange(draw, data, key->range);
+	for (i = 0; i < MPGL_GRID_TYPE_MAX; i++) key->disp[i] = draw->disp[i];
+	key->nstep = colormap->nstep;
+	memcpy(key->step_color, colormap->step_color, sizeof(key->step_color));
+	key->ngrad = colormap->ngrad;
+	memcpy(key->grad_color, colormap->grad_color, sizeof(key->grad_color));
+	key->cmp_range[0] = colormap->range[0];
+	key->cmp_range[1] = colormap->range[1];
+	key->glyph_stride = (draw->glyph_stride > 1) ? draw->glyph_stride : 1;
+	key->glyph_scale = draw->glyph_scale;
+}
+
+/* instances of every stride cells of a layer from n, only counted with maximum length if max is given */
+static int GlyphLayer(MPGL_GridGlyph *glyph, MPGL_GridDrawData *draw, MP_GridData *data, MPGL_Colormap *colormap,
+	int range[], int stride, int z, double scale, int n, double *max)
+{
+	int x, y, id;
+	int count = 0;
+	double len;
+	double *array = GlyphArray(draw->kind, data);
+
+	for (y = range[1]; y <= range[4]; y += stride) {
+		for (x = range[0]; x <= range[3]; x += stride) {
+			id = MP_GRID_INDEX(data, x, y, z);
+			len = GlyphLength(draw, data, id);
+			if (len <= 0.0) continue;
+			if (max != NULL) {
+				if (len > *max) *max = len;
+			}
+			else {
+				glyph->origin[3 * n] = (float)x, glyph->origin[3 * n + 1] = (float)y, glyph->origin[3 * n + 2] = (float)z;
+				glyph->vector[4 * n] = (float)(data->cx[id] * scale);
+				glyph->vector[4 * n + 1] = (float)(data->cy[id] * scale);
+				glyph->vector[4 * n + 2] = (float)(data->cz[id] * scale);
+				glyph->vector[4 * n + 3] = GLYPH_RADIUS * stride;
+				if (draw->kind == MPGL_DrawKindType) MPGL_ColormapStepBytes(colormap, &(data->type[id]), 1, 1, &(glyph->color[4 * n]));
+				else if (draw->kind == MPGL_DrawKindUpdate && data->update != NULL) {
+					MPGL_ColormapStepBytes(colormap, &(data->update[id]), 1, 1, &(glyph->color[4 * n]));
+				}
+				else if (array != NULL) MPGL_ColormapGradBytes(colormap, &(array[id]), 1, 1, &(glyph->color[4 * n]));
+				else memset(&(glyph->color[4 * n]), 255, 4);
+				n++;
+			}
+			count++;
+		}
+	}
+	return count;
+}
+
+/* instance attributes of glyphs of every glyph_stride cells in displayed range by counting and filling
+   layers in parallel, vectors of local coefficients are scaled so that the longest one is glyph_scale
+   times stride cells, built again only if grid data, displayed cells or colors have changed */
+int MPGL_GridGlyphBuild(MPGL_GridGlyph *glyph, MPGL_GridDrawData *draw, MP_GridData *data, MPGL_Colormap *colormap)
+{
+	int k, n, nz, stride;
+	int *count;
+	double max = 0.0, scale;
+	double *layer_max;
+	MPGL_GridDrawKey key;
+
+	if (!data->local_coef) return FALSE;
+	GlyphKey(draw, data, colormap, &key);
+	if (glyph->cached && memcmp(&key, &(glyph->key), sizeof(MPGL_GridDrawKey)) == 0) return TRUE;
+	glyph->cached = FALSE;
+	glyph->ninstance = 0;
+	stride = key.glyph_stride;
+	nz = (key.range[5] >= key.range[2]) ? (key.range[5] - key.range[2]) / stride + 1 : 0;
+	count = (int *)malloc((nz + 1) * sizeof(int));
+	layer_max = (double *)malloc((nz + 1) * sizeof(double));
+	if (count == NULL || layer_max == NULL) {
+		free(count);
+		free(layer_max);
+		return FALSE;
+	}
+	MPGL_ColormapUpdateTable(colormap);
+#ifdef _OPENMP
+#pragma omp parallel for num_threads(MPGL_GridDrawThreads(draw)) schedule(static, 1)
+#endif
+	for (k = 0; k < nz; k++) {
+		layer_max[k] = 0.0;
+		count[k] = GlyphLayer(glyph, draw, data, colormap, key.range, stride, key.range[2] + k * stride, 0.0, 0, &(layer_max[k]));
+	}
+	n = 0;
+	for (k = 0; k < nz; k++) {
+		if (layer_max[k] > max) max = layer_max[k];
+		n += count[k];
+		count[k] = n - count[k];
+	}
+	if (n > 0 && !GlyphAlloc(glyph, n)) {
+		free(count);
+		free(layer_max);
+		return FALSE;
+	}
+	scale = (max > 0.0) ? draw->glyph_scale * stride / max : 0.0;
+	if (n > 0) {
+#ifdef _OPENMP
+#pragma omp parallel for num_threads(MPGL_GridDrawThreads(draw)) schedule(static, 1)
+#endif
+		for (k = 0; k < nz; k++) {
+			GlyphLayer(glyph, draw, data, colormap, key.range, stride, key.range[2] + k * stride, scale, count[k], NULL);
+		}
+	}
+	free(count);
+	free(layer_max);
+	glyph->ninstance = n;
+	if (n > 0 && MPGL_ExtSupport(MPGL_ExtInstanced) && glyph->buffer[0] != 0) {
+		glBindBuffer(GL_ARRAY_BUFFER, glyph->buffer[2]);
+		glBufferData(GL_ARRAY_BUFFER, (GLsizeiptr)n * 3 * sizeof(float), glyph->origin, GL_STATIC_DRAW);
+		glBindBuffer(GL_ARRAY_BUFFER, glyph->buffer[3]);
+		glBufferData(GL_ARRAY_BUFFER, (GLsizeiptr)n * 4 * sizeof(float), glyph->vector, GL_STATIC_DRAW);
+		glBindBuffer(GL_ARRAY_BUFFER, glyph->buffer[4]);
+		glBufferData(GL_ARRAY_BUFFER, (GLsizeiptr)n * 4, glyph->color, GL_STATIC_DRAW);
+		glBindBuffer(GL_ARRAY_BUFFER, 0);
+	}
+	memcpy(&(glyph->key), &key, sizeof(MPGL_GridDrawKey));
+	glyph->cached = TRUE;
+	return TRUE;
+}
+
+static unsigned int GlyphShader(GLenum type, const char *source)
+{
+	GLint status;
+	unsigned int shader = glCreateShader(type);
+
+	glShaderSource(shader, 1, &source, NULL);
+	glCompileShader(shader);
+	glGetShaderiv(shader, GL_COMPILE_STATUS, &status);
+	if (!status) {
+		glDeleteShader(shader);
+		return 0;
+	}
+	return shader;
+}
+
+static void GlyphVertex(float vertex[], float normal[], float x, float y, float z, float nx, float ny, float nz)
+{
+	vertex[0] = x, vertex[1] = y, vertex[2] = z;
+	normal[0] = nx, normal[1] = ny, normal[2] = nz;
+}
+
+/* triangles of the unit cylinder of the cylinder list with caps, return number of vertices */
+static int GlyphCylinder(float vertex[], float normal[])
+{
+	int k, n = 0;
+	float c0, s0, c1, s1;
+
+	for (k = 0; k < GLYPH_SLICES; k++) {
+		c0 = (float)cos(2.0 * M_PI * k / GLYPH_SLICES), s0 = (float)sin(2.0 * M_PI * k / GLYPH_SLICES);
+		c1 = (float)cos(2.0 * M_PI * (k + 1) / GLYPH_SLICES), s1 = (float)sin(2.0 * M_PI * (k + 1) / GLYPH_SLICES);
+		GlyphVertex(&(vertex[3 * n]), &(normal[3 * n]), c0, s0, 0.0f, c0, s0, 0.0f), n++;
+		GlyphVertex(&(vertex[3 * n]), &(normal[3 * n]), c1, s1, 0.0f, c1, s1, 0.0f), n++;
+		GlyphVertex(&(vertex[3 * n]), &(normal[3 * n]), c1, s1, 1.0f, c1, s1, 0.0f), n++;
+		GlyphVertex(&(vertex[3 * n]), &(normal[3 * n]), c0, s0, 0.0f, c0, s0, 0.0f), n++;
+		GlyphVertex(&(vertex[3 * n]), &(normal[3 * n]), c1, s1, 1.0f, c1, s1, 0.0f), n++;
+		GlyphVertex(&(vertex[3 * n]), &(normal[3 * n]), c0, s0, 1.0f, c0, s0, 0.0f), n++;
+		GlyphVertex(&(vertex[3 * n]), &(normal[3 * n]), 0.0f, 0.0f, 1.0f, 0.0f, 0.0f, 1.0f), n++;
+		GlyphVertex(&(vertex[3 * n]), &(normal[3 * n]), c0, s0, 1.0f, 0.0f, 0.0f, 1.0f), n++;
+		GlyphVertex(&(vertex[3 * n]), &(normal[3 * n]), c1, s1, 1.0f, 0.0f, 0.0f, 1.0f), n++;
+		GlyphVertex(&(vertex[3 * n]), &(normal[3 * n]), 0.0f, 0.0f, 0.0f, 0.0f, 0.0f, -1.0f), n++;
+		GlyphVertex(&(vertex[3 * n]), &(normal[3 * n]), c1, s1, 0.0f, 0.0f, 0.0f, -1.0f), n++;
+		GlyphVertex(&(vertex[3 * n]), &(normal[3 * n]), c0, s0, 0.0f, 0.0f, 0.0f, -1.0f), n++;
+	}
+	return n;
+}
+
+/* compile and link instancing program and upload cylinder once in a context, return FALSE if it fails */
+static int GlyphProgram(MPGL_GridGlyph *glyph)
+{
+	GLint status;
+	unsigned int vertex, fragment;
+	float cylinder[2][12 * GLYPH_SLICES * 3];
+
+	if (glyph->status > 0 && glIsProgram(glyph->program)) return TRUE;
+	if (glyph->status < 0) return FALSE;
+	glyph->status = -1;
+	vertex = GlyphShader(GL_VERTEX_SHADER, GlyphVertexShader);
+	fragment = GlyphShader(GL_FRAGMENT_SHADER, GlyphFragmentShader);
+	if (vertex != 0 && fragment != 0) {
+		glyph->program = glCreateProgram();
+		glAttachShader(glyph->program, vertex);
+		glAttachShader(glyph->program, fragment);
+		glLinkProgram(glyph->program);
+		glGetProgramiv(glyph->program, GL_LINK_STATUS, &status);
+		if (status) glyph->status = 1;
+		else {
+			glDeleteProgram(glyph->program);
+			glyph->program = 0;
+		}
+	}
+	if (vertex != 0) glDeleteShader(vertex);
+	if (fragment != 0) glDeleteShader(fragment);
+	if (glyph->status < 0) return FALSE;
+	glyph->nvertex = GlyphCylinder(cylinder[0], cylinder[1]);
+	glGenBuffers(5, glyph->buffer);
+	glBindBuffer(GL_ARRAY_BUFFER, glyph->buffer[0]);
+	glBufferData(GL_ARRAY_BUFFER, sizeof(cylinder[0]), cylinder[0], GL_STATIC_DRAW);
+	glBindBuffer(GL_ARRAY_BUFFER, glyph->buffer[1]);
+	glBufferData(GL_ARRAY_BUFFER, sizeof(cylinder[1]), cylinder[1], GL_STATIC_DRAW);
+	glBindBuffer(GL_ARRAY_BUFFER, 0);
+	/* instances are uploaded again to new buffers */
+	glyph->cached = FALSE;
+	return TRUE;
+}
+
+static void GlyphAttrib(unsigned int program, const char *name, unsigned int buffer, int size, GLenum type, int normalized)
+{
+	GLint loc = glGetAttribLocation(program, name);
+
+	if (loc < 0) return;
+	glBindBuffer(GL_ARRAY_BUFFER, buffer);
+	glEnableVertexAttribArray(loc);
+	glVertexAttribPointer(loc, size, type, (GLboolean)normalized, 0, NULL);
+	glVertexAttribDivisor(loc, 1);
+}
+
+static void GlyphAttribOff(unsigned int program, const char *name)
+{
+	GLint loc = glGetAttribLocation(program, name);
+
+	if (loc < 0) return;
+	glVertexAttribDivisor(loc, 0);
+	glDisableVertexAttribArray(loc);
+}
+
+/* all glyphs by one instanced draw call */
+static void GlyphDrawInstanced(MPGL_GridGlyph *glyph, float scale[])
+{
+	int nlight = 0;
+	unsigned int program = glyph->program;
+
+	if (glIsEnabled(GL_LIGHTING)) {
+		while (nlight < 8 && glIsEnabled(GL_LIGHT0 + nlight)) nlight++;
+	}
+	glPushClientAttrib(GL_CLIENT_VERTEX_ARRAY_BIT);
+	glUseProgram(program);
+	glUniform3f(glGetUniformLocation(program, "element"), scale[0], scale[1], scale[2]);
+	glUniform1i(glGetUniformLocation(program, "nlight"), nlight);
+	glEnableClientState(GL_VERTEX_ARRAY);
+	glEnableClientState(GL_NORMAL_ARRAY);
+	glBindBuffer(GL_ARRAY_BUFFER, glyph->buffer[0]);
+	glVertexPointer(3, GL_FLOAT, 0, NULL);
+	glBindBuffer(GL_ARRAY_BUFFER, glyph->buffer[1]);
+	glNormalPointer(GL_FLOAT, 0, NULL);
+	GlyphAttrib(program, "origin", glyph->buffer[2], 3, GL_FLOAT, FALSE);
+	GlyphAttrib(program, "vector", glyph->buffer[3], 4, GL_FLOAT, FALSE);
+	GlyphAttrib(program, "color", glyph->buffer[4], 4, GL_UNSIGNED_BYTE, TRUE);
+	glBindBuffer(GL_ARRAY_BUFFER, 0);
+	glDrawArraysInstanced(GL_TRIANGLES, 0, glyph->nvertex, glyph->ninstance);
+	GlyphAttribOff(program, "origin");
+	GlyphAttribOff(program, "vector");
+	GlyphAttribOff(program, "color");
+	glUseProgram(0);
+	glPopClientAttrib();
+}
+
+/* each glyph by the cylinder list */
+static void GlyphDrawList(MPGL_GridGlyph *glyph, float scale[])
+{
+	int i, k;
+	float len, norm;
+	float w[3], u[3], v[3];
+	float mat[16];
+
+	for (i = 0; i < glyph->ninstance; i++) {
+		len = (float)sqrt(glyph->vector[4 * i] * glyph->vector[4 * i] + glyph->vector[4 * i + 1] * glyph->vector[4 * i + 1]
+			+ glyph->vector[4 * i + 2] * glyph->vector[4 * i + 2]);
+		for (k = 0; k < 3; k++) w[k] = glyph->vector[4 * i + k] / len;
+		if (fabs(w[2]) < 0.9) u[0] = -w[1], u[1] = w[0], u[2] = 0.0f;
+		else u[0] = 0.0f, u[1] = -w[2], u[2] = w[1];
+		norm = (float)sqrt(u[0] * u[0] + u[1] * u[1] + u[2] * u[2]);
+		for (k = 0; k < 3; k++) u[k] /= norm;
+		v[0] = w[1] * u[2] - w[2] * u[1], v[1] = w[2] * u[0] - w[0] * u[2], v[2] = w[0] * u[1] - w[1] * u[0];
+		for (k = 0; k < 3; k++) {
+			mat[k] = u[k], mat[4 + k] = v[k], mat[8 + k] = w[k], mat[12 + k] = 0.0f;
+		}
+		mat[3] = mat[7] = mat[11] = 0.0f, mat[15] = 1.0f;
+		glColor4ubv(&(glyph->color[4 * i]));
+		glPushMatrix();
+		glTranslatef(glyph->origin[3 * i], glyph->origin[3 * i + 1], glyph->origin[3 * i + 2]);
+		glScalef(1.0f / scale[0], 1.0f / scale[1], 1.0f / scale[2]);
+		glMultMatrixf(mat);
+		glScalef(glyph->vector[4 * i + 3], glyph->vector[4 * i + 3], len);
+		glCallList(MPGL_GRID_CYLINDER_LIST);
+		glPopMatrix();
+	}
+}
+
+/* glyphs of local coefficient vectors colored by kind, by one instanced draw call if supported,
+   otherwise by the cylinder list for each glyph, scale is element size of the modelview,
+   return FALSE if grid data has no local coefficients */
+int MPGL_GridGlyphDraw(MPGL_GridGlyph *glyph, MPGL_GridDrawData *draw, MP_GridData *data, MPGL_Colormap *colormap,
+	float scale[])
+{
+	int instanced = MPGL_ExtSupport(MPGL_ExtInstanced) && GlyphProgram(glyph);
+
+	if (!MPGL_GridGlyphBuild(glyph, draw, data, colormap)) return FALSE;
+	if (glyph->ninstance <= 0) return TRUE;
+	if (instanced) GlyphDrawInstanced(glyph, scale);
+	else GlyphDrawList(glyph, scale);
+	return TRUE;
+}
@@ -0,0 +1,350 @@
+#include "MPGLGrid.h"
+
+#define INSTANCE_POSITION_MAX 32767
+
+/* unit cube of the cube list is moved to the position of each instance */
+static const char *InstanceVertexShader =
+"#version 120\n"
+"attribute vec4 position;\n"
+"attribute vec4 color;\n"
+"uniform int nlight;\n"
+"void main()\n"
+"{\n"
+"	int i;\n"
+"	vec4 p = vec4(gl_Vertex.xyz + position.xyz, 1.0);\n"
+"	vec3 n = normalize(gl_NormalMatrix * gl_Normal);\n"
+"	vec3 l;\n"
+"	vec4 c = (nlight > 0) ? gl_FrontMaterial.emission + gl_LightModel.ambient * color : color;\n"
+"	for (i = 0; i < nlight; i++) {\n"
+"		l = normalize(gl_LightSource[i].position.xyz - (gl_ModelViewMatrix * p).xyz * gl_LightSource[i].position.w);\n"
+"		c += gl_LightSource[i].ambient * color + gl_LightSource[i].diffuse * color * max(dot(n, l), 0.0);\n"
+"		if (dot(n, l) > 0.0) {\n"
+"			c += gl_LightSource[i].specular * gl_FrontMaterial.specular\n"
+"				* pow(max(dot(n, normalize(l + vec3(0.0, 0.0, 1.0))), 0.0), gl_FrontMaterial.shininess);\n"
+"		}\n"
+"	}\n"
+"	gl_FrontColor = vec4(c.rgb, color.a);\n"
+"	gl_Position = gl_ModelViewProjectionMatrix * p;\n"
+"}\n";
+
+static const char *InstanceFragmentShader =
+"#version 120\n"
+"void main()\n"
+"{\n"
+"	gl_FragColor = gl_Color;\n"
+"}\n";
+
+/* vertices and faces of GridCube, counterclockwise seen from outside */
+static const float InstanceVertex[8][3] = {
+	{ -0.5f, -0.5f,  0.5f }, { 0.5f, -0.5f,  0.5f }, { 0.5f,  0.5f,  0.5f }, { -0.5f,  0.5f,  0.5f },
+	{ 0.5f, -0.5f, -0.5f }, { -0.5f, -0.5f, -0.5f }, { -0.5f,  0.5f, -0.5f }, { 0.5f,  0.5f, -0.5f }
+};
+
+static const float InstanceNormal[6][3] = {
+	{ 0.0f,  0.0f,  1.0f }, { 0.0f,  0.0f, -1.0f }, { 1.0f,  0.0f,  0.0f },
+	{ -1.0f,  0.0f,  0.0f }, { 0.0f,  1.0f,  0.0f }, { 0.0f, -1.0f,  0.0f }
+};
+
+static const int InstanceFace[6][4] = {
+	{ 0, 1, 2, 3 }, { 4, 5, 6, 7 }, { 1, 4, 7, 2 }, { 5, 0, 3, 6 }, { 3, 2, 7, 6 }, { 1, 0, 5, 4 }
+};
+
+void MPGL_GridInstanceInit(MPGL_GridInstance *instance)
+{
+	int i;
+
+	instance->ninstance = 0;
+	instance->size = 0;
+	instance->position = NULL;
+	instance->color = NULL;
+	for (i = 0; i < 4; i++) instance->buffer[i] = 0;
+	instance->program = 0;
+	instance->status = 0;
+	instance->cached = FALSE;
+	memset(&(instance->key), 0, sizeof(MPGL_GridDrawKey));
+	instance->nbuild = 0;
+}
+
+static void InstanceFreeArrays(MPGL_GridInstance *instance)
+{
+	free(instance->position);
+	free(instance->color);
+	instance->position = NULL;
+	instance->color = NULL;
+	instance->ninstance = 0;
+	instance->size = 0;
+	instance->cached = FALSE;
+}
+
+void MPGL_GridInstanceFree(MPGL_GridInstance *instance)
+{
+	int i;
+
+	InstanceFreeArrays(instance);
+	if ((instance->buffer[0] != 0 || instance->program != 0) && MPGL_ExtCurrent()) {
+		if (instance->buffer[0] != 0) glDeleteBuffers(4, instance->buffer);
+		if (instance->program != 0) glDeleteProgram(instance->program);
+	}
+	for (i = 0; i < 4; i++) instance->buffer[i] = 0;
+	instance->program = 0;
+	instance->status = 0;
+}
+
+static int InstanceAlloc(MPGL_GridInstance *instance, int n)
+{
+	if (n <= instance->size) return TRUE;
+	InstanceFreeArrays(instance);
+	instance->position = (short *)malloc((size_t)n * 4 * sizeof(short));
+	instance->color = (unsigned char *)malloc((size_t)n * 4);
+	if (instance->position == NULL || instance->color == NULL) {
+		InstanceFreeArrays(instance);
+		return FALSE;
+	}
+	instance->size = n;
+	return TRUE;
+}
+
+static double *InstanceArray(int kind, MP_GridData *data)
+{
+	if (kind == MPGL_DrawKindVal) return data->val;
+	else if (kind == MPGL_DrawKindCx && data->local_coef) return data->cx;
+	else if (kind == MPGL_DrawKindCy && data->local_coef) return data->cy;
+	else if (kind == MPGL_DrawKindCz && data->local_coef) return data->cz;
+	return NULL;
+}
+
+static void InstanceKey(MPGL_GridDrawData *draw, MP_GridData *data, MPGL_Colormap *colormap, MPGL_GridDrawKey *key)
+{
+	int i;
+
+	memset(key, 0, sizeof(MPGL_GridDrawKey));
+	key->data = data;
+	key->type = data->type;
+	key->update = data->update;
+	key->val = InstanceArray(draw->kind, data);
+	for (i = 0; i < 3; i++) key->size[i] = data->size[i];
+	key->step = data->step;
+	key->local_coef = data->local_coef;
+	key->kind = draw->kind;
+	MPGL_GridDrawDispRange(draw, data, key->range);
+	for (i = 0; i < MPGL_GRID_TYPE_MAX; i++) key->disp[i] = draw->disp[i];
+	key->nstep = colormap->nstep;
+	memcpy(key->step_color, colormap->step_color, sizeof(key->step_color));
+	key->ngrad = colormap->ngrad;
+	memcpy(key->grad_color, colormap->grad_color, sizeof(key->grad_color));
+	key->cmp_range[0] = colormap->range[0];
+	key->cmp_range[1] = colormap->range[1];
+}
+
+/* displayed cell with a face on the boundary of range or next to a hidden cell */
+static int InstanceExposed(MPGL_GridDrawData *draw, MP_GridData *data, int range[], int x, int y, int z, int id)
+{
+	int sx = 1, sy = data->size[0], sz = data->size[0] * data->size[1];
+
+	if (!draw->disp[data->type[id]]) return FALSE;
+	return (x == range[0] || x == range[3] || y == range[1] || y == range[4] || z == range[2] || z == range[5]
+		|| !draw->disp[data->type[id - sx]] || !draw->disp[data->type[id + sx]]
+		|| !draw->disp[data->type[id - sy]] || !draw->disp[data->type[id + sy]]
+		|| !draw->disp[data->type[id - sz]] || !draw->disp[data->type[id + sz]]);
+}
+
+/* instances of exposed cells of a layer from n, only counted if fill is FALSE */
+static int InstanceLayer(MPGL_GridInstance *instance, MPGL_GridDrawData *draw, MP_GridData *data, MPGL_Colormap *colormap,
+	int range[], int z, int n, int fill)
+{
+	int x, y, id;
+	int count = 0;
+	double *array = InstanceArray(draw->kind, data);
+
+	for (y = range[1]; y <= range[4]; y++) {
+		id = MP_GRID_INDEX(data, range[0], y, z);
+		for (x = range[0]; x <= range[3]; x++, id++) {
+			if (!InstanceExposed(draw, data, range, x, y, z, id)) continue;
+			if (fill) {
+				instance->position[4 * n] = (short)x, instance->position[4 * n + 1] = (short)y;
+				instance->position[4 * n + 2] = (short)z, instance->position[4 * n + 3] = 1;
+				if (draw->kind == MPGL_DrawKindType) MPGL_ColormapStepBytes(colormap, &(data->type[id]), 1, 1, &(instance->color[4 * n]));
+				else if (draw->kind == MPGL_DrawKindUpdate) MPGL_ColormapStepBytes(colormap, &(data->update[id]), 1, 1, &(instance->color[4 * n]));
+				else MPGL_ColormapGradBytes(colormap, &(array[id]), 1, 1, &(instance->color[4 * n]));
+				n++;
+			}
+			count++;
+		}
+	}
+	return count;
+}
+
+/* positions and colors of displayed cells exposed in displayed range by counting and filling layers
+   in parallel, built again only if grid data, displayed cells or colors have changed,
+   return FALSE if the range does not fit in positions of short */
+int MPGL_GridInstanceBuild(MPGL_GridInstance *instance, MPGL_GridDrawData *draw, MP_GridData *data, MPGL_Colormap *colormap)
+{
+	int k, n, nz;
+	int *count;
+	MPGL_GridDrawKey key;
+
+	InstanceKey(draw, data, colormap, &key);
+	for (k = 0; k < 3; k++) {
+		if (key.range[k + 3] > INSTANCE_POSITION_MAX) return FALSE;
+	}
+	if (instance->cached && memcmp(&key, &(instance->key), sizeof(MPGL_GridDrawKey)) == 0) return TRUE;
+	instance->cached = FALSE;
+	instance->ninstance = 0;
+	/* kinds of local coefficients without them have no colors */
+	if (key.kind >= MPGL_DrawKindVal && key.val == NULL) nz = 0;
+	else nz = (key.range[5] >= key.range[2]) ? key.range[5] - key.range[2] + 1 : 0;
+	count = (int *)malloc((nz + 1) * sizeof(int));
+	if (count == NULL) return FALSE;
+	MPGL_ColormapUpdateTable(colormap);
+#ifdef _OPENMP
+#pragma omp parallel for num_threads(MPGL_GridDrawThreads(draw)) schedule(static, 1)
+#endif
+	for (k = 0; k < nz; k++) {
+		count[k] = InstanceLayer(instance, draw, data, colormap, key.range, key.range[2] + k, 0, FALSE);
+	}
+	n = 0;
+	for (k = 0; k < nz; k++) {
+		n += count[k];
+		count[k] = n - count[k];
+	}
+	if (n > 0 && !InstanceAlloc(instance, n)) {
+		free(count);
+		return FALSE;
+	}
+	if (n > 0) {
+#ifdef _OPENMP
+#pragma omp parallel for num_threads(MPGL_GridDrawThreads(draw)) schedule(static, 1)
+#endif
+		for (k = 0; k < nz; k++) {
+			InstanceLayer(instance, draw, data, colormap, key.range, key.range[2] + k, count[k], TRUE);
+		}
+	}
+	free(count);
+	instance->ninstance = n;
+	if (n > 0 && instance->buffer[0] != 0) {
+		glBindBuffer(GL_ARRAY_BUFFER, instance->buffer[2]);
+		glBufferData(GL_ARRAY_BUFFER, (GLsizeiptr)n * 4 * sizeof(short), instance->position, GL_STATIC_DRAW);
+		glBindBuffer(GL_ARRAY_BUFFER, instance->buffer[3]);
+		glBufferData(GL_ARRAY_BUFFER, (GLsizeiptr)n * 4, instance->color, GL_STATIC_DRAW);
+		glBindBuffer(GL_ARRAY_BUFFER, 0);
+	}
+	memcpy(&(instance->key), &key, sizeof(MPGL_GridDrawKey));
+	instance->cached = TRUE;
+	instance->nbuild++;
+	return TRUE;
+}
+
+static unsigned int InstanceShader(GLenum type, const char *source)
+{
+	GLint status;
+	unsigned int shader = glCreateShader(type);
+
+	glShaderSource(shader, 1, &source, NULL);
+	glCompileShader(shader);
+	glGetShaderiv(shader, GL_COMPILE_STATUS, &status);
+	if (!status) {
+		glDeleteShader(shader);
+		return 0;
+	}
+	return shader;
+}
+
+/* compile and link instancing program and upload cube once in a context, return FALSE if it fails */
+static int InstanceProgram(MPGL_GridInstance *instance)
+{
+	int i, k, n = 0;
+	GLint status;
+	unsigned int vertex, fragment;
+	static const int tri[6] = { 0, 1, 2, 0, 2, 3 };
+	float cube[2][36][3];
+
+	if (instance->status > 0 && glIsProgram(instance->program)) return TRUE;
+	if (instance->status < 0) return FALSE;
+	instance->status = -1;
+	vertex = InstanceShader(GL_VERTEX_SHADER, InstanceVertexShader);
+	fragment = InstanceShader(GL_FRAGMENT_SHADER, InstanceFragmentShader);
+	if (vertex != 0 && fragment != 0) {
+		instance->program = glCreateProgram();
+		glAttachShader(instance->program, vertex);
+		glAttachShader(instance->program, fragment);
+		glLinkProgram(instance->program);
+		glGetProgramiv(instance->program, GL_LINK_STATUS, &status);
+		if (status) instance->status = 1;
+		else {
+			glDeleteProgram(instance->program);
+			instance->program = 0;
+		}
+	}
+	if (vertex != 0) glDeleteShader(vertex);
+	if (fragment != 0) glDeleteShader(fragment);
+	if (instance->status < 0) return FALSE;
+	for (i = 0; i < 6; i++) {
+		for (k = 0; k < 6; k++, n++) {
+			memcpy(cube[0][n], InstanceVertex[InstanceFace[i][tri[k]]], sizeof(cube[0][n]));
+			memcpy(cube[1][n], InstanceNormal[i], sizeof(cube[1][n]));
+		}
+	}
+	glGenBuffers(4, instance->buffer);
+	glBindBuffer(GL_ARRAY_BUFFER, instance->buffer[0]);
+	glBufferData(GL_ARRAY_BUFFER, sizeof(cube[0]), cube[0], GL_STATIC_DRAW);
+	glBindBuffer(GL_ARRAY_BUFFER, instance->buffer[1]);
+	glBufferData(GL_ARRAY_BUFFER, sizeof(cube[1]), cube[1], GL_STATIC_DRAW);
+	glBindBuffer(GL_ARRAY_BUFFER, 0);
+	/* instances are uploaded again to new buffers */
+	instance->cached = FALSE;
+	return TRUE;
+}
+
+static void InstanceAttrib(unsigned int program, const char *name, unsigned int buffer, GLenum type, int normalized)
+{
+	GLint loc = glGetAttribLocation(program, name);
+
+	if (loc < 0) return;
+	glBindBuffer(GL_ARRAY_BUFFER, buffer);
+	glEnableVertexAttribArray(loc);
+	glVertexAttribPointer(loc, 4, type, (GLboolean)normalized, 0, NULL);
+	glVertexAttribDivisor(loc, 1);
+}
+
+static void InstanceAttribOff(unsigned int program, const char *name)
+{
+	GLint loc = glGetAttribLocation(program, name);
+
+	if (loc < 0) return;
+	glVertexAttribDivisor(loc, 0);
+	glDisableVertexAttribArray(loc);
+}
+
+/* exposed cells as cubes by one instanced draw call, return FALSE if instancing is not supported
+   or the range does not fit in positions of short */
+int MPGL_GridInstanceDraw(MPGL_GridInstance *instance, MPGL_GridDrawData *draw, MP_GridData *data, MPGL_Colormap *colormap)
+{
+	int nlight = 0;
+	unsigned int program;
+
+	if (!MPGL_ExtSupport(MPGL_ExtInstanced) || !InstanceProgram(instance)) return FALSE;
+	if (!MPGL_GridInstanceBuild(instance, draw, data, colormap)) return FALSE;
+	if (instance->ninstance <= 0) return TRUE;
+	program = instance->program;
+	if (glIsEnabled(GL_LIGHTING)) {
+		while (nlight < 8 && glIsEnabled(GL_LIGHT0 + nlight)) nlight++;
+	}
+	glPushClientAttrib(GL_CLIENT_VERTEX_ARRAY_BIT);
+	glUseProgram(program);
+	glUniform1i(glGetUniformLocation(program, "nlight"), nlight);
+	glEnableClientState(GL_VERTEX_ARRAY);
+	glEnableClientState(GL_NORMAL_ARRAY);
+	glBindBuffer(GL_ARRAY_BUFFER, instance->buffer[0]);
+	glVertexPointer(3, GL_FLOAT, 0, NULL);
+	glBindBuffer(GL_ARRAY_BUFFER, instance->buffer[1]);
+	glNormalPointer(GL_FLOAT, 0, NULL);
+	InstanceAttrib(program, "position", instance->buffer[2], GL_SHORT, FALSE);
+	InstanceAttrib(program, "color", instance->buffer[3], GL_UNSIGNED_BYTE, TRUE);
+	glBindBuffer(GL_ARRAY_BUFFER, 0);
+	glDrawArraysInstanced(GL_TRIANGLES, 0, 36, instance->ninstance);
+	InstanceAttribOff(program, "position");
+	InstanceAttribOff(program, "color");
+	glUseProgram(0);
+	glPopClientAttrib();
+	return TRUE;
+}
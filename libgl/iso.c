@@ -0,0 +1,377 @@
+#include "MPGLGrid.h"
+
+static const int IsoCorner[8][3] = {
+	{ 0, 0, 0 }, { 1, 0, 0 }, { 1, 1, 0 }, { 0, 1, 0 },
+	{ 0, 0, 1 }, { 1, 0, 1 }, { 1, 1, 1 }, { 0, 1, 1 }
+};
+
+static const int IsoEdge[12][2] = {
+	{ 0, 1 }, { 1, 2 }, { 2, 3 }, { 3, 0 }, { 4, 5 }, { 5, 6 },
+	{ 6, 7 }, { 7, 4 }, { 0, 4 }, { 1, 5 }, { 2, 6 }, { 3, 7 }
+};
+
+/* corners of cube faces counterclockwise seen from outside */
+static const int IsoFace[6][4] = {
+	{ 0, 3, 2, 1 }, { 4, 5, 6, 7 }, { 0, 1, 5, 4 }, { 3, 7, 6, 2 }, { 0, 4, 7, 3 }, { 1, 2, 6, 5 }
+};
+
+static int IsoTable[256][16];
+
+static int IsoEdgeIndex(int a, int b)
+{
+	int e;
+
+	for (e = 0; e < 12; e++) {
+		if ((IsoEdge[e][0] == a && IsoEdge[e][1] == b) || (IsoEdge[e][0] == b && IsoEdge[e][1] == a)) return e;
+	}
+	return -1;
+}
+
+/* triangles of each case of corners below level, iso lines on cube faces cut off every run of
+   corners below level so that an ambiguous face is split the same way by both cubes sharing it,
+   the lines are chained into loops and the loops are triangulated as fans facing lower values */
+static void IsoTableBuild(void)
+{
+	int c, f, i, j, e, s, n;
+	int next[12];
+	int used[12];
+
+	for (c = 0; c < 256; c++) {
+		for (e = 0; e < 12; e++) next[e] = -1, used[e] = FALSE;
+		for (f = 0; f < 6; f++) {
+			for (i = 0; i < 4; i++) {
+				if (!((c >> IsoFace[f][(i + 1) % 4]) & 1) || ((c >> IsoFace[f][i]) & 1)) continue;
+				j = (i + 1) % 4;
+				while ((c >> IsoFace[f][(j + 1) % 4]) & 1) j = (j + 1) % 4;
+				next[IsoEdgeIndex(IsoFace[f][j], IsoFace[f][(j + 1) % 4])] = IsoEdgeIndex(IsoFace[f][i], IsoFace[f][(i + 1) % 4]);
+			}
+		}
+		n = 0;
+		for (s = 0; s < 12; s++) {
+			if (next[s] < 0 || used[s]) continue;
+			used[s] = TRUE;
+			for (e = next[s]; next[e] != s; e = next[e]) {
+				used[e] = TRUE;
+				used[next[e]] = TRUE;
+				IsoTable[c][n++] = s, IsoTable[c][n++] = e, IsoTable[c][n++] = next[e];
+			}
+		}
+		IsoTable[c][n] = -1;
+	}
+}
+
+/* build the table of cases once before isosurfaces are extracted on threads,
+   called at module load for Python */
+void MPGL_GridIsoInit(void)
+{
+	static int init = FALSE;
+
+	if (init) return;
+	IsoTableBuild();
+	init = TRUE;
+}
+
+typedef struct IsoWork {
+	MPGL_GridMesh *mesh;
+	MPGL_GridDrawData *draw;
+	MP_GridData *data;
+	MPGL_Colormap *colormap;
+	const double *field;
+	int color_kind;
+	int *range;
+	int nwork;
+	int *nvertex;
+	int *nindex;
+	int *status;
+} IsoWork;
+
+static const double *IsoField(int kind, MP_GridData *data)
+{
+	if (kind == MPGL_DrawKindVal) return data->val;
+	else if (kind == MPGL_DrawKindCx && data->local_coef) return data->cx;
+	else if (kind == MPGL_DrawKindCy && data->local_coef) return data->cy;
+	else if (kind == MPGL_DrawKindCz && data->local_coef) return data->cz;
+	return NULL;
+}
+
+/* displayed cell with finite value */
+static int IsoCell(IsoWork *work, int id)
+{
+	return (work->draw->disp[work->data->type[id]] && work->field[id] - work->field[id] == 0.0);
+}
+
+/* edge from cell a to its neighbor b crosses level */
+static int IsoCross(IsoWork *work, int a, int b)
+{
+	double level = work->draw->iso_level;
+
+	return (IsoCell(work, a) && IsoCell(work, b) && ((work->field[a] < level) != (work->field[b] < level)));
+}
+
+/* gradient of field at cell p by central differences inside range */
+static void IsoGradient(IsoWork *work, int p[], double g[])
+{
+	int k, a, b, h;
+	int q[3];
+
+	for (k = 0; k < 3; k++) {
+		q[0] = p[0], q[1] = p[1], q[2] = p[2];
+		q[k] = (p[k] > work->range[k]) ? p[k] - 1 : p[k];
+		a = MP_GRID_INDEX(work->data, q[0], q[1], q[2]);
+		h = p[k] - q[k];
+		q[k] = (p[k] < work->range[k + 3]) ? p[k] + 1 : p[k];
+		b = MP_GRID_INDEX(work->data, q[0], q[1], q[2]);
+		h += q[k] - p[k];
+		if (h == 0 || !IsoCell(work, a) || !IsoCell(work, b)) g[k] = 0.0;
+		else g[k] = (work->field[b] - work->field[a]) / h;
+	}
+}
+
+/* vertex n on edge from cell p to its neighbor along axis, normal points to lower values */
+static void IsoVertex(IsoWork *work, int n, int p[], int axis)
+{
+	int k;
+	int q[3];
+	int a = MP_GRID_INDEX(work->data, p[0], p[1], p[2]);
+	int b;
+	double t, len = 0.0;
+	double ga[3], gb[3], g[3];
+	double value;
+	const double *color_field;
+	MPGL_GridMesh *mesh = work->mesh;
+
+	q[0] = p[0], q[1] = p[1], q[2] = p[2];
+	q[axis]++;
+	b = MP_GRID_INDEX(work->data, q[0], q[1], q[2]);
+	t = (work->draw->iso_level - work->field[a]) / (work->field[b] - work->field[a]);
+	IsoGradient(work, p, ga);
+	IsoGradient(work, q, gb);
+	for (k = 0; k < 3; k++) {
+		mesh->vertex[3 * n + k] = (float)(p[k] + ((k == axis) ? t : 0.0));
+		g[k] = ga[k] + t * (gb[k] - ga[k]);
+		len += g[k] * g[k];
+	}
+	len = sqrt(len);
+	for (k = 0; k < 3; k++) {
+		mesh->normal[3 * n + k] = (len > 0.0) ? (float)(-g[k] / len) : ((k == 2) ? 1.0f : 0.0f);
+	}
+	if (work->colormap == NULL) return;
+	if (work->color_kind == MPGL_DrawKindType) {
+		MPGL_ColormapStepBytes(work->colormap, &(work->data->type[(t < 0.5) ? a : b]), 1, 1, &(mesh->color[4 * n]));
+	}
+	else if (work->color_kind == MPGL_DrawKindUpdate) {
+		MPGL_ColormapStepBytes(work->colormap, &(work->data->update[(t < 0.5) ? a : b]), 1, 1, &(mesh->color[4 * n]));
+	}
+	else {
+		color_field = IsoField(work->color_kind, work->data);
+		if (color_field == NULL) color_field = work->field;
+		value = color_field[a] + t * (color_field[b] - color_field[a]);
+		MPGL_ColormapGradBytes(work->colormap, &value, 1, 1, &(mesh->color[4 * n]));
+	}
+}
+
+/* number edges crossing level in plane z along x and y from n, vertices are written if fill is set */
+static void IsoPlane(IsoWork *work, int z, int ex[], int ey[], int *n, int fill)
+{
+	int x, y, i, id;
+	int p[3];
+	int *range = work->range;
+	int nx = range[3] - range[0] + 1;
+
+	p[2] = z;
+	for (y = range[1]; y <= range[4]; y++) {
+		p[1] = y;
+		id = MP_GRID_INDEX(work->data, range[0], y, z);
+		i = (y - range[1]) * nx;
+		for (x = range[0]; x <= range[3]; x++, id++, i++) {
+			p[0] = x;
+			ex[i] = ey[i] = -1;
+			if (x < range[3] && IsoCross(work, id, id + 1)) {
+				if (fill) IsoVertex(work, *n, p, 0);
+				ex[i] = (*n)++;
+			}
+			if (y < range[4] && IsoCross(work, id, id + work->data->size[0])) {
+				if (fill) IsoVertex(work, *n, p, 1);
+				ey[i] = (*n)++;
+			}
+		}
+	}
+}
+
+/* number edges crossing level from plane z to z + 1 */
+static void IsoLayer(IsoWork *work, int z, int ez[], int *n, int fill)
+{
+	int x, y, i, id;
+	int p[3];
+	int *range = work->range;
+	int nx = range[3] - range[0] + 1;
+	int stride = work->data->size[0] * work->data->size[1];
+
+	p[2] = z;
+	for (y = range[1]; y <= range[4]; y++) {
+		p[1] = y;
+		id = MP_GRID_INDEX(work->data, range[0], y, z);
+		i = (y - range[1]) * nx;
+		for (x = range[0]; x <= range[3]; x++, id++, i++) {
+			p[0] = x;
+			ez[i] = -1;
+			if (IsoCross(work, id, id + stride)) {
+				if (fill) IsoVertex(work, *n, p, 2);
+				ez[i] = (*n)++;
+			}
+		}
+	}
+}
+
+/* triangles of cubes between planes z and z + 1, counted only if index is NULL */
+static int IsoCubes(IsoWork *work, int z, int *edge[5], unsigned int index[])
+{
+	int x, y, i, k, e, c, a, b;
+	int id, axis, slice;
+	int n = 0;
+	int *range = work->range;
+	int nx = range[3] - range[0] + 1;
+	int corner[8];
+
+	for (y = range[1]; y < range[4]; y++) {
+		for (x = range[0]; x < range[3]; x++) {
+			c = 0;
+			for (k = 0; k < 8; k++) {
+				corner[k] = MP_GRID_INDEX(work->data, x + IsoCorner[k][0], y + IsoCorner[k][1], z + IsoCorner[k][2]);
+				if (!IsoCell(work, corner[k])) break;
+				if (work->field[corner[k]] < work->draw->iso_level) c |= 1 << k;
+			}
+			if (k < 8) continue;
+			for (i = 0; IsoTable[c][i] >= 0; i++, n++) {
+				if (index == NULL) continue;
+				e = IsoTable[c][i];
+				a = IsoEdge[e][0], b = IsoEdge[e][1];
+				/* lower end of edge */
+				if (corner[b] < corner[a]) a = b;
+				for (axis = 0; IsoCorner[IsoEdge[e][0]][axis] == IsoCorner[IsoEdge[e][1]][axis]; axis++);
+				id = (y - range[1] + IsoCorner[a][1]) * nx + x - range[0] + IsoCorner[a][0];
+				if (axis == 2) slice = 2;
+				else slice = axis + 3 * IsoCorner[a][2];
+				index[n] = (unsigned int)edge[slice][id];
+			}
+		}
+	}
+	return n;
+}
+
+/* vertices and triangles of k-th contiguous share of cube layers, counted only if mesh is NULL,
+   vertices on edges of a share are numbered plane by plane and the top plane belongs to the next share */
+static void IsoWorkSlab(IsoWork *work, int k)
+{
+	int i, z, z0, z1;
+	int nz = work->range[5] - work->range[2];
+	int n = 0, nindex = 0, top;
+	int size = (work->range[3] - work->range[0] + 1) * (work->range[4] - work->range[1] + 1);
+	int fill = (work->mesh != NULL);
+	int *edge[5], *tmp;
+
+	z0 = work->range[2] + (int)((double)nz * k / work->nwork);
+	z1 = work->range[2] + (int)((double)nz * (k + 1) / work->nwork);
+	for (i = 0; i < 5; i++) edge[i] = (int *)malloc(size * sizeof(int));
+	work->status[k] = FALSE;
+	for (i = 0; i < 5; i++) {
+		if (edge[i] == NULL) break;
+	}
+	if (i == 5) {
+		if (fill) n = work->nvertex[k], nindex = work->nindex[k];
+		IsoPlane(work, z0, edge[0], edge[1], &n, fill);
+		for (z = z0; z < z1; z++) {
+			IsoLayer(work, z, edge[2], &n, fill);
+			if (z + 1 < z1 || k == work->nwork - 1) {
+				IsoPlane(work, z + 1, edge[3], edge[4], &n, fill);
+			}
+			else if (fill) {
+				top = work->nvertex[k + 1];
+				IsoPlane(work, z + 1, edge[3], edge[4], &top, FALSE);
+			}
+			if (fill) nindex += IsoCubes(work, z, edge, &(work->mesh->index[nindex]));
+			else nindex += IsoCubes(work, z, edge, NULL);
+			tmp = edge[0], edge[0] = edge[3], edge[3] = tmp;
+			tmp = edge[1], edge[1] = edge[4], edge[4] = tmp;
+		}
+		if (!fill) work->nvertex[k] = n, work->nindex[k] = nindex;
+		work->status[k] = TRUE;
+	}
+	for (i = 0; i < 5; i++) free(edge[i]);
+}
+
+static int IsoWorkRun(IsoWork *work)
+{
+	int k;
+
+#ifdef _OPENMP
+#pragma omp parallel for num_threads(work->nwork) schedule(static, 1)
+#endif
+	for (k = 0; k < work->nwork; k++) {
+		IsoWorkSlab(work, k);
+	}
+	for (k = 0; k < work->nwork; k++) {
+		if (!work->status[k]) return FALSE;
+	}
+	return TRUE;
+}
+
+/* count vertices and triangles of each share, then fill them at their offsets */
+static int IsoWorkBuild(MPGL_GridMesh *mesh, IsoWork *work)
+{
+	int k, n;
+	int nvertex = 0, nindex = 0;
+
+	work->mesh = NULL;
+	if (!IsoWorkRun(work)) return FALSE;
+	for (k = 0; k < work->nwork; k++) {
+		n = work->nvertex[k], work->nvertex[k] = nvertex, nvertex += n;
+		n = work->nindex[k], work->nindex[k] = nindex, nindex += n;
+	}
+	if (!MPGL_GridMeshAlloc(mesh, nvertex, nindex, 0)) return FALSE;
+	work->mesh = mesh;
+	if (!IsoWorkRun(work)) return FALSE;
+	mesh->nvertex = nvertex;
+	mesh->nindex = nindex;
+	return TRUE;
+}
+
+/* isosurface of the field of draw kind at iso_level over displayed range by marching cubes
+   between centers of displayed cells, vertices on cell edges are shared by triangles and
+   colored by the field of iso_color kind, or the field itself if it is not a kind, and
+   are left uncolored if colormap is NULL */
+int MPGL_GridIsoBuild(MPGL_GridMesh *mesh, MPGL_GridDrawData *draw, MP_GridData *data, MPGL_Colormap *colormap)
+{
+	int i;
+	int range[6];
+	int ret = FALSE;
+	IsoWork work;
+
+	mesh->nvertex = 0;
+	mesh->nindex = 0;
+	mesh->nface = 0;
+	mesh->dirty[0] = 0, mesh->dirty[1] = -1;
+	work.field = IsoField(draw->kind, data);
+	if (work.field == NULL) return TRUE;
+	MPGL_GridDrawDispRange(draw, data, range);
+	for (i = 0; i < 3; i++) {
+		if (range[i] > range[i + 3]) return TRUE;
+	}
+	if (range[5] == range[2]) return TRUE;
+	MPGL_GridIsoInit();
+	if (colormap != NULL) MPGL_ColormapUpdateTable(colormap);
+	work.draw = draw, work.data = data, work.colormap = colormap, work.range = range;
+	work.color_kind = draw->iso_color;
+	if (work.color_kind < MPGL_DrawKindType || work.color_kind > MPGL_DrawKindCz) work.color_kind = draw->kind;
+	if (work.color_kind >= MPGL_DrawKindCx && !data->local_coef) work.color_kind = draw->kind;
+	work.nwork = MPGL_GridDrawThreads(draw);
+	if (work.nwork > range[5] - range[2]) work.nwork = range[5] - range[2];
+	work.nvertex = (int *)calloc(work.nwork, sizeof(int));
+	work.nindex = (int *)calloc(work.nwork, sizeof(int));
+	work.status = (int *)malloc(work.nwork * sizeof(int));
+	if (work.nvertex != NULL && work.nindex != NULL && work.status != NULL) ret = IsoWorkBuild(mesh, &work);
+	free(work.nvertex);
+	free(work.nindex);
+	free(work.status);
+	return ret;
+}
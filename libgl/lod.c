@@ -0,0 +1,165 @@
+#include "MPGLGrid.h"
+
+void MPGL_GridLodInit(MPGL_GridLod *lod)
+{
+	int i;
+
+	lod->valid = FALSE;
+	lod->factor = 1;
+	for (i = 0; i < 3; i++) lod->origin[i] = 0;
+	memset(&(lod->data), 0, sizeof(MP_GridData));
+	memset(&(lod->data_key), 0, sizeof(MPGL_GridDrawKey));
+	MPGL_GridMeshInit(&(lod->mesh));
+	lod->cached = FALSE;
+	memset(&(lod->key), 0, sizeof(MPGL_GridDrawKey));
+	MPGL_GridInstanceInit(&(lod->instance));
+}
+
+static void LodDataFree(MP_GridData *data)
+{
+	free(data->type);
+	free(data->update);
+	free(data->val);
+	free(data->cx);
+	free(data->cy);
+	free(data->cz);
+	data->type = data->update = NULL;
+	data->val = data->cx = data->cy = data->cz = NULL;
+}
+
+void MPGL_GridLodFree(MPGL_GridLod *lod)
+{
+	LodDataFree(&(lod->data));
+	MPGL_GridMeshRelease(&(lod->mesh));
+	MPGL_GridMeshFree(&(lod->mesh));
+	MPGL_GridInstanceFree(&(lod->instance));
+	MPGL_GridLodInit(lod);
+}
+
+/* array of values drawn for kind */
+static double **LodArray(int kind, MP_GridData *data)
+{
+	if (kind == MPGL_DrawKindVal) return &(data->val);
+	else if (kind == MPGL_DrawKindCx && data->local_coef) return &(data->cx);
+	else if (kind == MPGL_DrawKindCy && data->local_coef) return &(data->cy);
+	else if (kind == MPGL_DrawKindCz && data->local_coef) return &(data->cz);
+	return NULL;
+}
+
+/* most frequent id in block from p0 to p1, smaller id for a tie */
+static short LodMode(MP_GridData *data, const short id[], int p0[], int p1[], int count[])
+{
+	int i;
+	int x, y, z;
+	short mode = id[MP_GRID_INDEX(data, p0[0], p0[1], p0[2])];
+
+	for (z = p0[2]; z <= p1[2]; z++) {
+		for (y = p0[1]; y <= p1[1]; y++) {
+			i = MP_GRID_INDEX(data, p0[0], y, z);
+			for (x = p0[0]; x <= p1[0]; x++, i++) count[id[i]]++;
+		}
+	}
+	for (z = p0[2]; z <= p1[2]; z++) {
+		for (y = p0[1]; y <= p1[1]; y++) {
+			i = MP_GRID_INDEX(data, p0[0], y, z);
+			for (x = p0[0]; x <= p1[0]; x++, i++) {
+				if (count[id[i]] > count[mode] || (count[id[i]] == count[mode] && id[i] < mode)) mode = id[i];
+			}
+		}
+	}
+	for (z = p0[2]; z <= p1[2]; z++) {
+		for (y = p0[1]; y <= p1[1]; y++) {
+			i = MP_GRID_INDEX(data, p0[0], y, z);
+			for (x = p0[0]; x <= p1[0]; x++, i++) count[id[i]] = 0;
+		}
+	}
+	return mode;
+}
+
+static double LodMean(MP_GridData *data, const double value[], int p0[], int p1[])
+{
+	int i;
+	int x, y, z;
+	double sum = 0.0;
+
+	for (z = p0[2]; z <= p1[2]; z++) {
+		for (y = p0[1]; y <= p1[1]; y++) {
+			i = MP_GRID_INDEX(data, p0[0], y, z);
+			for (x = p0[0]; x <= p1[0]; x++, i++) sum += value[i];
+		}
+	}
+	return sum / ((p1[0] - p0[0] + 1) * (p1[1] - p0[1] + 1) * (p1[2] - p0[2] + 1));
+}
+
+/* z plane of coarse grid from blocks of data */
+static void LodPlane(MPGL_GridLod *lod, MP_GridData *data, int range[], const double value[], double coarse_value[], int z)
+{
+	int i;
+	int x, y;
+	int p0[3], p1[3];
+	int count[MPGL_GRID_TYPE_MAX] = { 0 };
+	MP_GridData *coarse = &(lod->data);
+
+	p0[2] = range[2] + z * lod->factor;
+	p1[2] = (p0[2] + lod->factor - 1 < range[5]) ? p0[2] + lod->factor - 1 : range[5];
+	for (y = 0; y < coarse->size[1]; y++) {
+		p0[1] = range[1] + y * lod->factor;
+		p1[1] = (p0[1] + lod->factor - 1 < range[4]) ? p0[1] + lod->factor - 1 : range[4];
+		for (x = 0; x < coarse->size[0]; x++) {
+			p0[0] = range[0] + x * lod->factor;
+			p1[0] = (p0[0] + lod->factor - 1 < range[3]) ? p0[0] + lod->factor - 1 : range[3];
+			i = MP_GRID_INDEX(coarse, x, y, z);
+			coarse->type[i] = LodMode(data, data->type, p0, p1, count);
+			if (coarse->update != NULL) coarse->update[i] = LodMode(data, data->update, p0, p1, count);
+			if (value != NULL) coarse_value[i] = LodMean(data, value, p0, p1);
+		}
+	}
+}
+
+/* coarse grid of displayed range by blocks of factor cells in each direction,
+   type and update are the most frequent ones in a block and drawn values are averaged */
+int MPGL_GridLodBuild(MPGL_GridLod *lod, MPGL_GridDrawData *draw, MP_GridData *data, int factor)
+{
+	int i, z;
+	int range[6];
+	size_t ntot;
+	MP_GridData *coarse = &(lod->data);
+	double **array = LodArray(draw->kind, data);
+	double **coarse_array = NULL;
+
+	lod->valid = FALSE;
+	lod->cached = FALSE;
+	lod->instance.cached = FALSE;
+	LodDataFree(coarse);
+	MPGL_GridDrawDispRange(draw, data, range);
+	for (i = 0; i < 3; i++) {
+		lod->origin[i] = range[i];
+		coarse->size[i] = (range[i + 3] - range[i] + factor) / factor;
+		coarse->element[i] = data->element[i];
+	}
+	ntot = (size_t)coarse->size[0] * coarse->size[1] * coarse->size[2];
+	coarse->ntot = (int)ntot;
+	coarse->ntype = data->ntype;
+	coarse->step = data->step;
+	coarse->local_coef = data->local_coef;
+	coarse->type = (short *)malloc(ntot * sizeof(short));
+	if (coarse->type == NULL) return FALSE;
+	if (draw->kind == MPGL_DrawKindUpdate) {
+		coarse->update = (short *)malloc(ntot * sizeof(short));
+		if (coarse->update == NULL) return FALSE;
+	}
+	if (array != NULL) {
+		coarse_array = LodArray(draw->kind, coarse);
+		*coarse_array = (double *)malloc(ntot * sizeof(double));
+		if (*coarse_array == NULL) return FALSE;
+	}
+	lod->factor = factor;
+#ifdef _OPENMP
+#pragma omp parallel for num_threads(MPGL_GridDrawThreads(draw)) schedule(static, 1)
+#endif
+	for (z = 0; z < coarse->size[2]; z++) {
+		LodPlane(lod, data, range, (array != NULL) ? *array : NULL, (array != NULL) ? *coarse_array : NULL, z);
+	}
+	lod->valid = TRUE;
+	return TRUE;
+}
@@ -0,0 +1,711 @@
+#include "MPGLGrid.h"
+
+/* overlap and recess of merged faces in cells */
+#define MESH_OVERLAP (1.0f / 1024.0f)
+#define MESH_RECESS (MESH_OVERLAP / 8.0f)
+
+static float FaceVertex[6][4][3] = {
+	{ { -0.5, -0.5, -0.5 },{ -0.5, -0.5, 0.5 },{ -0.5, 0.5, 0.5 },{ -0.5, 0.5, -0.5 } },
+	{ { -0.5, -0.5, -0.5 },{ 0.5, -0.5, -0.5 },{ 0.5, -0.5, 0.5 },{ -0.5, -0.5, 0.5 } },
+	{ { -0.5, -0.5, -0.5 },{ -0.5, 0.5, -0.5 },{ 0.5, 0.5, -0.5 },{ 0.5, -0.5, -0.5 } },
+	{ { 0.5, 0.5, 0.5 },{ 0.5, -0.5, 0.5 },{ 0.5, -0.5, -0.5 },{ 0.5, 0.5, -0.5 } },
+	{ { 0.5, 0.5, 0.5 },{ 0.5, 0.5, -0.5 },{ -0.5, 0.5, -0.5 },{ -0.5, 0.5, 0.5 } },
+	{ { 0.5, 0.5, 0.5 },{ -0.5, 0.5, 0.5 },{ -0.5, -0.5, 0.5 },{ 0.5, -0.5, 0.5 } } };
+static float FaceNormal[6][3] = { { -1.0,  0.0,  0.0 },{ 0.0, -1.0, 0.0 },{ 0.0, 0.0, -1.0 },
+	{ 1.0, 0.0, 0.0 },{ 0.0, 1.0, 0.0 },{ 0.0, 0.0, 1.0 } };
+
+void MPGL_GridMeshInit(MPGL_GridMesh *mesh)
+{
+	int i;
+
+	mesh->nvertex = 0;
+	mesh->nindex = 0;
+	mesh->nface = 0;
+	mesh->vsize = 0;
+	mesh->isize = 0;
+	mesh->fsize = 0;
+	mesh->tsize = 0;
+	mesh->vertex = NULL;
+	mesh->normal = NULL;
+	mesh->color = NULL;
+	mesh->index = NULL;
+	mesh->cell = NULL;
+	mesh->value = NULL;
+	mesh->dirty[0] = 0, mesh->dirty[1] = -1;
+	for (i = 0; i < 5; i++) mesh->buffer[i] = 0;
+	mesh->texture = FALSE;
+	mesh->texture_name = 0;
+	mesh->texture_range[0] = 0.0, mesh->texture_range[1] = 0.0;
+	mesh->texture_ngrad = -1;
+}
+
+void MPGL_GridMeshFree(MPGL_GridMesh *mesh)
+{
+	free(mesh->vertex);
+	free(mesh->normal);
+	free(mesh->color);
+	free(mesh->index);
+	free(mesh->cell);
+	free(mesh->value);
+	mesh->vertex = NULL;
+	mesh->normal = NULL;
+	mesh->color = NULL;
+	mesh->index = NULL;
+	mesh->cell = NULL;
+	mesh->value = NULL;
+	mesh->nvertex = 0;
+	mesh->nindex = 0;
+	mesh->nface = 0;
+	mesh->vsize = 0;
+	mesh->isize = 0;
+	mesh->fsize = 0;
+	mesh->tsize = 0;
+	mesh->dirty[0] = 0, mesh->dirty[1] = -1;
+}
+
+/* delete buffers and texture of mesh in the current GL context, names are cleared even without context */
+void MPGL_GridMeshRelease(MPGL_GridMesh *mesh)
+{
+	int i;
+
+	if ((mesh->buffer[0] != 0 || mesh->texture_name != 0) && MPGL_ExtCurrent()) {
+		if (mesh->buffer[0] != 0) glDeleteBuffers(5, mesh->buffer);
+		if (mesh->texture_name != 0) glDeleteTextures(1, &(mesh->texture_name));
+	}
+	for (i = 0; i < 5; i++) mesh->buffer[i] = 0;
+	mesh->texture_name = 0;
+	mesh->texture_ngrad = -1;
+}
+
+int MPGL_GridMeshAlloc(MPGL_GridMesh *mesh, int nvertex, int nindex, int nface)
+{
+	float *vertex, *normal;
+	unsigned char *color;
+	unsigned int *index;
+	int *cell;
+	float *value;
+
+	if (nvertex > mesh->vsize) {
+		vertex = (float *)realloc(mesh->vertex, (size_t)nvertex * 3 * sizeof(float));
+		if (vertex == NULL) return FALSE;
+		mesh->vertex = vertex;
+		normal = (float *)realloc(mesh->normal, (size_t)nvertex * 3 * sizeof(float));
+		if (normal == NULL) return FALSE;
+		mesh->normal = normal;
+		color = (unsigned char *)realloc(mesh->color, (size_t)nvertex * 4);
+		if (color == NULL) return FALSE;
+		mesh->color = color;
+		mesh->vsize = nvertex;
+	}
+	if (nindex > mesh->isize) {
+		index = (unsigned int *)realloc(mesh->index, (size_t)nindex * sizeof(unsigned int));
+		if (index == NULL) return FALSE;
+		mesh->index = index;
+		mesh->isize = nindex;
+	}
+	if (nface > mesh->fsize) {
+		cell = (int *)realloc(mesh->cell, (size_t)nface * sizeof(int));
+		if (cell == NULL) return FALSE;
+		mesh->cell = cell;
+		mesh->fsize = nface;
+	}
+	if (mesh->texture && nvertex > mesh->tsize) {
+		value = (float *)realloc(mesh->value, (size_t)nvertex * sizeof(float));
+		if (value == NULL) return FALSE;
+		mesh->value = value;
+		mesh->tsize = nvertex;
+	}
+	return TRUE;
+}
+
+static void RowValue(double value[], int stride, int n, unsigned char color[])
+{
+	int i;
+	float v;
+
+	for (i = 0; i < n; i++) {
+		v = (float)value[i * stride];
+		memcpy(&(color[4 * i]), &v, sizeof(float));
+	}
+}
+
+/* colors of n cells from id with stride, the colormap table must be updated,
+   the 4 bytes of a cell hold its value as float if texture is set */
+static void RowColor(int texture, int kind, MP_GridData *data, MPGL_Colormap *colormap, int id, int stride, int n, unsigned char color[])
+{
+	if (texture) {
+		if (kind == MPGL_DrawKindVal) RowValue(&(data->val[id]), stride, n, color);
+		else if (kind == MPGL_DrawKindCx) RowValue(&(data->cx[id]), stride, n, color);
+		else if (kind == MPGL_DrawKindCy) RowValue(&(data->cy[id]), stride, n, color);
+		else if (kind == MPGL_DrawKindCz) RowValue(&(data->cz[id]), stride, n, color);
+	}
+	else if (kind == MPGL_DrawKindType) MPGL_ColormapStepBytes(colormap, &(data->type[id]), stride, n, color);
+	else if (kind == MPGL_DrawKindUpdate) MPGL_ColormapStepBytes(colormap, &(data->update[id]), stride, n, color);
+	else if (kind == MPGL_DrawKindVal) MPGL_ColormapGradBytes(colormap, &(data->val[id]), stride, n, color);
+	else if (kind == MPGL_DrawKindCx) MPGL_ColormapGradBytes(colormap, &(data->cx[id]), stride, n, color);
+	else if (kind == MPGL_DrawKindCy) MPGL_ColormapGradBytes(colormap, &(data->cy[id]), stride, n, color);
+	else if (kind == MPGL_DrawKindCz) MPGL_ColormapGradBytes(colormap, &(data->cz[id]), stride, n, color);
+}
+
+static int AxisStride(MP_GridData *data, int a)
+{
+	if (a == 0) return 1;
+	else if (a == 1) return data->size[0];
+	else return data->size[0] * data->size[1];
+}
+
+typedef struct MeshCursor {
+	int nvertex;
+	int nindex;
+	int nface;
+} MeshCursor;
+
+static void MeshVertex(MPGL_GridMesh *mesh, int n, float x[], int dir, unsigned char color[])
+{
+	int k;
+
+	for (k = 0; k < 3; k++) {
+		mesh->vertex[3 * n + k] = x[k];
+		mesh->normal[3 * n + k] = FaceNormal[dir][k];
+	}
+	if (mesh->texture) memcpy(&(mesh->value[n]), color, sizeof(float));
+	else memcpy(&(mesh->color[4 * n]), color, 4);
+}
+
+/* face covering cells p0 to p1 as two triangles, unit faces are colored by cell id and merged ones
+   have no cell, added to cur only if mesh is NULL */
+static void MeshFace(MPGL_GridMesh *mesh, MeshCursor *cur, int dir, int p0[], int p1[], int id, unsigned char color[])
+{
+	int i, k;
+	int a = dir % 3;
+	int n = cur->nvertex;
+	int unit = (p0[0] == p1[0] && p0[1] == p1[1] && p0[2] == p1[2]);
+	unsigned int *index;
+	float x[3];
+
+	if (mesh != NULL) {
+		for (i = 0; i < 4; i++) {
+			for (k = 0; k < 3; k++) {
+				x[k] = FaceVertex[dir][i][k] + ((FaceVertex[dir][i][k] < 0.0f) ? p0[k] : p1[k]);
+				/* merged faces overlap neighbor faces in the plane to cover cracks at vertices of neighbors
+				   on their edges, and lie slightly behind so that the neighbors are drawn over the overlap */
+				if (unit) continue;
+				if (k == a) x[k] += (FaceVertex[dir][i][k] < 0.0f) ? MESH_RECESS : -MESH_RECESS;
+				else x[k] += (FaceVertex[dir][i][k] < 0.0f) ? -MESH_OVERLAP : MESH_OVERLAP;
+			}
+			MeshVertex(mesh, n + i, x, dir, color);
+		}
+		index = &(mesh->index[cur->nindex]);
+		index[0] = n, index[1] = n + 1, index[2] = n + 2;
+		index[3] = n, index[4] = n + 2, index[5] = n + 3;
+		if (unit) mesh->cell[cur->nface] = id;
+	}
+	cur->nvertex += 4;
+	cur->nindex += 6;
+	if (unit) cur->nface++;
+}
+
+static void FaceAxis(int dir, int *a, int *u, int *v)
+{
+	*a = dir % 3;
+	*u = (*a == 0) ? 1 : 0;
+	*v = (*a == 2) ? 1 : 2;
+}
+
+/* face of cell p exposed on the boundary of bound or to a hidden neighbor */
+static int CubeFace(MPGL_GridDrawData *draw, MP_GridData *data, int bound[], int p[], int id, int dir)
+{
+	int a = dir % 3;
+	int stride = AxisStride(data, a);
+
+	if (dir < 3) return (p[a] == bound[a] || !draw->disp[data->type[id - stride]]);
+	else return (p[a] == bound[a + 3] || !draw->disp[data->type[id + stride]]);
+}
+
+/* boundary plane of bound in dir, or -1 if it is out of range */
+static int BoundPlane(int range[], int bound[], int dir)
+{
+	int a = dir % 3;
+	int plane = (dir < 3) ? bound[a] : bound[a + 3];
+
+	return (plane >= range[a] && plane <= range[a + 3]) ? plane : -1;
+}
+
+/* faces in range on the boundary of bound in rows of units, counted only if mesh is NULL */
+static int QuadsFaces(MPGL_GridMesh *mesh, MeshCursor *cur, MPGL_GridDrawData *draw, MP_GridData *data, MPGL_Colormap *colormap,
+	int range[], int bound[], int unit[])
+{
+	int dir, a, u, v;
+	int p[3];
+	int id, stride;
+	int k = 0;
+	unsigned char *row = NULL;
+
+	if (mesh != NULL) {
+		row = (unsigned char *)malloc((size_t)(range[3] - range[0] + range[4] - range[1] + 2) * 4);
+		if (row == NULL) return FALSE;
+	}
+	for (dir = 0; dir < 6; dir++) {
+		FaceAxis(dir, &a, &u, &v);
+		p[a] = BoundPlane(range, bound, dir);
+		stride = AxisStride(data, u);
+		for (p[v] = range[v]; p[v] <= range[v + 3]; p[v]++, k++) {
+			if (k < unit[0] || k >= unit[1] || p[a] < 0) continue;
+			p[u] = range[u];
+			id = MP_GRID_INDEX(data, p[0], p[1], p[2]);
+			if (mesh != NULL) RowColor(mesh->texture, draw->kind, data, colormap, id, stride, range[u + 3] - range[u] + 1, row);
+			for (; p[u] <= range[u + 3]; p[u]++, id += stride) {
+				MeshFace(mesh, cur, dir, p, p, id, &(row[4 * (p[u] - range[u])]));
+			}
+		}
+	}
+	free(row);
+	return TRUE;
+}
+
+/* exposed faces of displayed cells in z layers of units, counted only if mesh is NULL */
+static int CubesFaces(MPGL_GridMesh *mesh, MeshCursor *cur, MPGL_GridDrawData *draw, MP_GridData *data, MPGL_Colormap *colormap,
+	int range[], int bound[], int unit[])
+{
+	int id;
+	int dir, faces;
+	int p[3];
+	unsigned char *row = NULL;
+
+	if (mesh != NULL) {
+		row = (unsigned char *)malloc((size_t)(range[3] - range[0] + 1) * 4);
+		if (row == NULL) return FALSE;
+	}
+	for (p[2] = range[2] + unit[0]; p[2] < range[2] + unit[1]; p[2]++) {
+		for (p[1] = range[1]; p[1] <= range[4]; p[1]++) {
+			id = MP_GRID_INDEX(data, range[0], p[1], p[2]);
+			if (mesh != NULL) RowColor(mesh->texture, draw->kind, data, colormap, id, 1, range[3] - range[0] + 1, row);
+			for (p[0] = range[0]; p[0] <= range[3]; p[0]++, id++) {
+				if (!draw->disp[data->type[id]]) continue;
+				faces = 0;
+				for (dir = 0; dir < 6; dir++) {
+					if (CubeFace(draw, data, bound, p, id, dir)) faces |= 1 << dir;
+				}
+				if (faces == 0) continue;
+				for (dir = 0; dir < 6; dir++) {
+					if (faces & (1 << dir)) MeshFace(mesh, cur, dir, p, p, id, &(row[4 * (p[0] - range[0])]));
+				}
+			}
+		}
+	}
+	free(row);
+	return TRUE;
+}
+
+static void PlaneMask(MPGL_GridDrawData *draw, MP_GridData *data, MPGL_Colormap *colormap,
+	int range[], int bound[], int dir, int slice, unsigned int mask[])
+{
+	int id, k = 0;
+	int a, u, v;
+	int p[3];
+	int stride;
+
+	/* colors are stored as keys, alpha makes them nonzero */
+	FaceAxis(dir, &a, &u, &v);
+	p[a] = slice;
+	stride = AxisStride(data, u);
+	for (p[v] = range[v]; p[v] <= range[v + 3]; p[v]++) {
+		p[u] = range[u];
+		id = MP_GRID_INDEX(data, p[0], p[1], p[2]);
+		RowColor(FALSE, draw->kind, data, colormap, id, stride, range[u + 3] - range[u] + 1, (unsigned char *)&(mask[k]));
+		for (; p[u] <= range[u + 3]; p[u]++, id += stride, k++) {
+			if (draw->method == MPGL_DrawMethodCubes
+				&& (!draw->disp[data->type[id]] || !CubeFace(draw, data, bound, p, id, dir))) {
+				mask[k] = 0;
+			}
+		}
+	}
+}
+
+/* greedy merge of equal keys into rectangles, counted only if mesh is NULL */
+static void PlaneMerge(MPGL_GridMesh *mesh, MeshCursor *cur, MP_GridData *data, int range[], int dir, int slice, unsigned int mask[])
+{
+	int a, u, v;
+	int i, j, k, l, w, h;
+	int nu, nv;
+	unsigned int key;
+	int p0[3], p1[3];
+	unsigned char color[4];
+
+	FaceAxis(dir, &a, &u, &v);
+	nu = range[u + 3] - range[u] + 1;
+	nv = range[v + 3] - range[v] + 1;
+	p0[a] = p1[a] = slice;
+	for (j = 0; j < nv; j++) {
+		for (i = 0; i < nu; i += w) {
+			key = mask[j * nu + i];
+			w = 1;
+			if (key == 0) continue;
+			while (i + w < nu && mask[j * nu + i + w] == key) w++;
+			for (h = 1; j + h < nv; h++) {
+				for (k = 0; k < w; k++) {
+					if (mask[(j + h) * nu + i + k] != key) break;
+				}
+				if (k < w) break;
+			}
+			for (l = 0; l < h; l++) {
+				for (k = 0; k < w; k++) mask[(j + l) * nu + i + k] = 0;
+			}
+			memcpy(color, &key, 4);
+			if (w * h > 1) {
+				p0[u] = range[u] + i, p1[u] = range[u] + i + w - 1;
+				p0[v] = range[v] + j, p1[v] = range[v] + j + h - 1;
+				MeshFace(mesh, cur, dir, p0, p1, MP_GRID_INDEX(data, p0[0], p0[1], p0[2]), color);
+				continue;
+			}
+			for (l = 0; l < h; l++) {
+				for (k = 0; k < w; k++) {
+					p0[u] = p1[u] = range[u] + i + k;
+					p0[v] = p1[v] = range[v] + j + l;
+					MeshFace(mesh, cur, dir, p0, p1, MP_GRID_INDEX(data, p0[0], p0[1], p0[2]), color);
+				}
+			}
+		}
+	}
+}
+
+/* merged faces in planes of units, counted only if mesh is NULL */
+static int MergeFaces(MPGL_GridMesh *mesh, MeshCursor *cur, MPGL_GridDrawData *draw, MP_GridData *data, MPGL_Colormap *colormap,
+	int range[], int bound[], int unit[])
+{
+	int dir, a, u, v;
+	int slice, slice0, slice1;
+	int nmask, nmax = 0;
+	int k = 0;
+	unsigned int *mask;
+
+	for (dir = 0; dir < 3; dir++) {
+		FaceAxis(dir, &a, &u, &v);
+		nmask = (range[u + 3] - range[u] + 1) * (range[v + 3] - range[v] + 1);
+		if (nmask > nmax) nmax = nmask;
+	}
+	mask = (unsigned int *)malloc((size_t)nmax * sizeof(unsigned int));
+	if (mask == NULL) return FALSE;
+	for (dir = 0; dir < 6; dir++) {
+		FaceAxis(dir, &a, &u, &v);
+		if (draw->method == MPGL_DrawMethodQuads) {
+			slice0 = slice1 = BoundPlane(range, bound, dir);
+		}
+		else {
+			slice0 = range[a], slice1 = range[a + 3];
+		}
+		for (slice = slice0; slice <= slice1; slice++, k++) {
+			if (k < unit[0] || k >= unit[1] || slice < 0) continue;
+			PlaneMask(draw, data, colormap, range, bound, dir, slice, mask);
+			PlaneMerge(mesh, cur, data, range, dir, slice, mask);
+		}
+	}
+	free(mask);
+	return TRUE;
+}
+
+static int MeshMerge(MPGL_GridDrawData *draw)
+{
+	return (draw->merge && (draw->kind == MPGL_DrawKindType || draw->kind == MPGL_DrawKindUpdate));
+}
+
+/* number of work units in output order, planes for merged faces,
+   rows of boundary planes for quads and z layers for cubes */
+static int MeshUnits(MPGL_GridDrawData *draw, int range[])
+{
+	int dir, a, u, v;
+	int n = 0;
+
+	for (dir = 0; dir < 6; dir++) {
+		FaceAxis(dir, &a, &u, &v);
+		if (MeshMerge(draw)) n += (draw->method == MPGL_DrawMethodQuads) ? 1 : range[a + 3] - range[a] + 1;
+		else if (draw->method == MPGL_DrawMethodQuads) n += range[v + 3] - range[v] + 1;
+	}
+	if (!MeshMerge(draw) && draw->method == MPGL_DrawMethodCubes) n = range[5] - range[2] + 1;
+	return n;
+}
+
+static int MeshFaces(MPGL_GridMesh *mesh, MeshCursor *cur, MPGL_GridDrawData *draw, MP_GridData *data, MPGL_Colormap *colormap,
+	int range[], int bound[], int unit[])
+{
+	if (MeshMerge(draw)) {
+		return MergeFaces(mesh, cur, draw, data, colormap, range, bound, unit);
+	}
+	else if (draw->method == MPGL_DrawMethodQuads) {
+		return QuadsFaces(mesh, cur, draw, data, colormap, range, bound, unit);
+	}
+	else if (draw->method == MPGL_DrawMethodCubes) {
+		return CubesFaces(mesh, cur, draw, data, colormap, range, bound, unit);
+	}
+	return TRUE;
+}
+
+typedef struct MeshWork {
+	MPGL_GridMesh *mesh;
+	MPGL_GridDrawData *draw;
+	MP_GridData *data;
+	MPGL_Colormap *colormap;
+	int *range;
+	int *bound;
+	int nunit;
+	int nwork;
+	MeshCursor *cur;
+	int *status;
+} MeshWork;
+
+/* faces of k-th contiguous share of units, written from its cursor */
+static void MeshWorkFaces(MeshWork *work, int k)
+{
+	int unit[2];
+
+	unit[0] = (int)((double)work->nunit * k / work->nwork);
+	unit[1] = (int)((double)work->nunit * (k + 1) / work->nwork);
+	work->status[k] = MeshFaces(work->mesh, &(work->cur[k]), work->draw, work->data, work->colormap, work->range, work->bound, unit);
+}
+
+/* count or fill faces by a pool of threads, the output does not depend on the number of threads */
+static int MeshWorkRun(MeshWork *work)
+{
+	int k;
+
+#ifdef _OPENMP
+#pragma omp parallel for num_threads(work->nwork) schedule(static, 1)
+#endif
+	for (k = 0; k < work->nwork; k++) {
+		MeshWorkFaces(work, k);
+	}
+	for (k = 0; k < work->nwork; k++) {
+		if (!work->status[k]) return FALSE;
+	}
+	return TRUE;
+}
+
+/* count faces of each share, then fill them at their offsets */
+static int MeshWorkBuild(MPGL_GridMesh *mesh, MeshWork *work)
+{
+	int k;
+	MeshCursor total = { 0, 0, 0 }, count;
+
+	work->mesh = NULL;
+	if (!MeshWorkRun(work)) return FALSE;
+	for (k = 0; k < work->nwork; k++) {
+		count = work->cur[k];
+		work->cur[k] = total;
+		total.nvertex += count.nvertex;
+		total.nindex += count.nindex;
+		total.nface += count.nface;
+	}
+	if (!MPGL_GridMeshAlloc(mesh, total.nvertex, total.nindex, total.nface)) return FALSE;
+	work->mesh = mesh;
+	if (!MeshWorkRun(work)) return FALSE;
+	mesh->nvertex = total.nvertex;
+	mesh->nindex = total.nindex;
+	mesh->nface = total.nface;
+	return TRUE;
+}
+
+/* faces of cells in range, faces are exposed on the boundary of bound containing range */
+int MPGL_GridMeshBuildRange(MPGL_GridMesh *mesh, MPGL_GridDrawData *draw, MP_GridData *data, MPGL_Colormap *colormap,
+	int range[], int bound[])
+{
+	int i;
+	int ret = FALSE;
+	MeshWork work;
+
+	mesh->nvertex = 0;
+	mesh->nindex = 0;
+	mesh->nface = 0;
+	mesh->dirty[0] = 0, mesh->dirty[1] = -1;
+	if (draw->kind < MPGL_DrawKindType || draw->kind > MPGL_DrawKindCz) return TRUE;
+	if (draw->kind >= MPGL_DrawKindCx && !data->local_coef) return TRUE;
+	if (draw->method != MPGL_DrawMethodQuads && draw->method != MPGL_DrawMethodCubes) return TRUE;
+	for (i = 0; i < 3; i++) {
+		if (range[i] > range[i + 3]) return TRUE;
+	}
+	MPGL_ColormapUpdateTable(colormap);
+	work.draw = draw, work.data = data, work.colormap = colormap, work.range = range, work.bound = bound;
+	work.nunit = MeshUnits(draw, range);
+	work.nwork = MPGL_GridDrawThreads(draw);
+	if (work.nwork > work.nunit) work.nwork = work.nunit;
+	work.cur = (MeshCursor *)calloc(work.nwork, sizeof(MeshCursor));
+	work.status = (int *)malloc(work.nwork * sizeof(int));
+	if (work.cur != NULL && work.status != NULL) ret = MeshWorkBuild(mesh, &work);
+	free(work.cur);
+	free(work.status);
+	return ret;
+}
+
+int MPGL_GridMeshBuild(MPGL_GridMesh *mesh, MPGL_GridDrawData *draw, MP_GridData *data, MPGL_Colormap *colormap)
+{
+	int range[6];
+
+	if (draw->method == MPGL_DrawMethodIsosurface) return MPGL_GridIsoBuild(mesh, draw, data, colormap);
+	MPGL_GridDrawDispRange(draw, data, range);
+	return MPGL_GridMeshBuildRange(mesh, draw, data, colormap, range, range);
+}
+
+/* recolor unit faces of all, updated or masked cells in place,
+   return number of faces recolored or -1 if the mesh has merged faces */
+int MPGL_GridMeshRefresh(MPGL_GridMesh *mesh, MPGL_GridDrawData *draw, MP_GridData *data, MPGL_Colormap *colormap,
+	int mode, const unsigned char mask[])
+{
+	int i, f, id;
+	int n = 0;
+	unsigned char color[4];
+	unsigned char *c;
+
+	if (mesh->nvertex != 4 * mesh->nface) return -1;
+	MPGL_ColormapUpdateTable(colormap);
+	for (f = 0; f < mesh->nface; f++) {
+		id = mesh->cell[f];
+		if (mode == MPGL_GridRefreshUpdate && !data->update[id]) continue;
+		else if (mode == MPGL_GridRefreshMask && !mask[id]) continue;
+		RowColor(mesh->texture, draw->kind, data, colormap, id, 1, 1, color);
+		if (mesh->texture) c = (unsigned char *)&(mesh->value[4 * f]);
+		else c = &(mesh->color[16 * f]);
+		for (i = 0; i < 16; i++) c[i] = color[i % 4];
+		if (mesh->dirty[0] > mesh->dirty[1]) mesh->dirty[0] = f;
+		mesh->dirty[1] = f;
+		n++;
+	}
+	return n;
+}
+
+void MPGL_GridMeshUpload(MPGL_GridMesh *mesh)
+{
+	GLsizeiptr size = (GLsizeiptr)mesh->nvertex * 3 * sizeof(float);
+
+	if (!MPGL_ExtSupport(MPGL_ExtBuffer)) return;
+	if (mesh->buffer[0] == 0) glGenBuffers(5, mesh->buffer);
+	glBindBuffer(GL_ARRAY_BUFFER, mesh->buffer[0]);
+	glBufferData(GL_ARRAY_BUFFER, size, mesh->vertex, GL_STATIC_DRAW);
+	glBindBuffer(GL_ARRAY_BUFFER, mesh->buffer[1]);
+	glBufferData(GL_ARRAY_BUFFER, size, mesh->normal, GL_STATIC_DRAW);
+	if (mesh->texture) {
+		glBindBuffer(GL_ARRAY_BUFFER, mesh->buffer[4]);
+		glBufferData(GL_ARRAY_BUFFER, (GLsizeiptr)mesh->nvertex * sizeof(float), mesh->value, GL_STATIC_DRAW);
+	}
+	else {
+		glBindBuffer(GL_ARRAY_BUFFER, mesh->buffer[2]);
+		glBufferData(GL_ARRAY_BUFFER, (GLsizeiptr)mesh->nvertex * 4, mesh->color, GL_STATIC_DRAW);
+	}
+	glBindBuffer(GL_ARRAY_BUFFER, 0);
+	glBindBuffer(GL_ELEMENT_ARRAY_BUFFER, mesh->buffer[3]);
+	glBufferData(GL_ELEMENT_ARRAY_BUFFER, (GLsizeiptr)mesh->nindex * sizeof(unsigned int), mesh->index, GL_STATIC_DRAW);
+	glBindBuffer(GL_ELEMENT_ARRAY_BUFFER, 0);
+}
+
+void MPGL_GridMeshUploadColor(MPGL_GridMesh *mesh)
+{
+	GLintptr offset = (GLintptr)mesh->dirty[0] * 16;
+	GLsizeiptr size = (GLsizeiptr)(mesh->dirty[1] - mesh->dirty[0] + 1) * 16;
+
+	if (mesh->dirty[0] > mesh->dirty[1]) return;
+	mesh->dirty[0] = 0, mesh->dirty[1] = -1;
+	if (mesh->buffer[0] == 0 || !MPGL_ExtSupport(MPGL_ExtBuffer)) return;
+	if (mesh->texture) {
+		glBindBuffer(GL_ARRAY_BUFFER, mesh->buffer[4]);
+		glBufferSubData(GL_ARRAY_BUFFER, offset, size, (unsigned char *)mesh->value + offset);
+	}
+	else {
+		glBindBuffer(GL_ARRAY_BUFFER, mesh->buffer[2]);
+		glBufferSubData(GL_ARRAY_BUFFER, offset, size, mesh->color + offset);
+	}
+	glBindBuffer(GL_ARRAY_BUFFER, 0);
+}
+
+/* upload gradation table as 1D texture if it has changed and keep the colormap range */
+void MPGL_GridMeshUploadTexture(MPGL_GridMesh *mesh, MPGL_Colormap *colormap)
+{
+	if (!mesh->texture) return;
+	MPGL_ColormapUpdateTable(colormap);
+	mesh->texture_range[0] = colormap->range[0];
+	mesh->texture_range[1] = colormap->range[1];
+	if (mesh->texture_name != 0 && mesh->texture_ngrad == colormap->table_ngrad
+		&& memcmp(mesh->texture_grad, colormap->table_grad, sizeof(mesh->texture_grad)) == 0) return;
+	if (mesh->texture_name == 0) glGenTextures(1, &(mesh->texture_name));
+	glPushAttrib(GL_TEXTURE_BIT);
+	glBindTexture(GL_TEXTURE_1D, mesh->texture_name);
+	glTexParameteri(GL_TEXTURE_1D, GL_TEXTURE_MIN_FILTER, GL_LINEAR);
+	glTexParameteri(GL_TEXTURE_1D, GL_TEXTURE_MAG_FILTER, GL_LINEAR);
+	glTexParameteri(GL_TEXTURE_1D, GL_TEXTURE_WRAP_S, GL_CLAMP_TO_EDGE);
+	glTexImage1D(GL_TEXTURE_1D, 0, GL_RGBA8, MPGL_COLORMAP_TABLE, 0, GL_RGBA, GL_UNSIGNED_BYTE, colormap->table_byte);
+	glPopAttrib();
+	mesh->texture_ngrad = colormap->table_ngrad;
+	memcpy(mesh->texture_grad, colormap->table_grad, sizeof(mesh->texture_grad));
+}
+
+/* map values to the texel centers of the gradation table over the colormap range */
+static void MeshTextureBegin(MPGL_GridMesh *mesh)
+{
+	double scale = 0.0;
+	double n = MPGL_COLORMAP_TABLE;
+
+	if (mesh->texture_range[1] != mesh->texture_range[0]) {
+		scale = 1.0 / (mesh->texture_range[1] - mesh->texture_range[0]);
+	}
+	glPushAttrib(GL_CURRENT_BIT | GL_ENABLE_BIT | GL_LIGHTING_BIT | GL_TEXTURE_BIT | GL_TRANSFORM_BIT);
+	/* half white lit color scaled by 2 keeps lighting above 1 from saturating */
+	glColor4f(0.5f, 0.5f, 0.5f, 1.0f);
+	glLightModeli(GL_LIGHT_MODEL_COLOR_CONTROL, GL_SEPARATE_SPECULAR_COLOR);
+	glEnable(GL_TEXTURE_1D);
+	glBindTexture(GL_TEXTURE_1D, mesh->texture_name);
+	glTexEnvi(GL_TEXTURE_ENV, GL_TEXTURE_ENV_MODE, GL_COMBINE);
+	glTexEnvi(GL_TEXTURE_ENV, GL_COMBINE_RGB, GL_MODULATE);
+	glTexEnvi(GL_TEXTURE_ENV, GL_SOURCE0_RGB, GL_TEXTURE);
+	glTexEnvi(GL_TEXTURE_ENV, GL_SOURCE1_RGB, GL_PRIMARY_COLOR);
+	glTexEnvf(GL_TEXTURE_ENV, GL_RGB_SCALE, 2.0f);
+	glTexEnvi(GL_TEXTURE_ENV, GL_COMBINE_ALPHA, GL_REPLACE);
+	glTexEnvi(GL_TEXTURE_ENV, GL_SOURCE0_ALPHA, GL_TEXTURE);
+	glMatrixMode(GL_TEXTURE);
+	glPushMatrix();
+	glLoadIdentity();
+	glTranslated(0.5 / n, 0.0, 0.0);
+	glScaled(scale * (n - 1.0) / n, 1.0, 1.0);
+	glTranslated(-mesh->texture_range[0], 0.0, 0.0);
+}
+
+static void MeshTextureEnd(void)
+{
+	glMatrixMode(GL_TEXTURE);
+	glPopMatrix();
+	glPopAttrib();
+}
+
+void MPGL_GridMeshDraw(MPGL_GridMesh *mesh)
+{
+	if (mesh->nindex <= 0) return;
+	if (mesh->texture) MeshTextureBegin(mesh);
+	glPushClientAttrib(GL_CLIENT_VERTEX_ARRAY_BIT);
+	glEnableClientState(GL_VERTEX_ARRAY);
+	glEnableClientState(GL_NORMAL_ARRAY);
+	if (mesh->texture) glEnableClientState(GL_TEXTURE_COORD_ARRAY);
+	else glEnableClientState(GL_COLOR_ARRAY);
+	if (mesh->buffer[0] != 0 && MPGL_ExtSupport(MPGL_ExtBuffer)) {
+		glBindBuffer(GL_ARRAY_BUFFER, mesh->buffer[0]);
+		glVertexPointer(3, GL_FLOAT, 0, NULL);
+		glBindBuffer(GL_ARRAY_BUFFER, mesh->buffer[1]);
+		glNormalPointer(GL_FLOAT, 0, NULL);
+		if (mesh->texture) {
+			glBindBuffer(GL_ARRAY_BUFFER, mesh->buffer[4]);
+			glTexCoordPointer(1, GL_FLOAT, 0, NULL);
+		}
+		else {
+			glBindBuffer(GL_ARRAY_BUFFER, mesh->buffer[2]);
+			glColorPointer(4, GL_UNSIGNED_BYTE, 0, NULL);
+		}
+		glBindBuffer(GL_ARRAY_BUFFER, 0);
+		glBindBuffer(GL_ELEMENT_ARRAY_BUFFER, mesh->buffer[3]);
+		glDrawElements(GL_TRIANGLES, mesh->nindex, GL_UNSIGNED_INT, NULL);
+		glBindBuffer(GL_ELEMENT_ARRAY_BUFFER, 0);
+	}
+	else {
+		glVertexPointer(3, GL_FLOAT, 0, mesh->vertex);
+		glNormalPointer(GL_FLOAT, 0, mesh->normal);
+		if (mesh->texture) glTexCoordPointer(1, GL_FLOAT, 0, mesh->value);
+		else glColorPointer(4, GL_UNSIGNED_BYTE, 0, mesh->color);
+		glDrawElements(GL_TRIANGLES, mesh->nindex, GL_UNSIGNED_INT, mesh->index);
+	}
+	glPopClientAttrib();
+	if (mesh->texture) MeshTextureEnd();
+}
@@ -611,6 +611,23 @@ static PyObject *PyMotion(MPGL_Model *self, PyObject *args, PyObject *kwds)
 	return Py_BuildValue("i", MPGL_ModelMotion(self, scene, x, y, ctrl));
 }
 
+/* public attributes of model for pickle, initial direction and region are arguments of new model */
+static const char *PyStateNames[] = { "mat", "center", "scale", "mat_inv", "button_mode", NULL };
+
+static PyObject *PyReduce(MPGL_Model *self, PyObject *args)
+{
+	return Py_BuildValue("(O((ffffff)(ffffff))N)", Py_TYPE(self),
+		self->init_dir[0], self->init_dir[1], self->init_dir[2], self->init_dir[3], self->init_dir[4], self->init_dir[5],
+		self->region[0], self->region[1], self->region[2], self->region[3], self->region[4], self->region[5],
+		MPGL_PyGetState((PyObject *)self, PyStateNames));
+}
+
+static PyObject *PySetState(MPGL_Model *self, PyObject *state)
+{
+	if (MPGL_PySetState((PyObject *)self, PyStateNames, state) < 0) return NULL;
+	Py_RETURN_NONE;
+}
+
 static PyMethodDef PyMethods[] = {
 	{ "reset", (PyCFunction)PyReset, METH_NOARGS,
 	"reset() : reset model matrix" },
@@ -646,6 +663,10 @@ static PyMethodDef PyMethods[] = {
 	"button(x, y, down) : process when mouse button pressed" },
 	{ "motion", (PyCFunction)PyMotion, METH_VARARGS | METH_KEYWORDS,
 	"motion(scene, x, y, ctrl) : process when mouse moved, return true if model modified" },
+	{ "__reduce__", (PyCFunction)PyReduce, METH_NOARGS,
+	"__reduce__() : return state for pickle" },
+	{ "__setstate__", (PyCFunction)PySetState, METH_O,
+	"__setstate__(state) : set state from pickle" },
 	{ NULL }  /* Sentinel */
 };
 
@@ -731,8 +752,10 @@ static PyGetSetDef PyGetSet[] = {
 };
 
 PyTypeObject MPGL_ModelPyType = {
+#ifdef PY3
+	PyVarObject_HEAD_INIT(NULL, 0)
+#else
 	PyObject_HEAD_INIT(NULL)
-#ifndef PY3
 	0,							/*ob_size*/
 #endif
 	"MPGLGrid.model",			/*tp_name*/
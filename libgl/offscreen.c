@@ -0,0 +1,557 @@
+#include "MPGLGrid.h"
+#ifdef MP_PYTHON_LIB
+#define NO_IMPORT_ARRAY
+#define PY_ARRAY_UNIQUE_SYMBOL MPGLGrid_ARRAY_API
+#include <numpy/arrayobject.h>
+#endif
+#ifndef WIN32
+#include <EGL/egl.h>
+#include <EGL/eglext.h>
+#endif
+
+#ifndef WIN32
+/* display of Mesa surfaceless platform, or default display if not available */
+static EGLDisplay OffscreenDisplay(void)
+{
+	static EGLDisplay display = EGL_NO_DISPLAY;
+	PFNEGLGETPLATFORMDISPLAYEXTPROC get_platform_display;
+
+	if (display != EGL_NO_DISPLAY) return display;
+	get_platform_display = (PFNEGLGETPLATFORMDISPLAYEXTPROC)eglGetProcAddress("eglGetPlatformDisplayEXT");
+	if (get_platform_display != NULL) {
+		display = get_platform_display(EGL_PLATFORM_SURFACELESS_MESA, EGL_DEFAULT_DISPLAY, NULL);
+		if (display != EGL_NO_DISPLAY && !eglInitialize(display, NULL, NULL)) display = EGL_NO_DISPLAY;
+	}
+	if (display == EGL_NO_DISPLAY) {
+		display = eglGetDisplay(EGL_DEFAULT_DISPLAY);
+		if (display != EGL_NO_DISPLAY && !eglInitialize(display, NULL, NULL)) display = EGL_NO_DISPLAY;
+	}
+	return display;
+}
+
+static int OffscreenSurface(MPGL_Offscreen *offscreen, int width, int height)
+{
+	EGLint attr[] = { EGL_WIDTH, width, EGL_HEIGHT, height, EGL_NONE };
+
+	offscreen->surface = eglCreatePbufferSurface(offscreen->display, offscreen->config, attr);
+	if (offscreen->surface == EGL_NO_SURFACE) {
+		offscreen->surface = NULL;
+		return FALSE;
+	}
+	offscreen->width = width;
+	offscreen->height = height;
+	return TRUE;
+}
+#endif
+
+/* OpenGL context rendering to a pbuffer without window system */
+int MPGL_OffscreenInit(MPGL_Offscreen *offscreen, int width, int height)
+{
+#ifndef WIN32
+	EGLConfig config;
+	EGLint n;
+	static const EGLint attr[] = {
+		EGL_SURFACE_TYPE, EGL_PBUFFER_BIT,
+		EGL_RED_SIZE, 8, EGL_GREEN_SIZE, 8, EGL_BLUE_SIZE, 8, EGL_ALPHA_SIZE, 8,
+		EGL_DEPTH_SIZE, 24,
+		EGL_RENDERABLE_TYPE, EGL_OPENGL_BIT,
+		EGL_NONE };
+#endif
+
+	offscreen->width = 0;
+	offscreen->height = 0;
+	offscreen->display = NULL;
+	offscreen->config = NULL;
+	offscreen->context = NULL;
+	offscreen->surface = NULL;
+	offscreen->list = FALSE;
+	offscreen->npbo = 2;
+	memset(offscreen->pbo, 0, sizeof(offscreen->pbo));
+	offscreen->pbo_head = 0;
+	offscreen->pbo_count = 0;
+#ifndef WIN32
+	if (width <= 0 || height <= 0) return FALSE;
+	offscreen->display = OffscreenDisplay();
+	if (offscreen->display == EGL_NO_DISPLAY) return FALSE;
+	if (!eglChooseConfig(offscreen->display, attr, &config, 1, &n) || n < 1) return FALSE;
+	offscreen->config = config;
+	if (!eglBindAPI(EGL_OPENGL_API)) return FALSE;
+	offscreen->context = eglCreateContext(offscreen->display, config, EGL_NO_CONTEXT, NULL);
+	if (offscreen->context == EGL_NO_CONTEXT) {
+		offscreen->context = NULL;
+		return FALSE;
+	}
+	if (!OffscreenSurface(offscreen, width, height)) return FALSE;
+	return MPGL_OffscreenMakeCurrent(offscreen);
+#else
+	return FALSE;
+#endif
+}
+
+void MPGL_OffscreenFree(MPGL_Offscreen *offscreen)
+{
+#ifndef WIN32
+	int i;
+
+	if (offscreen->display == NULL) return;
+	if (MPGL_OffscreenMakeCurrent(offscreen)) {
+		for (i = 0; i < MPGL_OFFSCREEN_PBO_MAX; i++) {
+			if (offscreen->pbo[i].name != 0) glDeleteBuffers(1, &(offscreen->pbo[i].name));
+			offscreen->pbo[i].name = 0;
+		}
+	}
+	offscreen->pbo_count = 0;
+	if (eglGetCurrentContext() == offscreen->context) {
+		eglMakeCurrent(offscreen->display, EGL_NO_SURFACE, EGL_NO_SURFACE, EGL_NO_CONTEXT);
+	}
+	if (offscreen->surface != NULL) eglDestroySurface(offscreen->display, offscreen->surface);
+	if (offscreen->context != NULL) eglDestroyContext(offscreen->display, offscreen->context);
+#endif
+	offscreen->display = NULL;
+	offscreen->context = NULL;
+	offscreen->surface = NULL;
+}
+
+int MPGL_OffscreenMakeCurrent(MPGL_Offscreen *offscreen)
+{
+#ifndef WIN32
+	if (offscreen->context == NULL || offscreen->surface == NULL) return FALSE;
+	eglBindAPI(EGL_OPENGL_API);
+	return eglMakeCurrent(offscreen->display, offscreen->surface, offscreen->surface, offscreen->context);
+#else
+	return FALSE;
+#endif
+}
+
+/* new pbuffer of size, the context and its objects are kept */
+int MPGL_OffscreenResize(MPGL_Offscreen *offscreen, int width, int height)
+{
+#ifndef WIN32
+	if (offscreen->context == NULL || width <= 0 || height <= 0) return FALSE;
+	if (width == offscreen->width && height == offscreen->height) return MPGL_OffscreenMakeCurrent(offscreen);
+	eglMakeCurrent(offscreen->display, EGL_NO_SURFACE, EGL_NO_SURFACE, EGL_NO_CONTEXT);
+	if (offscreen->surface != NULL) eglDestroySurface(offscreen->display, offscreen->surface);
+	offscreen->surface = NULL;
+	if (!OffscreenSurface(offscreen, width, height)) return FALSE;
+	return MPGL_OffscreenMakeCurrent(offscreen);
+#else
+	return FALSE;
+#endif
+}
+
+/* same sequence as the viewer, the colormap bar is put on the left side */
+void MPGL_OffscreenRender(MPGL_Offscreen *offscreen, MPGL_Scene *scene, MPGL_Model *model, MPGL_GridDrawData *draw,
+	MP_GridData *data, MPGL_Colormap *colormap, int axis, int colorbar)
+{
+	if (!offscreen->list) {
+		MPGL_GridDrawList();
+		offscreen->list = TRUE;
+	}
+	MPGL_SceneSetup(scene);
+	MPGL_SceneResize(scene, offscreen->width, offscreen->height);
+	glClear(GL_COLOR_BUFFER_BIT | GL_DEPTH_BUFFER_BIT);
+	glPushMatrix();
+	MPGL_ModelTransform(model);
+	MPGL_GridDraw(draw, data, colormap);
+	if (axis) {
+		glTranslatef(-2.0, -2.0, -2.0);
+		MPGL_GridDrawAxis(data->size);
+	}
+	glPopMatrix();
+	if (colorbar) {
+		glPushMatrix();
+		glRotated(90.0, 0.0, 0.0, 1.0);
+		glRotated(90.0, 1.0, 0.0, 0.0);
+		glTranslated((2.0 - scene->width) / scene->height, -colormap->size[1] / 2.0, scene->znear - 1.0e-6);
+		MPGL_ColormapDraw(colormap);
+		glPopMatrix();
+	}
+}
+
+/* pixels of current frame from top row, RGB or RGBA */
+void MPGL_OffscreenRead(MPGL_Offscreen *offscreen, int alpha, unsigned char pixels[])
+{
+	int y;
+	size_t stride = (size_t)offscreen->width * (alpha ? 4 : 3);
+	unsigned char *row, *row0, *row1;
+
+	glPixelStorei(GL_PACK_ALIGNMENT, 1);
+	glReadPixels(0, 0, offscreen->width, offscreen->height, alpha ? GL_RGBA : GL_RGB, GL_UNSIGNED_BYTE, pixels);
+	row = (unsigned char *)malloc(stride);
+	if (row == NULL) return;
+	for (y = 0; y < offscreen->height / 2; y++) {
+		row0 = &(pixels[y * stride]);
+		row1 = &(pixels[(offscreen->height - 1 - y) * stride]);
+		memcpy(row, row0, stride);
+		memcpy(row0, row1, stride);
+		memcpy(row1, row, stride);
+	}
+	free(row);
+}
+
+/* queue readback of current frame into the ring of pixel buffers,
+   return FALSE if pixel buffers are not supported or the ring is full */
+int MPGL_OffscreenReadAsync(MPGL_Offscreen *offscreen, int alpha)
+{
+	MPGL_OffscreenPixelBuffer *pbo;
+
+	if (!MPGL_ExtSupport(MPGL_ExtPixelBuffer)) return FALSE;
+	if (offscreen->pbo_count >= offscreen->npbo) return FALSE;
+	pbo = &(offscreen->pbo[(offscreen->pbo_head + offscreen->pbo_count) % offscreen->npbo]);
+	if (pbo->name == 0) glGenBuffers(1, &(pbo->name));
+	pbo->width = offscreen->width;
+	pbo->height = offscreen->height;
+	pbo->alpha = alpha;
+	glBindBuffer(GL_PIXEL_PACK_BUFFER, pbo->name);
+	glBufferData(GL_PIXEL_PACK_BUFFER, (size_t)pbo->width * pbo->height * (alpha ? 4 : 3), NULL, GL_STREAM_READ);
+	glPixelStorei(GL_PACK_ALIGNMENT, 1);
+	glReadPixels(0, 0, pbo->width, pbo->height, alpha ? GL_RGBA : GL_RGB, GL_UNSIGNED_BYTE, 0);
+	glBindBuffer(GL_PIXEL_PACK_BUFFER, 0);
+	offscreen->pbo_count++;
+	return TRUE;
+}
+
+/* size (height, width, channels) of oldest pending frame, return FALSE if no frame is pending */
+int MPGL_OffscreenReadPending(MPGL_Offscreen *offscreen, int size[])
+{
+	MPGL_OffscreenPixelBuffer *pbo = &(offscreen->pbo[offscreen->pbo_head]);
+
+	if (offscreen->pbo_count <= 0) return FALSE;
+	size[0] = pbo->height;
+	size[1] = pbo->width;
+	size[2] = pbo->alpha ? 4 : 3;
+	return TRUE;
+}
+
+/* pixels of oldest pending frame from top row, its buffer is released for next readback */
+void MPGL_OffscreenReadComplete(MPGL_Offscreen *offscreen, unsigned char pixels[])
+{
+	int y;
+	MPGL_OffscreenPixelBuffer *pbo = &(offscreen->pbo[offscreen->pbo_head]);
+	size_t stride = (size_t)pbo->width * (pbo->alpha ? 4 : 3);
+	unsigned char *src;
+
+	if (offscreen->pbo_count <= 0) return;
+	glBindBuffer(GL_PIXEL_PACK_BUFFER, pbo->name);
+	src = (unsigned char *)glMapBuffer(GL_PIXEL_PACK_BUFFER, GL_READ_ONLY);
+	if (src != NULL) {
+		for (y = 0; y < pbo->height; y++) {
+			memcpy(&(pixels[y * stride]), &(src[(pbo->height - 1 - y) * stride]), stride);
+		}
+		glUnmapBuffer(GL_PIXEL_PACK_BUFFER);
+	}
+	glBindBuffer(GL_PIXEL_PACK_BUFFER, 0);
+	offscreen->pbo_head = (offscreen->pbo_head + 1) % offscreen->npbo;
+	offscreen->pbo_count--;
+}
+
+/**********************************************************
+* for Python
+**********************************************************/
+#ifdef MP_PYTHON_LIB
+
+static void PyDealloc(MPGL_Offscreen *self)
+{
+	MPGL_OffscreenFree(self);
+#ifndef PY3
+	self->ob_type->tp_free((PyObject*)self);
+#endif
+}
+
+static PyObject *PyNew(PyTypeObject *type, PyObject *args, PyObject *kwds)
+{
+	int width = 640;
+	int height = 480;
+	static char *kwlist[] = { "width", "height", NULL };
+	MPGL_Offscreen *self;
+
+	if (!PyArg_ParseTupleAndKeywords(args, kwds, "|ii", kwlist, &width, &height)) {
+		return NULL;
+	}
+	self = (MPGL_Offscreen *)type->tp_alloc(type, 0);
+	if (!MPGL_OffscreenInit(self, width, height)) {
+		Py_DECREF(self);
+		PyErr_SetString(PyExc_RuntimeError, "can't create offscreen context");
+		return NULL;
+	}
+	return (PyObject *)self;
+}
+
+static PyObject *PyMakeCurrent(MPGL_Offscreen *self, PyObject *args)
+{
+	if (!MPGL_OffscreenMakeCurrent(self)) {
+		PyErr_SetString(PyExc_RuntimeError, "can't make offscreen context current");
+		return NULL;
+	}
+	Py_RETURN_NONE;
+}
+
+static PyObject *PyResize(MPGL_Offscreen *self, PyObject *args, PyObject *kwds)
+{
+	int width, height;
+	static char *kwlist[] = { "width", "height", NULL };
+
+	if (!PyArg_ParseTupleAndKeywords(args, kwds, "ii", kwlist, &width, &height)) {
+		return NULL;
+	}
+	if (!MPGL_OffscreenResize(self, width, height)) {
+		PyErr_SetString(PyExc_RuntimeError, "can't resize offscreen context");
+		return NULL;
+	}
+	Py_RETURN_NONE;
+}
+
+static PyObject *PyOffscreenArray(MPGL_Offscreen *self, int alpha)
+{
+	npy_intp dims[3];
+	PyObject *array;
+
+	dims[0] = self->height, dims[1] = self->width, dims[2] = alpha ? 4 : 3;
+	array = PyArray_SimpleNew(3, dims, NPY_UINT8);
+	if (array == NULL) return NULL;
+	MPGL_OffscreenRead(self, alpha, (unsigned char *)PyArray_DATA((PyArrayObject *)array));
+	return array;
+}
+
+static PyObject *PyRead(MPGL_Offscreen *self, PyObject *args, PyObject *kwds)
+{
+	int alpha = FALSE;
+	static char *kwlist[] = { "alpha", NULL };
+
+	if (!PyArg_ParseTupleAndKeywords(args, kwds, "|i", kwlist, &alpha)) {
+		return NULL;
+	}
+	if (!MPGL_OffscreenMakeCurrent(self)) {
+		PyErr_SetString(PyExc_RuntimeError, "can't make offscreen context current");
+		return NULL;
+	}
+	return PyOffscreenArray(self, alpha);
+}
+
+/* oldest pending frame as array */
+static PyObject *PyOffscreenComplete(MPGL_Offscreen *self)
+{
+	int size[3];
+	npy_intp dims[3];
+	PyObject *array;
+
+	if (!MPGL_OffscreenReadPending(self, size)) Py_RETURN_NONE;
+	dims[0] = size[0], dims[1] = size[1], dims[2] = size[2];
+	array = PyArray_SimpleNew(3, dims, NPY_UINT8);
+	if (array == NULL) return NULL;
+	MPGL_OffscreenReadComplete(self, (unsigned char *)PyArray_DATA((PyArrayObject *)array));
+	return array;
+}
+
+/* queue current frame, return oldest frame if all buffers are pending, or current frame without pixel buffers */
+static PyObject *PyOffscreenAsync(MPGL_Offscreen *self, int alpha)
+{
+	if (!MPGL_OffscreenReadAsync(self, alpha)) {
+		if (self->pbo_count > 0) {
+			PyErr_SetString(PyExc_RuntimeError, "can't queue readback");
+			return NULL;
+		}
+		return PyOffscreenArray(self, alpha);
+	}
+	if (self->pbo_count >= self->npbo) return PyOffscreenComplete(self);
+	Py_RETURN_NONE;
+}
+
+static PyObject *PyReadAsync(MPGL_Offscreen *self, PyObject *args, PyObject *kwds)
+{
+	int alpha = FALSE;
+	static char *kwlist[] = { "alpha", NULL };
+
+	if (!PyArg_ParseTupleAndKeywords(args, kwds, "|i", kwlist, &alpha)) {
+		return NULL;
+	}
+	if (!MPGL_OffscreenMakeCurrent(self)) {
+		PyErr_SetString(PyExc_RuntimeError, "can't make offscreen context current");
+		return NULL;
+	}
+	return PyOffscreenAsync(self, alpha);
+}
+
+static PyObject *PyFlush(MPGL_Offscreen *self, PyObject *args)
+{
+	PyObject *list, *array;
+
+	if (!MPGL_OffscreenMakeCurrent(self)) {
+		PyErr_SetString(PyExc_RuntimeError, "can't make offscreen context current");
+		return NULL;
+	}
+	list = PyList_New(0);
+	if (list == NULL) return NULL;
+	while (self->pbo_count > 0) {
+		array = PyOffscreenComplete(self);
+		if (array == NULL || PyList_Append(list, array) < 0) {
+			Py_XDECREF(array);
+			Py_DECREF(list);
+			return NULL;
+		}
+		Py_DECREF(array);
+	}
+	return list;
+}
+
+static PyObject *PyRender(MPGL_Offscreen *self, PyObject *args, PyObject *kwds)
+{
+	MPGL_Scene *scene;
+	MPGL_Model *model;
+	MPGL_GridDrawData *draw;
+	MP_GridData *data;
+	MPGL_Colormap *cmp;
+	int axis = FALSE;
+	int colorbar = FALSE;
+	int alpha = FALSE;
+	static char *kwlist[] = { "scene", "model", "draw", "grid", "cmp", "axis", "colorbar", "alpha", NULL };
+
+	if (!PyArg_ParseTupleAndKeywords(args, kwds, "O!O!O!OO!|iii", kwlist, &MPGL_ScenePyType, &scene,
+		&MPGL_ModelPyType, &model, &MPGL_GridDrawDataPyType, &draw, &data, &MPGL_ColormapPyType, &cmp,
+		&axis, &colorbar, &alpha)) {
+		return NULL;
+	}
+	if (draw->busy) {
+		PyErr_SetString(PyExc_RuntimeError, "draw is busy in another thread");
+		return NULL;
+	}
+	if (!MPGL_OffscreenMakeCurrent(self)) {
+		PyErr_SetString(PyExc_RuntimeError, "can't make offscreen context current");
+		return NULL;
+	}
+	MPGL_OffscreenRender(self, scene, model, draw, data, cmp, axis, colorbar);
+	MPGL_GridDrawKeepGrid(draw, (PyObject *)data);
+	return PyOffscreenArray(self, alpha);
+}
+
+static PyObject *PyRenderAsync(MPGL_Offscreen *self, PyObject *args, PyObject *kwds)
+{
+	MPGL_Scene *scene;
+	MPGL_Model *model;
+	MPGL_GridDrawData *draw;
+	MP_GridData *data;
+	MPGL_Colormap *cmp;
+	int axis = FALSE;
+	int colorbar = FALSE;
+	int alpha = FALSE;
+	static char *kwlist[] = { "scene", "model", "draw", "grid", "cmp", "axis", "colorbar", "alpha", NULL };
+
+	if (!PyArg_ParseTupleAndKeywords(args, kwds, "O!O!O!OO!|iii", kwlist, &MPGL_ScenePyType, &scene,
+		&MPGL_ModelPyType, &model, &MPGL_GridDrawDataPyType, &draw, &data, &MPGL_ColormapPyType, &cmp,
+		&axis, &colorbar, &alpha)) {
+		return NULL;
+	}
+	if (draw->busy) {
+		PyErr_SetString(PyExc_RuntimeError, "draw is busy in another thread");
+		return NULL;
+	}
+	if (!MPGL_OffscreenMakeCurrent(self)) {
+		PyErr_SetString(PyExc_RuntimeError, "can't make offscreen context current");
+		return NULL;
+	}
+	MPGL_OffscreenRender(self, scene, model, draw, data, cmp, axis, colorbar);
+	MPGL_GridDrawKeepGrid(draw, (PyObject *)data);
+	return PyOffscreenAsync(self, alpha);
+}
+
+static PyMethodDef PyMethods[] = {
+	{ "flush", (PyCFunction)PyFlush, METH_NOARGS,
+	"flush() : return list of pending frames" },
+	{ "make_current", (PyCFunction)PyMakeCurrent, METH_NOARGS,
+	"make_current() : make context current" },
+	{ "read", (PyCFunction)PyRead, METH_VARARGS | METH_KEYWORDS,
+	"read(alpha=0) : return pixels of current frame as uint8 array (height, width, 3 or 4)" },
+	{ "read_async", (PyCFunction)PyReadAsync, METH_VARARGS | METH_KEYWORDS,
+	"read_async(alpha=0) : queue readback of current frame by pixel buffers, return oldest frame when all buffers are pending, or None" },
+	{ "render", (PyCFunction)PyRender, METH_VARARGS | METH_KEYWORDS,
+	"render(scene, model, draw, grid, cmp, axis=0, colorbar=0, alpha=0) : render grid and return pixels as uint8 array (height, width, 3 or 4)" },
+	{ "render_async", (PyCFunction)PyRenderAsync, METH_VARARGS | METH_KEYWORDS,
+	"render_async(scene, model, draw, grid, cmp, axis=0, colorbar=0, alpha=0) : render grid and queue readback, return oldest frame when all buffers are pending, or None" },
+	{ "resize", (PyCFunction)PyResize, METH_VARARGS | METH_KEYWORDS,
+	"resize(width, height) : resize frame" },
+	{ NULL }  /* Sentinel */
+};
+
+static PyObject *PyGetBuffers(MPGL_Offscreen *self, void *closure)
+{
+	return Py_BuildValue("i", self->npbo);
+}
+
+static int PySetBuffers(MPGL_Offscreen *self, PyObject *value, void *closure)
+{
+	int npbo;
+
+	if (!PyArg_Parse(value, "i", &npbo)) {
+		return -1;
+	}
+	if (npbo < 2 || npbo > MPGL_OFFSCREEN_PBO_MAX) {
+		PyErr_SetString(PyExc_ValueError, "buffers must be 2 or 3");
+		return -1;
+	}
+	if (self->pbo_count > 0) {
+		PyErr_SetString(PyExc_RuntimeError, "frames are pending, call flush()");
+		return -1;
+	}
+	self->npbo = npbo;
+	self->pbo_head = 0;
+	return 0;
+}
+
+static PyGetSetDef PyGetSet[] = {
+	{ "buffers", (getter)PyGetBuffers, (setter)PySetBuffers, "buffers = {2 | 3} : number of pixel buffers for asynchronous readback", NULL },
+	{ NULL }  /* Sentinel */
+};
+
+static PyMemberDef PyMembers[] = {
+	{ "width", T_INT, offsetof(MPGL_Offscreen, width), 1, "width : frame width" },
+	{ "height", T_INT, offsetof(MPGL_Offscreen, height), 1, "height : frame height" },
+	{ NULL }  /* Sentinel */
+};
+
+PyTypeObject MPGL_OffscreenPyType = {
+#ifdef PY3
+	PyVarObject_HEAD_INIT(NULL, 0)
+#else
+	PyObject_HEAD_INIT(NULL)
+	0,							/*ob_size*/
+#endif
+	"MPGLGrid.offscreen",		/*tp_name*/
+	sizeof(MPGL_Offscreen),	/*tp_basicsize*/
+	0,							/*tp_itemsize*/
+	(destructor)PyDealloc,	/*tp_dealloc*/
+	0,							/*tp_print*/
+	0,							/*tp_getattr*/
+	0,							/*tp_setattr*/
+	0,							/*tp_compare*/
+	0,							/*tp_repr*/
+	0,							/*tp_as_number*/
+	0,							/*tp_as_sequence*/
+	0,							/*tp_as_mapping*/
+	0,							/*tp_hash */
+	0,							/*tp_call*/
+	0,							/*tp_str*/
+	0,							/*tp_getattro*/
+	0,							/*tp_setattro*/
+	0,							/*tp_as_buffer*/
+	Py_TPFLAGS_DEFAULT | Py_TPFLAGS_BASETYPE,	/*tp_flags*/
+	"offscreen(width=640, height=480)",	/* tp_doc */
+	0,							/* tp_traverse */
+	0,							/* tp_clear */
+	0,							/* tp_richcompare */
+	0,							/* tp_weaklistoffset */
+	0,							/* tp_iter */
+	0,							/* tp_iternext */
+	PyMethods,					/* tp_methods */
+	PyMembers,					/* tp_members */
+	PyGetSet,					/* tp_getset */
+	0,							/* tp_base */
+	0,							/* tp_dict */
+	0,							/* tp_descr_get */
+	0,							/* tp_descr_set */
+	0,							/* tp_dictoffset */
+	0,							/* tp_init */
+	0,							/* tp_alloc */
+	PyNew,						/* tp_new */
+};
+
+#endif /* MP_PYTHON_LIB */
@@ -1,8 +1,46 @@
 #ifdef MP_PYTHON_LIB
 
 #include "MPGLGrid.h"
+#define PY_ARRAY_UNIQUE_SYMBOL MPGLGrid_ARRAY_API
 #include <numpy/arrayobject.h>
 
+/* dict of named attributes of object for pickle */
+PyObject *MPGL_PyGetState(PyObject *self, const char *names[])
+{
+	int i;
+	PyObject *state, *value;
+
+	state = PyDict_New();
+	if (state == NULL) return NULL;
+	for (i = 0; names[i] != NULL; i++) {
+		value = PyObject_GetAttrString(self, names[i]);
+		if (value == NULL || PyDict_SetItemString(state, names[i], value) < 0) {
+			Py_XDECREF(value);
+			Py_DECREF(state);
+			return NULL;
+		}
+		Py_DECREF(value);
+	}
+	return state;
+}
+
+/* set named attributes of object found in state dict through their setters, return -1 on error */
+int MPGL_PySetState(PyObject *self, const char *names[], PyObject *state)
+{
+	int i;
+	PyObject *value;
+
+	if (!PyDict_Check(state)) {
+		PyErr_SetString(PyExc_ValueError, "invalid state");
+		return -1;
+	}
+	for (i = 0; names[i] != NULL; i++) {
+		value = PyDict_GetItemString(state, names[i]);
+		if (value != NULL && PyObject_SetAttrString(self, names[i], value) < 0) return -1;
+	}
+	return 0;
+}
+
 static PyObject *PyGridTextBitmap(PyObject *self, PyObject *args, PyObject *kwds)
 {
 	const char *string;
@@ -45,6 +83,7 @@ PyMODINIT_FUNC PyInit_MPGLGrid(void)
 	if (PyType_Ready(&MPGL_ModelPyType) < 0) return;
 	if (PyType_Ready(&MPGL_ColormapPyType) < 0) return;
 	if (PyType_Ready(&MPGL_ScenePyType) < 0) return;
+	if (PyType_Ready(&MPGL_OffscreenPyType) < 0) return;
 	m = Py_InitModule3("MPGLGrid", MPGLGridPyMethods, "MPGLGrid extention");
 	if (m == NULL) return;
 #else
@@ -52,10 +91,12 @@ PyMODINIT_FUNC PyInit_MPGLGrid(void)
 	if (PyType_Ready(&MPGL_ModelPyType) < 0) return NULL;
 	if (PyType_Ready(&MPGL_ColormapPyType) < 0) return NULL;
 	if (PyType_Ready(&MPGL_ScenePyType) < 0) return NULL;
+	if (PyType_Ready(&MPGL_OffscreenPyType) < 0) return NULL;
 	m = PyModule_Create(&MPGLGridPyModule);
 	if (m == NULL) return NULL;
 #endif
 	import_array();
+	MPGL_GridIsoInit();
 	Py_INCREF(&MPGL_GridDrawDataPyType);
 	PyModule_AddObject(m, "draw", (PyObject *)&MPGL_GridDrawDataPyType);
 	Py_INCREF(&MPGL_ModelPyType);
@@ -64,6 +105,8 @@ PyMODINIT_FUNC PyInit_MPGLGrid(void)
 	PyModule_AddObject(m, "colormap", (PyObject *)&MPGL_ColormapPyType);
 	Py_INCREF(&MPGL_ScenePyType);
 	PyModule_AddObject(m, "scene", (PyObject *)&MPGL_ScenePyType);
+	Py_INCREF(&MPGL_OffscreenPyType);
+	PyModule_AddObject(m, "offscreen", (PyObject *)&MPGL_OffscreenPyType);
 #ifdef PY3
 	return m;
 #endif
@@ -264,6 +264,92 @@ static PyObject *PyFrontText(MPGL_Scene *self, PyObject *args, PyObject *kwds)
 	Py_RETURN_NONE;
 }
 
+static PyObject *PyTextExtent(MPGL_Scene *self, PyObject *args, PyObject *kwds)
+{
+	const char *string;
+	int font_type;
+	int extent[2];
+	static char *kwlist[] = { "string", "font_type", NULL };
+
+	if (!PyArg_ParseTupleAndKeywords(args, kwds, "si", kwlist, &string, &font_type)) {
+		return NULL;
+	}
+	MPGL_TextExtent(string, font_type, extent);
+	return Py_BuildValue("(ii)", extent[0], extent[1]);
+}
+
+/* public attributes of scene for pickle, lights and screen size are added by their names */
+static const char *PyStateNames[] = { "proj", "znear", "zfar", "mat_shininess",
+	"mat_specular", "mat_emission", "clear_color", NULL };
+
+static PyObject *PyReduce(MPGL_Scene *self, PyObject *args)
+{
+	int i;
+	MPGL_SceneLight *l;
+	PyObject *state, *light, *size;
+
+	state = MPGL_PyGetState((PyObject *)self, PyStateNames);
+	if (state == NULL) return NULL;
+	light = PyTuple_New(self->nlight);
+	for (i = 0; light != NULL && i < self->nlight; i++) {
+		l = &(self->light[i]);
+		PyTuple_SET_ITEM(light, i, Py_BuildValue("((ffff)(ffff)(ffff)(ffff))",
+			l->position[0], l->position[1], l->position[2], l->position[3],
+			l->specular[0], l->specular[1], l->specular[2], l->specular[3],
+			l->diffuse[0], l->diffuse[1], l->diffuse[2], l->diffuse[3],
+			l->ambient[0], l->ambient[1], l->ambient[2], l->ambient[3]));
+	}
+	size = Py_BuildValue("(ii)", self->width, self->height);
+	if (light == NULL || size == NULL || PyDict_SetItemString(state, "light", light) < 0
+		|| PyDict_SetItemString(state, "size", size) < 0) {
+		Py_XDECREF(light);
+		Py_XDECREF(size);
+		Py_DECREF(state);
+		return NULL;
+	}
+	Py_DECREF(light);
+	Py_DECREF(size);
+	return Py_BuildValue("(O()N)", Py_TYPE(self), state);
+}
+
+static PyObject *PySetState(MPGL_Scene *self, PyObject *state)
+{
+	int i, n;
+	MPGL_SceneLight light[8];
+	MPGL_SceneLight *l;
+	PyObject *value, *seq;
+
+	if (MPGL_PySetState((PyObject *)self, PyStateNames, state) < 0) return NULL;
+	/* screen size is kept for pick without resizing viewport of no context */
+	value = PyDict_GetItemString(state, "size");
+	if (value != NULL && !PyArg_ParseTuple(value, "ii", &(self->width), &(self->height))) return NULL;
+	value = PyDict_GetItemString(state, "light");
+	if (value == NULL) Py_RETURN_NONE;
+	seq = PySequence_Fast(value, "invalid state");
+	if (seq == NULL) return NULL;
+	n = (int)PySequence_Fast_GET_SIZE(seq);
+	if (n > 8) {
+		Py_DECREF(seq);
+		PyErr_SetString(PyExc_ValueError, "invalid state");
+		return NULL;
+	}
+	for (i = 0; i < n; i++) {
+		l = &(light[i]);
+		if (!PyArg_ParseTuple(PySequence_Fast_GET_ITEM(seq, i), "(ffff)(ffff)(ffff)(ffff)",
+			&(l->position[0]), &(l->position[1]), &(l->position[2]), &(l->position[3]),
+			&(l->specular[0]), &(l->specular[1]), &(l->specular[2]), &(l->specular[3]),
+			&(l->diffuse[0]), &(l->diffuse[1]), &(l->diffuse[2]), &(l->diffuse[3]),
+			&(l->ambient[0]), &(l->ambient[1]), &(l->ambient[2]), &(l->ambient[3]))) {
+			Py_DECREF(seq);
+			return NULL;
+		}
+	}
+	Py_DECREF(seq);
+	memcpy(self->light, light, n * sizeof(MPGL_SceneLight));
+	self->nlight = n;
+	Py_RETURN_NONE;
+}
+
 static PyMethodDef PyMethods[] = {
 	{ "light_add", (PyCFunction)PyLightAdd, METH_VARARGS | METH_KEYWORDS,
 	"light_add(x, y, z, w) : add light" },
@@ -281,6 +367,12 @@ static PyMethodDef PyMethods[] = {
 	"resize(width, height) : resize window" },
 	{ "front_text", (PyCFunction)PyFrontText, METH_VARARGS | METH_KEYWORDS,
 	"front_text(x, y, string, font_type) : draw front text" },
+	{ "text_extent", (PyCFunction)PyTextExtent, METH_VARARGS | METH_KEYWORDS,
+	"text_extent(string, font_type) : return (width, height) of front text in pixels" },
+	{ "__reduce__", (PyCFunction)PyReduce, METH_NOARGS,
+	"__reduce__() : return state for pickle" },
+	{ "__setstate__", (PyCFunction)PySetState, METH_O,
+	"__setstate__(state) : set state from pickle" },
 	{ NULL }  /* Sentinel */
 };
 
@@ -353,8 +445,10 @@ static PyGetSetDef PyGetSet[] = {
 };
 
 PyTypeObject MPGL_ScenePyType = {
+#ifdef PY3
+	PyVarObject_HEAD_INIT(NULL, 0)
+#else
 	PyObject_HEAD_INIT(NULL)
-#ifndef PY3
 	0,							/*ob_size*/
 #endif
 	"MPGLGrid.scene",			/*tp_name*/
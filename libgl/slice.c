@@ -0,0 +1,175 @@
+#include "MPGLGrid.h"
+
+/* axes of texture columns and rows of slice normal to axis */
+static const int SliceAxis[3][2] = { { 1, 2 }, { 0, 2 }, { 0, 1 } };
+
+void MPGL_GridSliceInit(MPGL_GridSlice *slice)
+{
+	slice->texture = 0;
+	slice->size[0] = slice->size[1] = 0;
+	slice->stride = 1;
+	slice->cached = FALSE;
+	memset(&(slice->key), 0, sizeof(MPGL_GridDrawKey));
+}
+
+void MPGL_GridSliceFree(MPGL_GridSlice *slice)
+{
+	if (slice->texture != 0 && MPGL_ExtCurrent()) glDeleteTextures(1, &(slice->texture));
+	slice->texture = 0;
+	slice->size[0] = slice->size[1] = 0;
+	slice->cached = FALSE;
+}
+
+static double *SliceArray(int kind, MP_GridData *data)
+{
+	if (kind == MPGL_DrawKindVal) return data->val;
+	else if (kind == MPGL_DrawKindCx && data->local_coef) return data->cx;
+	else if (kind == MPGL_DrawKindCy && data->local_coef) return data->cy;
+	else if (kind == MPGL_DrawKindCz && data->local_coef) return data->cz;
+	return NULL;
+}
+
+/* colors of n cells from id with stride, alpha is zero for hidden cells and non-finite values */
+static void SliceRow(MPGL_GridDrawData *draw, MP_GridData *data, MPGL_Colormap *colormap,
+	int id, int stride, int n, unsigned char color[])
+{
+	int i;
+	double *array = SliceArray(draw->kind, data);
+
+	if (draw->kind == MPGL_DrawKindType) MPGL_ColormapStepBytes(colormap, &(data->type[id]), stride, n, color);
+	else if (draw->kind == MPGL_DrawKindUpdate) MPGL_ColormapStepBytes(colormap, &(data->update[id]), stride, n, color);
+	else if (array != NULL) MPGL_ColormapGradBytes(colormap, &(array[id]), stride, n, color);
+	else memset(color, 0, (size_t)n * 4);
+	for (i = 0; i < n; i++, id += stride) {
+		if (!draw->disp[data->type[id]] || (array != NULL && array[id] - array[id] != 0.0)) color[4 * i + 3] = 0;
+		else color[4 * i + 3] = 255;
+	}
+}
+
+/* key of slice at position normal to axis, return FALSE if the position is out of displayed range */
+static int SliceKey(MPGL_GridDrawData *draw, MP_GridData *data, MPGL_Colormap *colormap, int axis, MPGL_GridDrawKey *key)
+{
+	int i;
+
+	memset(key, 0, sizeof(MPGL_GridDrawKey));
+	MPGL_GridDrawDispRange(draw, data, key->range);
+	for (i = 0; i < 3; i++) {
+		if (key->range[i] > key->range[i + 3]) return FALSE;
+	}
+	if (draw->slice[axis] < key->range[axis] || draw->slice[axis] > key->range[axis + 3]) return FALSE;
+	key->range[axis] = key->range[axis + 3] = draw->slice[axis];
+	key->data = data;
+	key->type = data->type;
+	key->update = data->update;
+	key->val = SliceArray(draw->kind, data);
+	for (i = 0; i < 3; i++) key->size[i] = data->size[i];
+	key->step = data->step;
+	key->local_coef = data->local_coef;
+	key->kind = draw->kind;
+	for (i = 0; i < MPGL_GRID_TYPE_MAX; i++) key->disp[i] = draw->disp[i];
+	key->nstep = colormap->nstep;
+	memcpy(key->step_color, colormap->step_color, sizeof(key->step_color));
+	key->ngrad = colormap->ngrad;
+	memcpy(key->grad_color, colormap->grad_color, sizeof(key->grad_color));
+	key->cmp_range[0] = colormap->range[0];
+	key->cmp_range[1] = colormap->range[1];
+	return TRUE;
+}
+
+/* upload colors of the slice as 2D texture by strided rows of grid arrays, every stride cells are taken
+   if the slice exceeds maximum texture size, uploaded again only if the slice or its colors have changed,
+   return FALSE if the slice is not drawn */
+int MPGL_GridSliceUpload(MPGL_GridSlice *slice, int axis, MPGL_GridDrawData *draw, MP_GridData *data, MPGL_Colormap *colormap)
+{
+	int i, v, n, max_size;
+	int u_axis = SliceAxis[axis][0], v_axis = SliceAxis[axis][1];
+	int u_stride, v_stride;
+	int p[3];
+	int size[2];
+	unsigned char *image;
+	MPGL_GridDrawKey key;
+
+	if (!SliceKey(draw, data, colormap, axis, &key)) return FALSE;
+	if (slice->cached && slice->texture != 0 && memcmp(&key, &(slice->key), sizeof(MPGL_GridDrawKey)) == 0) return TRUE;
+	slice->cached = FALSE;
+	glGetIntegerv(GL_MAX_TEXTURE_SIZE, &max_size);
+	slice->stride = 1;
+	for (i = 0; i < 2; i++) {
+		n = (key.range[SliceAxis[axis][i] + 3] - key.range[SliceAxis[axis][i]] + max_size) / max_size;
+		if (n > slice->stride) slice->stride = n;
+	}
+	for (i = 0; i < 2; i++) {
+		size[i] = (key.range[SliceAxis[axis][i] + 3] - key.range[SliceAxis[axis][i]]) / slice->stride + 1;
+	}
+	u_stride = ((u_axis == 0) ? 1 : data->size[0]) * slice->stride;
+	v_stride = ((v_axis == 1) ? data->size[0] : data->size[0] * data->size[1]) * slice->stride;
+	image = (unsigned char *)malloc((size_t)size[0] * size[1] * 4);
+	if (image == NULL) return FALSE;
+	MPGL_ColormapUpdateTable(colormap);
+	for (i = 0; i < 3; i++) p[i] = key.range[i];
+#ifdef _OPENMP
+#pragma omp parallel for num_threads(MPGL_GridDrawThreads(draw)) schedule(static)
+#endif
+	for (v = 0; v < size[1]; v++) {
+		SliceRow(draw, data, colormap, MP_GRID_INDEX(data, p[0], p[1], p[2]) + v * v_stride, u_stride, size[0],
+			&(image[(size_t)v * size[0] * 4]));
+	}
+	if (slice->texture == 0) glGenTextures(1, &(slice->texture));
+	glPushAttrib(GL_TEXTURE_BIT);
+	glPushClientAttrib(GL_CLIENT_PIXEL_STORE_BIT);
+	glPixelStorei(GL_UNPACK_ALIGNMENT, 4);
+	glBindTexture(GL_TEXTURE_2D, slice->texture);
+	if (size[0] != slice->size[0] || size[1] != slice->size[1]) {
+		glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_MIN_FILTER, GL_NEAREST);
+		glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_MAG_FILTER, GL_NEAREST);
+		glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_WRAP_S, GL_CLAMP_TO_EDGE);
+		glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_WRAP_T, GL_CLAMP_TO_EDGE);
+		glTexImage2D(GL_TEXTURE_2D, 0, GL_RGBA8, size[0], size[1], 0, GL_RGBA, GL_UNSIGNED_BYTE, image);
+		slice->size[0] = size[0], slice->size[1] = size[1];
+	}
+	else {
+		glTexSubImage2D(GL_TEXTURE_2D, 0, 0, 0, size[0], size[1], GL_RGBA, GL_UNSIGNED_BYTE, image);
+	}
+	glPopClientAttrib();
+	glPopAttrib();
+	free(image);
+	memcpy(&(slice->key), &key, sizeof(MPGL_GridDrawKey));
+	slice->cached = TRUE;
+	return TRUE;
+}
+
+/* draw slice normal to axis at draw->slice[axis] as a quad over displayed range textured with
+   colors of cells, hidden cells are transparent */
+void MPGL_GridSliceDraw(MPGL_GridSlice *slice, int axis, MPGL_GridDrawData *draw, MP_GridData *data, MPGL_Colormap *colormap)
+{
+	int i, k;
+	float p[4][3];
+	static const float tex[4][2] = { { 0.0f, 0.0f }, { 1.0f, 0.0f }, { 1.0f, 1.0f }, { 0.0f, 1.0f } };
+
+	if (!MPGL_GridSliceUpload(slice, axis, draw, data, colormap)) return;
+	for (k = 0; k < 4; k++) {
+		p[k][axis] = (float)slice->key.range[axis];
+		for (i = 0; i < 2; i++) {
+			p[k][SliceAxis[axis][i]] = (tex[k][i] == 0.0f) ? slice->key.range[SliceAxis[axis][i]] - 0.5f
+				: slice->key.range[SliceAxis[axis][i] + 3] + 0.5f;
+		}
+	}
+	glPushAttrib(GL_ENABLE_BIT | GL_TEXTURE_BIT | GL_COLOR_BUFFER_BIT | GL_CURRENT_BIT);
+	/* white color of the quad must not change the material of cells drawn later */
+	glDisable(GL_COLOR_MATERIAL);
+	glDisable(GL_LIGHTING);
+	glEnable(GL_ALPHA_TEST);
+	glAlphaFunc(GL_GREATER, 0.5f);
+	glEnable(GL_TEXTURE_2D);
+	glBindTexture(GL_TEXTURE_2D, slice->texture);
+	glTexEnvi(GL_TEXTURE_ENV, GL_TEXTURE_ENV_MODE, GL_REPLACE);
+	glColor4f(1.0f, 1.0f, 1.0f, 1.0f);
+	glBegin(GL_QUADS);
+	for (k = 0; k < 4; k++) {
+		glTexCoord2f(tex[k][0], tex[k][1]);
+		glVertex3f(p[k][0], p[k][1], p[k][2]);
+	}
+	glEnd();
+	glBindTexture(GL_TEXTURE_2D, 0);
+	glPopAttrib();
+}
@@ -0,0 +1,256 @@
+#include "MPGLGrid.h"
+
+void MPGL_GridStatsInit(MPGL_GridStats *stats)
+{
+	stats->count = 0;
+	stats->nonfinite = 0;
+	stats->min = 0.0;
+	stats->max = 0.0;
+	stats->mean = 0.0;
+	stats->vsize = 0;
+	stats->value = NULL;
+}
+
+void MPGL_GridStatsFree(MPGL_GridStats *stats)
+{
+	free(stats->value);
+	MPGL_GridStatsInit(stats);
+}
+
+static double *StatsArray(MPGL_GridDrawData *draw, MP_GridData *data)
+{
+	if (draw->kind == MPGL_DrawKindVal) return data->val;
+	else if (draw->kind == MPGL_DrawKindCx && data->local_coef) return data->cx;
+	else if (draw->kind == MPGL_DrawKindCy && data->local_coef) return data->cy;
+	else if (draw->kind == MPGL_DrawKindCz && data->local_coef) return data->cz;
+	return NULL;
+}
+
+typedef struct StatsSlab {
+	int failed;
+	int count;
+	int nonfinite;
+	double min;
+	double max;
+	int vsize;
+	double *value;
+} StatsSlab;
+
+typedef struct StatsWork {
+	MPGL_GridDrawData *draw;
+	MP_GridData *data;
+	double *array;
+	int range[6];
+	double *zsum;
+	int nwork;
+	StatsSlab *slab;
+} StatsWork;
+
+static int StatsValue(StatsSlab *slab, double v)
+{
+	double *value;
+
+	if (slab->count >= slab->vsize) {
+		value = (double *)realloc(slab->value, (size_t)(2 * slab->vsize + 256) * sizeof(double));
+		if (value == NULL) return FALSE;
+		slab->value = value;
+		slab->vsize = 2 * slab->vsize + 256;
+	}
+	if (slab->count == 0 || v < slab->min) slab->min = v;
+	if (slab->count == 0 || v > slab->max) slab->max = v;
+	slab->value[slab->count++] = v;
+	return TRUE;
+}
+
+/* finite values of displayed cells in k-th z slab, quads method takes surface cells of range */
+static void StatsSlabRun(StatsWork *work, int k)
+{
+	int id;
+	int x, y, z, z0, z1, dx;
+	int *range = work->range;
+	int nz = range[5] - range[2] + 1;
+	int n;
+	double v, sum;
+	StatsSlab *slab = &(work->slab[k]);
+
+	z0 = range[2] + (int)((double)nz * k / work->nwork);
+	z1 = range[2] + (int)((double)nz * (k + 1) / work->nwork);
+	for (z = z0; z < z1; z++) {
+		n = slab->count;
+		for (y = range[1]; y <= range[4]; y++) {
+			dx = 1;
+			/* only ends of inner rows are on the surface of range for quads method */
+			if (work->draw->method == MPGL_DrawMethodQuads && range[3] > range[0]
+				&& z != range[2] && z != range[5] && y != range[1] && y != range[4]) dx = range[3] - range[0];
+			for (x = range[0]; x <= range[3]; x += dx) {
+				id = MP_GRID_INDEX(work->data, x, y, z);
+				if (work->draw->method != MPGL_DrawMethodQuads && !work->draw->disp[work->data->type[id]]) continue;
+				v = work->array[id];
+				/* false for NaN and inf */
+				if (v - v != 0.0) slab->nonfinite++;
+				else if (!StatsValue(slab, v)) {
+					slab->failed = TRUE;
+					return;
+				}
+			}
+		}
+		/* sums of z layers are added in order so that the mean does not depend on threads */
+		for (sum = 0.0; n < slab->count; n++) sum += slab->value[n];
+		work->zsum[z - range[2]] = sum;
+	}
+}
+
+/* gather values by z slabs on threads and merge slabs in order */
+static int StatsRun(MPGL_GridStats *stats, StatsWork *work)
+{
+	int i, k;
+	int ret = TRUE;
+	int nz = work->range[5] - work->range[2] + 1;
+	int n = 0;
+	double sum = 0.0;
+	double *value;
+	StatsSlab *slab;
+
+	work->nwork = MPGL_GridDrawThreads(work->draw);
+	if (work->nwork > nz) work->nwork = nz;
+	work->slab = (StatsSlab *)calloc(work->nwork, sizeof(StatsSlab));
+	if (work->slab == NULL) return FALSE;
+	work->zsum = (double *)calloc(nz, sizeof(double));
+	if (work->zsum == NULL) ret = FALSE;
+	if (ret) {
+#ifdef _OPENMP
+#pragma omp parallel for num_threads(work->nwork) schedule(static, 1)
+#endif
+		for (k = 0; k < work->nwork; k++) {
+			StatsSlabRun(work, k);
+		}
+	}
+	for (k = 0; k < work->nwork; k++) {
+		if (work->slab[k].failed) ret = FALSE;
+		n += work->slab[k].count;
+	}
+	if (ret && n > stats->vsize) {
+		value = (double *)realloc(stats->value, (size_t)n * sizeof(double));
+		if (value == NULL) ret = FALSE;
+		else stats->value = value, stats->vsize = n;
+	}
+	for (k = 0; ret && k < work->nwork; k++) {
+		slab = &(work->slab[k]);
+		stats->nonfinite += slab->nonfinite;
+		if (slab->count == 0) continue;
+		if (stats->count == 0 || slab->min < stats->min) stats->min = slab->min;
+		if (stats->count == 0 || slab->max > stats->max) stats->max = slab->max;
+		memcpy(&(stats->value[stats->count]), slab->value, (size_t)slab->count * sizeof(double));
+		stats->count += slab->count;
+	}
+	if (ret) {
+		for (i = 0; i < nz; i++) sum += work->zsum[i];
+		if (stats->count > 0) stats->mean = sum / stats->count;
+	}
+	for (k = 0; k < work->nwork; k++) {
+		free(work->slab[k].value);
+	}
+	free(work->slab);
+	free(work->zsum);
+	return ret;
+}
+
+/* count, nonfinite, min, max and mean of finite values of displayed cells by one pass over grid data,
+   the values are kept for percentiles and histograms which therefore agree with them,
+   return FALSE if out of memory */
+int MPGL_GridStatsBuild(MPGL_GridStats *stats, MPGL_GridDrawData *draw, MP_GridData *data)
+{
+	int i;
+	StatsWork work;
+
+	stats->count = 0;
+	stats->nonfinite = 0;
+	stats->min = stats->max = stats->mean = 0.0;
+	work.draw = draw;
+	work.data = data;
+	work.array = StatsArray(draw, data);
+	MPGL_GridDrawDispRange(draw, data, work.range);
+	for (i = 0; i < 3; i++) {
+		if (work.range[i] > work.range[i + 3]) work.array = NULL;
+	}
+	if (work.array == NULL) return TRUE;
+	if (!StatsRun(stats, &work)) {
+		stats->count = stats->nonfinite = 0;
+		stats->min = stats->max = stats->mean = 0.0;
+		return FALSE;
+	}
+	return TRUE;
+}
+
+/* k-th smallest of n values, values are reordered so that those before k are not larger
+   and those after k are not smaller */
+static double StatsSelect(double value[], int n, int k)
+{
+	int i, j;
+	int l = 0, r = n - 1;
+	double pivot, t;
+
+	if (k < 0) k = 0;
+	else if (k > n - 1) k = n - 1;
+	while (l < r) {
+		pivot = value[l + (r - l) / 2];
+		i = l, j = r;
+		while (i <= j) {
+			while (value[i] < pivot) i++;
+			while (value[j] > pivot) j--;
+			if (i <= j) {
+				t = value[i], value[i] = value[j], value[j] = t;
+				i++, j--;
+			}
+		}
+		if (k <= j) r = j;
+		else if (k >= i) l = i;
+		else break;
+	}
+	return value[k];
+}
+
+/* p-th percentile (0 to 100) of finite values with linear interpolation */
+void MPGL_GridStatsPercentile(MPGL_GridStats *stats, double p, double *value)
+{
+	int i, k;
+	double pos, v0, v1;
+
+	if (stats->count <= 0) *value = 0.0;
+	else if (!(p > 0.0)) *value = stats->min;
+	else if (p >= 100.0) *value = stats->max;
+	else {
+		pos = p / 100.0 * (stats->count - 1);
+		i = (int)pos;
+		if (i >= stats->count - 1) *value = stats->max;
+		else {
+			v0 = StatsSelect(stats->value, stats->count, i);
+			if (pos > i) {
+				/* the next rank is the smallest of values after the selected one */
+				v1 = stats->value[i + 1];
+				for (k = i + 2; k < stats->count; k++) {
+					if (stats->value[k] < v1) v1 = stats->value[k];
+				}
+				v0 += (pos - i) * (v1 - v0);
+			}
+			*value = v0;
+		}
+	}
+}
+
+/* histogram of finite values in [min, max] with nbin equal bins, values at max fall in the last bin */
+void MPGL_GridStatsHistogram(MPGL_GridStats *stats, double min, double max, int nbin, int hist[])
+{
+	int i, b;
+	double v;
+	double scale = (max > min) ? nbin / (max - min) : 0.0;
+
+	for (i = 0; i < nbin; i++) hist[i] = 0;
+	if (nbin <= 0) return;
+	for (i = 0; i < stats->count; i++) {
+		v = stats->value[i];
+		if (v < min || v > max) continue;
+		b = (int)((v - min) * scale);
+		hist[(b < nbin) ? b : nbin - 1]++;
+	}
+}
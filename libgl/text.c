@@ -843,28 +843,321 @@ static const GLubyte* Hel18_Map[] = {
 
 static const MPGL_Font FontHelvetica18 = { "-adobe-helvetica-medium-r-normal--18-180-75-75-p-98-iso8859-1", 256, 23, Hel18_Map, 0, 5 };
 
-void MPGL_TextBitmap(const char s[], int font_type)
+#define TEXT_CACHE_MAX 64
+
+/* atlas of all fonts in alpha texture, characters of each font are in 16 x 16 cells from row origin */
+typedef struct MPGL_TextAtlas
 {
-	int i;
-	const MPGL_Font *font;
-	const GLubyte* face;
+	unsigned int texture;
+	int cell[3][2];
+	int origin[3];
+	int size[2];
+} MPGL_TextAtlas;
 
+/* laid out string, vertices of quads are relative to the lower left of the first character */
+typedef struct MPGL_TextLayout
+{
+	char *s;
+	int font_type;
+	int nvertex;
+	int width;
+	short *vertex;
+	float *coord;
+} MPGL_TextLayout;
+
+static MPGL_TextAtlas TextAtlas = { 0 };
+static MPGL_TextLayout TextCache[TEXT_CACHE_MAX];
+static int TextCacheNext = 0;
+
+/* quads of strings between MPGL_TextBegin and MPGL_TextEnd in window coordinates */
+static int TextBatch = 0;
+static int TextNum = 0;
+static int TextSize = 0;
+static float *TextVertex = NULL;
+static float *TextCoord = NULL;
+static unsigned char *TextColor = NULL;
+
+static int TextFontType(int font_type)
+{
+	if (font_type == MPGL_TextHelvetica10 || font_type == MPGL_TextHelvetica18) return font_type;
+	return MPGL_TextHelvetica12;
+}
+
+static const MPGL_Font *TextFont(int font_type)
+{
 	switch (font_type) {
-	case MPGL_TextHelvetica10: font = &FontHelvetica10; break;
-	case MPGL_TextHelvetica12: font = &FontHelvetica12; break;
-	case MPGL_TextHelvetica18: font = &FontHelvetica18; break;
-	default: font = &FontHelvetica12; break;
+	case MPGL_TextHelvetica10: return &FontHelvetica10;
+	case MPGL_TextHelvetica12: return &FontHelvetica12;
+	case MPGL_TextHelvetica18: return &FontHelvetica18;
+	default: return &FontHelvetica12;
+	}
+}
+
+static int TextPower2(int n)
+{
+	int p = 1;
+
+	while (p < n) p *= 2;
+	return p;
+}
+
+/* cells and size of atlas, independent of OpenGL */
+static MPGL_TextAtlas *TextAtlasSize(void)
+{
+	int c, f;
+	int width = 0, height = 0;
+	const MPGL_Font *font;
+	MPGL_TextAtlas *atlas = &TextAtlas;
+
+	if (atlas->size[0] > 0) return atlas;
+	for (f = 0; f < 3; f++) {
+		font = TextFont(f);
+		atlas->cell[f][0] = 0;
+		for (c = 0; c < font->num; c++) {
+			if (font->data[c][0] > atlas->cell[f][0]) atlas->cell[f][0] = font->data[c][0];
+		}
+		atlas->cell[f][1] = font->height;
+		atlas->origin[f] = height;
+		if (16 * atlas->cell[f][0] > width) width = 16 * atlas->cell[f][0];
+		height += 16 * atlas->cell[f][1];
 	}
+	atlas->size[0] = TextPower2(width);
+	atlas->size[1] = TextPower2(height);
+	return atlas;
+}
+
+/* upload bitmaps of characters of all fonts into the atlas once in a context */
+static int TextAtlasUpload(void)
+{
+	int c, f, i, r, w, bytes;
+	int x0, y0;
+	unsigned char *image;
+	const GLubyte *face;
+	const MPGL_Font *font;
+	MPGL_TextAtlas *atlas = TextAtlasSize();
+
+	if (atlas->texture != 0 && glIsTexture(atlas->texture)) return TRUE;
+	image = (unsigned char *)calloc((size_t)atlas->size[0] * atlas->size[1], 1);
+	if (image == NULL) return FALSE;
+	for (f = 0; f < 3; f++) {
+		font = TextFont(f);
+		for (c = 0; c < font->num; c++) {
+			face = font->data[c];
+			w = face[0];
+			bytes = (w + 7) / 8;
+			x0 = (c % 16) * atlas->cell[f][0], y0 = atlas->origin[f] + (c / 16) * atlas->cell[f][1];
+			for (r = 0; r < font->height; r++) {
+				for (i = 0; i < w; i++) {
+					if (face[1 + r * bytes + i / 8] & (0x80 >> (i % 8))) {
+						image[(size_t)(y0 + r) * atlas->size[0] + x0 + i] = 255;
+					}
+				}
+			}
+		}
+	}
+	glGenTextures(1, &(atlas->texture));
+	glPushAttrib(GL_TEXTURE_BIT);
 	glPushClientAttrib(GL_CLIENT_PIXEL_STORE_BIT);
-    glPixelStorei(GL_UNPACK_SWAP_BYTES, GL_FALSE);
-    glPixelStorei(GL_UNPACK_LSB_FIRST, GL_FALSE);
-    glPixelStorei(GL_UNPACK_ROW_LENGTH, 0);
-    glPixelStorei(GL_UNPACK_SKIP_ROWS, 0);
-    glPixelStorei(GL_UNPACK_SKIP_PIXELS, 0);
-    glPixelStorei(GL_UNPACK_ALIGNMENT, 1);
-	for (i = 0;s[i] != '\0';i++) {
-		face = font->data[s[i]];
-        glBitmap(face[0], font->height, font->xorg, font->yorg, (float)(face[0]), 0.0, (face+1));
+	glPixelStorei(GL_UNPACK_ALIGNMENT, 1);
+	glPixelStorei(GL_UNPACK_ROW_LENGTH, 0);
+	glPixelStorei(GL_UNPACK_SKIP_ROWS, 0);
+	glPixelStorei(GL_UNPACK_SKIP_PIXELS, 0);
+	glBindTexture(GL_TEXTURE_2D, atlas->texture);
+	glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_MIN_FILTER, GL_NEAREST);
+	glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_MAG_FILTER, GL_NEAREST);
+	glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_WRAP_S, GL_CLAMP_TO_EDGE);
+	glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_WRAP_T, GL_CLAMP_TO_EDGE);
+	glTexImage2D(GL_TEXTURE_2D, 0, GL_ALPHA8, atlas->size[0], atlas->size[1], 0, GL_ALPHA, GL_UNSIGNED_BYTE, image);
+	glPopClientAttrib();
+	glPopAttrib();
+	free(image);
+	return TRUE;
+}
+
+static void TextLayoutFree(MPGL_TextLayout *layout)
+{
+	free(layout->s);
+	free(layout->vertex);
+	free(layout->coord);
+	memset(layout, 0, sizeof(MPGL_TextLayout));
+}
+
+/* quads of characters of string in the atlas, taken from cache if the string has been laid out */
+static MPGL_TextLayout *TextLayout(const char s[], int font_type)
+{
+	int i, k, c, w, len;
+	int x = 0;
+	const GLubyte *face;
+	MPGL_TextLayout *layout;
+	MPGL_TextAtlas *atlas = TextAtlasSize();
+	const MPGL_Font *font;
+	static const int corner[4][2] = { { 0, 0 }, { 1, 0 }, { 1, 1 }, { 0, 1 } };
+
+	font_type = TextFontType(font_type);
+	font = TextFont(font_type);
+	for (i = 0; i < TEXT_CACHE_MAX; i++) {
+		layout = &(TextCache[i]);
+		if (layout->s != NULL && layout->font_type == font_type && strcmp(layout->s, s) == 0) return layout;
+	}
+	layout = &(TextCache[TextCacheNext]);
+	TextCacheNext = (TextCacheNext + 1) % TEXT_CACHE_MAX;
+	TextLayoutFree(layout);
+	len = (int)strlen(s);
+	layout->s = (char *)malloc(len + 1);
+	layout->vertex = (short *)malloc(((size_t)len * 8 + 1) * sizeof(short));
+	layout->coord = (float *)malloc(((size_t)len * 8 + 1) * sizeof(float));
+	if (layout->s == NULL || layout->vertex == NULL || layout->coord == NULL) {
+		TextLayoutFree(layout);
+		return NULL;
+	}
+	strcpy(layout->s, s);
+	layout->font_type = font_type;
+	for (i = 0; i < len; i++) {
+		c = (unsigned char)s[i];
+		face = font->data[c];
+		w = face[0];
+		for (k = 0; k < 4; k++) {
+			layout->vertex[8 * i + 2 * k] = (short)(x + corner[k][0] * w);
+			layout->vertex[8 * i + 2 * k + 1] = (short)(corner[k][1] * font->height);
+			layout->coord[8 * i + 2 * k] = (float)((c % 16) * atlas->cell[font_type][0] + corner[k][0] * w) / atlas->size[0];
+			layout->coord[8 * i + 2 * k + 1] = (float)(atlas->origin[font_type] + (c / 16) * atlas->cell[font_type][1]
+				+ corner[k][1] * font->height) / atlas->size[1];
+		}
+		x += w;
+	}
+	layout->nvertex = 4 * len;
+	layout->width = x;
+	return layout;
+}
+
+static int TextAlloc(int n)
+{
+	int size;
+	float *vertex, *coord;
+	unsigned char *color;
+
+	if (n <= TextSize) return TRUE;
+	size = (TextSize > 0) ? TextSize : 256;
+	while (size < n) size *= 2;
+	vertex = (float *)realloc(TextVertex, (size_t)size * 3 * sizeof(float));
+	if (vertex == NULL) return FALSE;
+	TextVertex = vertex;
+	coord = (float *)realloc(TextCoord, (size_t)size * 2 * sizeof(float));
+	if (coord == NULL) return FALSE;
+	TextCoord = coord;
+	color = (unsigned char *)realloc(TextColor, (size_t)size * 4);
+	if (color == NULL) return FALSE;
+	TextColor = color;
+	TextSize = size;
+	return TRUE;
+}
+
+/* draw quads of batched strings in one draw call, alpha test keeps pixels of bits set as glBitmap */
+static void TextFlush(void)
+{
+	GLint viewport[4];
+
+	if (TextNum <= 0) return;
+	if (!TextAtlasUpload()) {
+		TextNum = 0;
+		return;
+	}
+	glGetIntegerv(GL_VIEWPORT, viewport);
+	glPushAttrib(GL_ENABLE_BIT | GL_TEXTURE_BIT | GL_COLOR_BUFFER_BIT | GL_TRANSFORM_BIT | GL_VIEWPORT_BIT | GL_CURRENT_BIT);
+	glPushClientAttrib(GL_CLIENT_VERTEX_ARRAY_BIT);
+	glMatrixMode(GL_PROJECTION);
+	glPushMatrix();
+	glLoadIdentity();
+	/* window depth of raster positions is kept */
+	glOrtho(viewport[0], viewport[0] + viewport[2], viewport[1], viewport[1] + viewport[3], 0.0, -1.0);
+	glMatrixMode(GL_MODELVIEW);
+	glPushMatrix();
+	glLoadIdentity();
+	glDepthRange(0.0, 1.0);
+	/* colors of labels must not change the material of cells drawn later */
+	glDisable(GL_COLOR_MATERIAL);
+	glDisable(GL_LIGHTING);
+	glDisable(GL_CULL_FACE);
+	glDisable(GL_TEXTURE_1D);
+	glEnable(GL_TEXTURE_2D);
+	glEnable(GL_ALPHA_TEST);
+	glAlphaFunc(GL_GREATER, 0.0f);
+	glBindTexture(GL_TEXTURE_2D, TextAtlas.texture);
+	glTexEnvi(GL_TEXTURE_ENV, GL_TEXTURE_ENV_MODE, GL_MODULATE);
+	glDisableClientState(GL_NORMAL_ARRAY);
+	glEnableClientState(GL_VERTEX_ARRAY);
+	glEnableClientState(GL_TEXTURE_COORD_ARRAY);
+	glEnableClientState(GL_COLOR_ARRAY);
+	glVertexPointer(3, GL_FLOAT, 0, TextVertex);
+	glTexCoordPointer(2, GL_FLOAT, 0, TextCoord);
+	glColorPointer(4, GL_UNSIGNED_BYTE, 0, TextColor);
+	glDrawArrays(GL_QUADS, 0, TextNum);
+	glBindTexture(GL_TEXTURE_2D, 0);
+	glPopMatrix();
+	glMatrixMode(GL_PROJECTION);
+	glPopMatrix();
+	glMatrixMode(GL_MODELVIEW);
+	glPopClientAttrib();
+	glPopAttrib();
+	TextNum = 0;
+}
+
+/* strings are drawn together at MPGL_TextEnd */
+void MPGL_TextBegin(void)
+{
+	TextBatch++;
+}
+
+void MPGL_TextEnd(void)
+{
+	if (TextBatch > 0) TextBatch--;
+	if (TextBatch == 0) TextFlush();
+}
+
+/* draw string at current raster position with raster color and advance the position as glBitmap,
+   characters are textured quads of the font atlas drawn at MPGL_TextEnd in a batch */
+void MPGL_TextBitmap(const char s[], int font_type)
+{
+	int i;
+	GLint valid;
+	GLfloat pos[4], color[4];
+	float x0, y0;
+	unsigned char c[4];
+	const MPGL_Font *font = TextFont(font_type);
+	MPGL_TextLayout *layout;
+
+	glGetIntegerv(GL_CURRENT_RASTER_POSITION_VALID, &valid);
+	if (!valid) return;
+	layout = TextLayout(s, font_type);
+	if (layout == NULL || !TextAlloc(TextNum + layout->nvertex)) return;
+	glGetFloatv(GL_CURRENT_RASTER_POSITION, pos);
+	glGetFloatv(GL_CURRENT_RASTER_COLOR, color);
+	/* raster positions on pixel edges are truncated as glBitmap of common implementations */
+	x0 = (float)floor(pos[0] + 1.0e-4 - font->xorg), y0 = (float)floor(pos[1] + 1.0e-4 - font->yorg);
+	for (i = 0; i < 4; i++) {
+		c[i] = (unsigned char)(color[i] * 255.0f + 0.5f);
+	}
+	for (i = 0; i < layout->nvertex; i++, TextNum++) {
+		TextVertex[3 * TextNum] = x0 + layout->vertex[2 * i];
+		TextVertex[3 * TextNum + 1] = y0 + layout->vertex[2 * i + 1];
+		TextVertex[3 * TextNum + 2] = pos[2];
+		TextCoord[2 * TextNum] = layout->coord[2 * i];
+		TextCoord[2 * TextNum + 1] = layout->coord[2 * i + 1];
+		memcpy(&(TextColor[4 * TextNum]), c, 4);
+	}
+	glBitmap(0, 0, 0.0f, 0.0f, (float)layout->width, 0.0f, NULL);
+	if (TextBatch == 0) TextFlush();
+}
+
+/* width and height of string in pixels */
+void MPGL_TextExtent(const char s[], int font_type, int extent[])
+{
+	int i;
+	const MPGL_Font *font = TextFont(font_type);
+
+	extent[0] = 0;
+	for (i = 0; s[i] != '\0'; i++) {
+		extent[0] += font->data[(unsigned char)s[i]][0];
 	}
-    glPopClientAttrib( );
+	extent[1] = font->height;
 }
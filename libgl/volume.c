@@ -0,0 +1,332 @@
+#include "MPGLGrid.h"
+
+#define VOLUME_SAMPLES_MAX 4096
+
+static const char *VolumeVertexShader =
+"#version 120\n"
+"varying vec3 position;\n"
+"varying vec3 eye;\n"
+"void main()\n"
+"{\n"
+"	position = gl_Vertex.xyz;\n"
+"	eye = (gl_ModelViewMatrix * gl_Vertex).xyz;\n"
+"	gl_Position = ftransform();\n"
+"}\n";
+
+/* back faces of the box are drawn, rays are marched front to back from the entry of the box
+   or the eye inside it, sample opacity is corrected for step in cell length */
+static const char *VolumeFragmentShader =
+"#version 120\n"
+"uniform sampler3D volume;\n"
+"uniform sampler1D transfer;\n"
+"uniform vec3 box_min;\n"
+"uniform vec3 box_max;\n"
+"uniform vec2 value_scale;\n"
+"uniform vec2 table_scale;\n"
+"uniform float step;\n"
+"uniform float opacity;\n"
+"varying vec3 position;\n"
+"varying vec3 eye;\n"
+"void main()\n"
+"{\n"
+"	int i;\n"
+"	float t, v, a;\n"
+"	bool ortho = (gl_ProjectionMatrix[3][3] == 1.0);\n"
+"	vec3 dir = normalize((gl_ModelViewMatrixInverse * vec4(ortho ? vec3(0.0, 0.0, -1.0) : eye, 0.0)).xyz);\n"
+"	vec3 back = -sign(dir) * max(abs(dir), vec3(1.0e-6));\n"
+"	vec3 t0 = (box_min - position) / back;\n"
+"	vec3 t1 = (box_max - position) / back;\n"
+"	vec3 tmax = max(t0, t1);\n"
+"	float len = min(min(tmax.x, tmax.y), tmax.z);\n"
+"	vec3 entry;\n"
+"	vec3 p;\n"
+"	vec4 texel;\n"
+"	vec4 color = vec4(0.0);\n"
+"	if (!ortho) len = min(len, length(position - (gl_ModelViewMatrixInverse * vec4(0.0, 0.0, 0.0, 1.0)).xyz));\n"
+"	entry = position - len * dir;\n"
+"	for (i = 0; i < 4096; i++) {\n"
+"		t = (float(i) + 0.5) * step;\n"
+"		if (t > len || color.a > 0.99) break;\n"
+"		p = entry + t * dir;\n"
+"		texel = texture3D(volume, (p - box_min) / (box_max - box_min));\n"
+"		v = clamp(texel.r * value_scale.x + value_scale.y, 0.0, 1.0);\n"
+"		a = 1.0 - pow(1.0 - clamp(opacity * v * texel.a, 0.0, 0.999), step);\n"
+"		color.rgb += (1.0 - color.a) * a * texture1D(transfer, v * table_scale.x + table_scale.y).rgb;\n"
+"		color.a += (1.0 - color.a) * a;\n"
+"	}\n"
+"	gl_FragColor = color;\n"
+"}\n";
+
+void MPGL_GridVolumeInit(MPGL_GridVolume *volume)
+{
+	int i;
+
+	volume->texture = 0;
+	volume->transfer = 0;
+	volume->program = 0;
+	volume->status = 0;
+	for (i = 0; i < 3; i++) volume->size[i] = 0;
+	volume->stride = 1;
+	volume->value_range[0] = volume->value_range[1] = 0.0;
+	volume->cached = FALSE;
+	memset(&(volume->key), 0, sizeof(MPGL_GridDrawKey));
+	volume->transfer_ngrad = 0;
+	memset(volume->transfer_grad, 0, sizeof(volume->transfer_grad));
+}
+
+/* delete textures and program in the current GL context */
+void MPGL_GridVolumeFree(MPGL_GridVolume *volume)
+{
+	int i;
+
+	if ((volume->texture != 0 || volume->transfer != 0 || volume->program != 0) && MPGL_ExtCurrent()) {
+		if (volume->texture != 0) glDeleteTextures(1, &(volume->texture));
+		if (volume->transfer != 0) glDeleteTextures(1, &(volume->transfer));
+		if (volume->program != 0) glDeleteProgram(volume->program);
+	}
+	volume->texture = 0;
+	volume->transfer = 0;
+	volume->program = 0;
+	volume->status = 0;
+	for (i = 0; i < 3; i++) volume->size[i] = 0;
+	volume->cached = FALSE;
+	volume->transfer_ngrad = 0;
+}
+
+static unsigned int VolumeShader(GLenum type, const char *source)
+{
+	GLint status;
+	unsigned int shader = glCreateShader(type);
+
+	glShaderSource(shader, 1, &source, NULL);
+	glCompileShader(shader);
+	glGetShaderiv(shader, GL_COMPILE_STATUS, &status);
+	if (!status) {
+		glDeleteShader(shader);
+		return 0;
+	}
+	return shader;
+}
+
+/* compile and link ray marching program once in a context, return FALSE if it fails */
+static int VolumeProgram(MPGL_GridVolume *volume)
+{
+	GLint status;
+	unsigned int vertex, fragment;
+
+	if (volume->status > 0 && glIsProgram(volume->program)) return TRUE;
+	if (volume->status < 0) return FALSE;
+	volume->status = -1;
+	vertex = VolumeShader(GL_VERTEX_SHADER, VolumeVertexShader);
+	fragment = VolumeShader(GL_FRAGMENT_SHADER, VolumeFragmentShader);
+	if (vertex != 0 && fragment != 0) {
+		volume->program = glCreateProgram();
+		glAttachShader(volume->program, vertex);
+		glAttachShader(volume->program, fragment);
+		glLinkProgram(volume->program);
+		glGetProgramiv(volume->program, GL_LINK_STATUS, &status);
+		if (status) volume->status = 1;
+		else {
+			glDeleteProgram(volume->program);
+			volume->program = 0;
+		}
+	}
+	if (vertex != 0) glDeleteShader(vertex);
+	if (fragment != 0) glDeleteShader(fragment);
+	return (volume->status > 0);
+}
+
+static double *VolumeArray(MPGL_GridDrawData *draw, MP_GridData *data)
+{
+	if (draw->kind == MPGL_DrawKindVal) return data->val;
+	else if (draw->kind == MPGL_DrawKindCx && data->local_coef) return data->cx;
+	else if (draw->kind == MPGL_DrawKindCy && data->local_coef) return data->cy;
+	else if (draw->kind == MPGL_DrawKindCz && data->local_coef) return data->cz;
+	return NULL;
+}
+
+/* displayed cell with finite value */
+static int VolumeCell(MPGL_GridDrawData *draw, MP_GridData *data, const double array[], int x, int y, int z)
+{
+	int id = MP_GRID_INDEX(data, x, y, z);
+
+	return (draw->disp[data->type[id]] && array[id] - array[id] == 0.0);
+}
+
+/* upload values of displayed range as 3D texture of luminance and alpha, luminance is the value
+   normalized over displayed cells and alpha is zero for hidden cells, every stride cells are taken
+   if the range exceeds maximum texture size, uploaded again only if grid data or displayed cells have changed */
+int MPGL_GridVolumeUpload(MPGL_GridVolume *volume, MPGL_GridDrawData *draw, MP_GridData *data)
+{
+	int i;
+	int x, y, z;
+	int n, max_size;
+	int range[6];
+	double v, scale;
+	double *array = VolumeArray(draw, data);
+	unsigned short *plane;
+	MPGL_GridDrawKey key;
+
+	if (array == NULL) return FALSE;
+	memset(&key, 0, sizeof(MPGL_GridDrawKey));
+	key.data = data;
+	key.type = data->type;
+	key.val = array;
+	for (i = 0; i < 3; i++) key.size[i] = data->size[i];
+	key.step = data->step;
+	key.kind = draw->kind;
+	MPGL_GridDrawDispRange(draw, data, key.range);
+	for (i = 0; i < MPGL_GRID_TYPE_MAX; i++) key.disp[i] = draw->disp[i];
+	if (volume->cached && volume->texture != 0 && memcmp(&key, &(volume->key), sizeof(MPGL_GridDrawKey)) == 0) return TRUE;
+	volume->cached = FALSE;
+	for (i = 0; i < 6; i++) range[i] = key.range[i];
+	glGetIntegerv(GL_MAX_3D_TEXTURE_SIZE, &max_size);
+	volume->stride = 1;
+	for (i = 0; i < 3; i++) {
+		n = (range[i + 3] - range[i] + max_size) / max_size;
+		if (n > volume->stride) volume->stride = n;
+	}
+	for (i = 0; i < 3; i++) {
+		volume->size[i] = (range[i + 3] - range[i]) / volume->stride + 1;
+	}
+	n = 0;
+	for (z = range[2]; z <= range[5]; z += volume->stride) {
+		for (y = range[1]; y <= range[4]; y += volume->stride) {
+			for (x = range[0]; x <= range[3]; x += volume->stride) {
+				if (!VolumeCell(draw, data, array, x, y, z)) continue;
+				v = array[MP_GRID_INDEX(data, x, y, z)];
+				if (n == 0 || v < volume->value_range[0]) volume->value_range[0] = v;
+				if (n == 0 || v > volume->value_range[1]) volume->value_range[1] = v;
+				n++;
+			}
+		}
+	}
+	if (n == 0) volume->value_range[0] = volume->value_range[1] = 0.0;
+	scale = (volume->value_range[1] > volume->value_range[0]) ? 65535.0 / (volume->value_range[1] - volume->value_range[0]) : 0.0;
+	plane = (unsigned short *)malloc((size_t)volume->size[0] * volume->size[1] * 2 * sizeof(unsigned short));
+	if (plane == NULL) return FALSE;
+	if (volume->texture == 0) glGenTextures(1, &(volume->texture));
+	glPushAttrib(GL_TEXTURE_BIT);
+	glPushClientAttrib(GL_CLIENT_PIXEL_STORE_BIT);
+	glPixelStorei(GL_UNPACK_ALIGNMENT, 2);
+	glBindTexture(GL_TEXTURE_3D, volume->texture);
+	glTexParameteri(GL_TEXTURE_3D, GL_TEXTURE_MIN_FILTER, GL_LINEAR);
+	glTexParameteri(GL_TEXTURE_3D, GL_TEXTURE_MAG_FILTER, GL_LINEAR);
+	glTexParameteri(GL_TEXTURE_3D, GL_TEXTURE_WRAP_S, GL_CLAMP_TO_EDGE);
+	glTexParameteri(GL_TEXTURE_3D, GL_TEXTURE_WRAP_T, GL_CLAMP_TO_EDGE);
+	glTexParameteri(GL_TEXTURE_3D, GL_TEXTURE_WRAP_R, GL_CLAMP_TO_EDGE);
+	glTexImage3D(GL_TEXTURE_3D, 0, GL_LUMINANCE16_ALPHA16, volume->size[0], volume->size[1], volume->size[2],
+		0, GL_LUMINANCE_ALPHA, GL_UNSIGNED_SHORT, NULL);
+	for (z = 0; z < volume->size[2]; z++) {
+		i = 0;
+		for (y = 0; y < volume->size[1]; y++) {
+			for (x = 0; x < volume->size[0]; x++, i += 2) {
+				if (VolumeCell(draw, data, array, range[0] + x * volume->stride, range[1] + y * volume->stride, range[2] + z * volume->stride)) {
+					v = array[MP_GRID_INDEX(data, range[0] + x * volume->stride, range[1] + y * volume->stride, range[2] + z * volume->stride)];
+					plane[i] = (unsigned short)((v - volume->value_range[0]) * scale + 0.5);
+					plane[i + 1] = 65535;
+				}
+				else {
+					plane[i] = plane[i + 1] = 0;
+				}
+			}
+		}
+		glTexSubImage3D(GL_TEXTURE_3D, 0, 0, 0, z, volume->size[0], volume->size[1], 1,
+			GL_LUMINANCE_ALPHA, GL_UNSIGNED_SHORT, plane);
+	}
+	glPopClientAttrib();
+	glPopAttrib();
+	free(plane);
+	memcpy(&(volume->key), &key, sizeof(MPGL_GridDrawKey));
+	volume->cached = TRUE;
+	return TRUE;
+}
+
+/* upload gradation table as 1D texture if it has changed */
+static void VolumeTransfer(MPGL_GridVolume *volume, MPGL_Colormap *colormap)
+{
+	MPGL_ColormapUpdateTable(colormap);
+	if (volume->transfer != 0 && volume->transfer_ngrad == colormap->table_ngrad
+		&& memcmp(volume->transfer_grad, colormap->table_grad, sizeof(volume->transfer_grad)) == 0) return;
+	if (volume->transfer == 0) glGenTextures(1, &(volume->transfer));
+	glPushAttrib(GL_TEXTURE_BIT);
+	glBindTexture(GL_TEXTURE_1D, volume->transfer);
+	glTexParameteri(GL_TEXTURE_1D, GL_TEXTURE_MIN_FILTER, GL_LINEAR);
+	glTexParameteri(GL_TEXTURE_1D, GL_TEXTURE_MAG_FILTER, GL_LINEAR);
+	glTexParameteri(GL_TEXTURE_1D, GL_TEXTURE_WRAP_S, GL_CLAMP_TO_EDGE);
+	glTexImage1D(GL_TEXTURE_1D, 0, GL_RGBA8, MPGL_COLORMAP_TABLE, 0, GL_RGBA, GL_UNSIGNED_BYTE, colormap->table_byte);
+	glPopAttrib();
+	volume->transfer_ngrad = colormap->table_ngrad;
+	memcpy(volume->transfer_grad, colormap->table_grad, sizeof(volume->transfer_grad));
+}
+
+static void VolumeBox(float p0[], float p1[])
+{
+	glBegin(GL_QUADS);
+	glVertex3f(p0[0], p0[1], p0[2]), glVertex3f(p0[0], p1[1], p0[2]), glVertex3f(p1[0], p1[1], p0[2]), glVertex3f(p1[0], p0[1], p0[2]);
+	glVertex3f(p0[0], p0[1], p1[2]), glVertex3f(p1[0], p0[1], p1[2]), glVertex3f(p1[0], p1[1], p1[2]), glVertex3f(p0[0], p1[1], p1[2]);
+	glVertex3f(p0[0], p0[1], p0[2]), glVertex3f(p1[0], p0[1], p0[2]), glVertex3f(p1[0], p0[1], p1[2]), glVertex3f(p0[0], p0[1], p1[2]);
+	glVertex3f(p0[0], p1[1], p0[2]), glVertex3f(p0[0], p1[1], p1[2]), glVertex3f(p1[0], p1[1], p1[2]), glVertex3f(p1[0], p1[1], p0[2]);
+	glVertex3f(p0[0], p0[1], p0[2]), glVertex3f(p0[0], p0[1], p1[2]), glVertex3f(p0[0], p1[1], p1[2]), glVertex3f(p0[0], p1[1], p0[2]);
+	glVertex3f(p1[0], p0[1], p0[2]), glVertex3f(p1[0], p1[1], p0[2]), glVertex3f(p1[0], p1[1], p1[2]), glVertex3f(p1[0], p0[1], p1[2]);
+	glEnd();
+}
+
+/* ray march displayed range with gradation colors of colormap and opacity rising with value
+   over the colormap range, return FALSE if shaders are not supported */
+int MPGL_GridVolumeDraw(MPGL_GridVolume *volume, MPGL_GridDrawData *draw, MP_GridData *data, MPGL_Colormap *colormap)
+{
+	int i;
+	int samples;
+	float p0[3], p1[3];
+	double n = MPGL_COLORMAP_TABLE;
+	double vs = 0.0, vo = 0.0;
+	double diag = 0.0;
+	unsigned int program;
+
+	if (!MPGL_ExtSupport(MPGL_ExtShader) || !VolumeProgram(volume)) return FALSE;
+	if (!MPGL_GridVolumeUpload(volume, draw, data)) return FALSE;
+	VolumeTransfer(volume, colormap);
+	for (i = 0; i < 3; i++) {
+		p0[i] = volume->key.range[i] - 0.5f;
+		p1[i] = volume->key.range[i + 3] + 0.5f;
+		diag += (p1[i] - p0[i]) * (p1[i] - p0[i]);
+	}
+	diag = sqrt(diag);
+	samples = draw->volume_samples;
+	if (samples < 1) samples = 1;
+	else if (samples > VOLUME_SAMPLES_MAX) samples = VOLUME_SAMPLES_MAX;
+	/* luminance to position in colormap range */
+	if (colormap->range[1] != colormap->range[0]) {
+		vs = (volume->value_range[1] - volume->value_range[0]) / (colormap->range[1] - colormap->range[0]);
+		vo = (volume->value_range[0] - colormap->range[0]) / (colormap->range[1] - colormap->range[0]);
+	}
+	program = volume->program;
+	glPushAttrib(GL_ENABLE_BIT | GL_COLOR_BUFFER_BIT | GL_DEPTH_BUFFER_BIT | GL_POLYGON_BIT | GL_TEXTURE_BIT);
+	glDisable(GL_LIGHTING);
+	glEnable(GL_BLEND);
+	glBlendFunc(GL_ONE, GL_ONE_MINUS_SRC_ALPHA);
+	glDepthMask(GL_FALSE);
+	glEnable(GL_CULL_FACE);
+	glCullFace(GL_FRONT);
+	glActiveTexture(GL_TEXTURE1);
+	glBindTexture(GL_TEXTURE_1D, volume->transfer);
+	glActiveTexture(GL_TEXTURE0);
+	glBindTexture(GL_TEXTURE_3D, volume->texture);
+	glUseProgram(program);
+	glUniform1i(glGetUniformLocation(program, "volume"), 0);
+	glUniform1i(glGetUniformLocation(program, "transfer"), 1);
+	glUniform3f(glGetUniformLocation(program, "box_min"), p0[0], p0[1], p0[2]);
+	glUniform3f(glGetUniformLocation(program, "box_max"), p1[0], p1[1], p1[2]);
+	glUniform2f(glGetUniformLocation(program, "value_scale"), (float)vs, (float)vo);
+	glUniform2f(glGetUniformLocation(program, "table_scale"), (float)((n - 1.0) / n), (float)(0.5 / n));
+	glUniform1f(glGetUniformLocation(program, "step"), (float)(diag / samples));
+	glUniform1f(glGetUniformLocation(program, "opacity"), (float)draw->volume_opacity);
+	VolumeBox(p0, p1);
+	glUseProgram(0);
+	glActiveTexture(GL_TEXTURE1);
+	glBindTexture(GL_TEXTURE_1D, 0);
+	glActiveTexture(GL_TEXTURE0);
+	glPopAttrib();
+	return TRUE;
+}
@@ -12,6 +12,7 @@ if os.name == 'nt':
                 sources=glob("libgl/*.c"),
                 include_dirs=[MPGrid.get_include(), np.get_include()],
                 define_macros=[('MP_PYTHON_LIB', None), ('WIN32', None)],
+                extra_compile_args=['/openmp'],
                 libraries=['opengl32', 'glu32']
             )
         ]
@@ -24,7 +25,9 @@ else:
                 sources=glob("libgl/*.c"),
                 include_dirs=[MPGrid.get_include(), np.get_include()],
                 define_macros=[('MP_PYTHON_LIB', None)],
-                libraries=['GL', 'GLU']
+                extra_compile_args=['-fopenmp'],
+                extra_link_args=['-fopenmp'],
+                libraries=['GL', 'GLU', 'EGL']
             )
         ]
     )
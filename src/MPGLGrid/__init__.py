@@ -19,3 +19,6 @@ class colormap(MPGLGrid.colormap):
 
 class scene(MPGLGrid.scene):
     pass
+
+class offscreen(MPGLGrid.offscreen):
+    pass
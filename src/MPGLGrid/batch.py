@@ -0,0 +1,159 @@
+"""
+Batch export of MPGrid snapshot files to image frames by offscreen rendering
+"""
+import collections
+import multiprocessing
+import queue
+import struct
+import zlib
+import numpy as np
+import MPGrid
+from . import MPGLGrid
+
+def write_png(fname, image):
+    """write uint8 array (height, width, 3 or 4) as PNG file"""
+    image = np.ascontiguousarray(image, dtype=np.uint8)
+    height, width, channels = image.shape
+    color_type = 6 if channels == 4 else 2
+    raw = np.zeros((height, width * channels + 1), dtype=np.uint8)
+    raw[:, 1:] = image.reshape(height, width * channels)
+    def chunk(tag, data):
+        return struct.pack('>I', len(data)) + tag + data \
+            + struct.pack('>I', zlib.crc32(tag + data) & 0xffffffff)
+    with open(fname, 'wb') as f:
+        f.write(b'\x89PNG\r\n\x1a\n')
+        f.write(chunk(b'IHDR', struct.pack('>IIBBBBB', width, height, 8, color_type, 0, 0, 0)))
+        f.write(chunk(b'IDAT', zlib.compress(raw.tobytes(), 6)))
+        f.write(chunk(b'IEND', b''))
+
+def write_frame(fname, image):
+    """write frame as PNG, npy or raw bytes by extension of fname"""
+    if fname.endswith('.png'):
+        write_png(fname, image)
+    elif fname.endswith('.npy'):
+        np.save(fname, image)
+    else:
+        with open(fname, 'wb') as f:
+            f.write(np.ascontiguousarray(image).tobytes())
+
+def _prepare(config, grid):
+    scene, model, draw, cmp, cmp_range, axis, colorbar, alpha = config
+    # a new grid may take the address of a freed one, geometry cached for it is not reused
+    draw.invalidate()
+    if cmp_range is None:
+        draw.cmp_range(grid, cmp)
+    else:
+        cmp.range = cmp_range
+    return (scene, model, draw, grid, cmp, axis, colorbar, alpha)
+
+def frames(offscreen, grids, scene, model, draw, cmp, cmp_range=None, axis=0, colorbar=0, alpha=0):
+    """
+    iterate rendered frames of grids in order,
+    pixels of a frame are read back by pixel buffers while next frames render
+    """
+    config = (scene, model, draw, cmp, cmp_range, axis, colorbar, alpha)
+    for grid in grids:
+        image = offscreen.render_async(*_prepare(config, grid))
+        if image is not None:
+            yield image
+    for image in offscreen.flush():
+        yield image
+
+def _worker(tasks, results, size, config):
+    try:
+        offscreen = MPGLGrid.offscreen(*size)
+    except Exception as e:
+        offscreen = None
+        error = str(e)
+    # frames waiting for readback, in order of rendering
+    pending = collections.deque()
+    def write(image):
+        index, fname, out = pending.popleft()
+        try:
+            write_frame(out, image)
+            results.put((index, None))
+        except Exception as e:
+            results.put((index, '%s: %s' % (fname, e)))
+    while True:
+        task = tasks.get()
+        if task is None:
+            break
+        index, fname, out = task
+        if offscreen is None:
+            results.put((index, error))
+            continue
+        try:
+            image = offscreen.render_async(*_prepare(config, MPGrid.read(fname)))
+        except Exception as e:
+            results.put((index, '%s: %s' % (fname, e)))
+            continue
+        pending.append(task)
+        if image is not None:
+            write(image)
+    if offscreen is not None:
+        for image in offscreen.flush():
+            write(image)
+
+def export(files, scene, model, draw, cmp, out='frame%05d.png', width=640, height=480,
+           processes=None, queue_size=None, cmp_range=None, axis=0, colorbar=0, alpha=0, progress=None):
+    """
+    render snapshot files of MPGrid to frames out % index by a pool of processes,
+    each process has its own offscreen context and a copy of scene, model, draw and cmp,
+    cmp_range = (min, max) fixes the colormap range of all frames,
+    progress(done, total, fname) is called when a frame is written,
+    return list of frame file names
+    """
+    files = list(files)
+    outs = [out % i for i in range(len(files))]
+    if processes is None:
+        processes = multiprocessing.cpu_count()
+    processes = max(1, min(processes, len(files)))
+    if queue_size is None:
+        queue_size = 2 * processes
+    config = (scene, model, draw, cmp, cmp_range, axis, colorbar, alpha)
+    # spawned processes do not inherit GL state of this process
+    ctx = multiprocessing.get_context('spawn')
+    tasks = ctx.Queue(queue_size)
+    results = ctx.Queue()
+    workers = [ctx.Process(target=_worker, args=(tasks, results, (width, height), config))
+               for i in range(processes)]
+    for w in workers:
+        w.start()
+    errors = []
+    count = [0]
+    def collect(timeout):
+        # results of finished frames, wait up to timeout for the first one
+        while True:
+            try:
+                index, error = results.get(timeout is not None, timeout)
+            except queue.Empty:
+                if timeout is not None and not any(w.is_alive() for w in workers):
+                    raise RuntimeError('worker processes terminated')
+                return
+            timeout = None
+            count[0] += 1
+            if error is not None:
+                errors.append(error)
+            elif progress is not None:
+                progress(count[0], len(files), outs[index])
+    try:
+        for task in zip(range(len(files)), files, outs):
+            while True:
+                try:
+                    tasks.put(task, True, 0.1)
+                    break
+                except queue.Full:
+                    collect(None)
+            collect(None)
+        for w in workers:
+            tasks.put(None)
+        while count[0] < len(files):
+            collect(1.0)
+    finally:
+        for w in workers:
+            if count[0] < len(files):
+                w.terminate()
+            w.join()
+    if errors:
+        raise RuntimeError('%d frames failed, %s' % (len(errors), errors[0]))
+    return outs
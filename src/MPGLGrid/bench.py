@@ -0,0 +1,184 @@
+"""
+Benchmarks of colormap range, geometry build and frame time on synthetic grids by offscreen rendering,
+run as python -m MPGLGrid.bench
+"""
+import argparse
+import json
+import platform
+import sys
+import time
+import MPGrid
+from . import MPGLGrid
+
+METHODS = {0: 'quads', 1: 'cubes'}
+KINDS = {0: 'type', 1: 'update', 2: 'val', 3: 'cx', 4: 'cy', 5: 'cz'}
+
+def make_grid(size, local_coef=0, ntype=4, seed=1):
+    """
+    synthetic grid of size^3 cells, random types on a sphere of type 1,
+    smooth val rising linearly along z, update in a corner block,
+    local coefficients vary along x, y and z if local_coef is set
+    """
+    n = size - 1
+    grid = MPGrid.new(size, size, size, ntype, local_coef)
+    grid.rand_seed = seed
+    grid.ellipsoid_type(1, (0, 0, 0), (n, n, n))
+    for t in range(2, ntype):
+        grid.uniform_random(t, size ** 3 // (4 * ntype), (0, 0, 0), (n, n, n))
+    grid.grad_val(2, 0.0, 1.0)
+    # cells of a new grid are all updated
+    grid.fill_update(0, (0, 0, 0), (n, n, n))
+    grid.fill_update(1, (0, 0, 0), (size // 4, size // 4, size // 4))
+    if local_coef:
+        for k in range(4):
+            p0 = k * size // 4
+            p1 = (k + 1) * size // 4 - 1
+            grid.fill_local_coef((1.0 + k, 0.5, 0.1 * k), (p0, 0, 0), (p1, n, n))
+    return grid
+
+def _time(func, repeat):
+    # best of repeat calls, seconds
+    best = None
+    for i in range(repeat):
+        t = time.perf_counter()
+        func()
+        t = time.perf_counter() - t
+        if best is None or t < best:
+            best = t
+    return best
+
+def _result(name, size, local_coef, cells, seconds, frames=None):
+    result = {'name': name, 'size': size, 'local_coef': local_coef, 'cells': cells, 'seconds': seconds,
+              'cells_per_sec': cells / seconds if seconds > 0.0 else 0.0}
+    if frames is not None:
+        result['frames_per_sec'] = frames / seconds if seconds > 0.0 else 0.0
+    return result
+
+def run(sizes=(64, 128, 256), local_coefs=(0, 1), methods=(0, 1), kinds=(0, 1, 2, 3, 4, 5),
+        width=640, height=480, render=1, repeat=3, frames=10, threads=0, progress=None):
+    """
+    run benchmarks in an offscreen context and return results as dict,
+    cmp_range is timed on value kinds, draw is timed for the first frame building geometry
+    and for frames drawn from cache, colormap and text are timed by frames of colorbar and strings,
+    progress(result) is called for each result
+    """
+    offscreen = MPGLGrid.offscreen(width, height)
+    offscreen.make_current()
+    scene = MPGLGrid.scene()
+    cmp = MPGLGrid.colormap()
+    results = []
+    def add(result):
+        results.append(result)
+        if progress is not None:
+            progress(result)
+    for size in sizes:
+        for local_coef in local_coefs:
+            grid = make_grid(size, local_coef)
+            cells = size ** 3
+            draw = MPGLGrid.draw()
+            draw.render = render
+            draw.threads = threads
+            model = MPGLGrid.model((0, 0, 1, 0, 1, 0), draw.region(grid))
+            model.rot_z(0.6)
+            model.rot_y(0.4)
+            prefix = '%d/%s' % (size, 'coef' if local_coef else 'nocoef')
+            for kind in kinds:
+                if kind >= 3 and not local_coef:
+                    continue
+                draw.kind = kind
+                if kind >= 2:
+                    for mode in (0, 1):
+                        # statistics are taken by one pass over the grid at each call
+                        seconds = _time(lambda: draw.cmp_range(grid, cmp, mode), repeat)
+                        add(_result('%s/cmp_range/%s/%s' % (prefix, KINDS[kind], ('minmax', 'percentile')[mode]),
+                                    size, local_coef, cells, seconds))
+                draw.cmp_range(grid, cmp)
+                for method in methods:
+                    draw.method = method
+                    draw.invalidate()
+                    seconds = _time(lambda: (draw.invalidate(), offscreen.render(scene, model, draw, grid, cmp)), 1)
+                    add(_result('%s/build/%s/%s' % (prefix, METHODS[method], KINDS[kind]),
+                                size, local_coef, cells, seconds, 1))
+                    seconds = _time(lambda: [offscreen.render(scene, model, draw, grid, cmp) for i in range(frames)], repeat)
+                    add(_result('%s/draw/%s/%s' % (prefix, METHODS[method], KINDS[kind]),
+                                size, local_coef, cells * frames, seconds, frames))
+            draw.kind = 2
+            draw.method = 1
+            draw.cmp_range(grid, cmp)
+            offscreen.render(scene, model, draw, grid, cmp)
+            seconds = _time(lambda: [offscreen.render(scene, model, draw, grid, cmp, colorbar=1) for i in range(frames)], repeat)
+            add(_result('%s/colorbar' % prefix, size, local_coef, cells * frames, seconds, frames))
+            del draw, grid
+    # text does not depend on grids
+    def text():
+        for i in range(frames):
+            for k in range(20):
+                scene.front_text(10, 20 + 20 * k, 'step %d value %g' % (k, 0.125 * k), k % 3)
+            offscreen.read()
+    grid = make_grid(8)
+    draw = MPGLGrid.draw()
+    offscreen.render(scene, MPGLGrid.model((0, 0, 1, 0, 1, 0), draw.region(grid)), draw, grid, cmp)
+    add(_result('text', 0, 0, 0, _time(text, repeat), frames))
+    return {'platform': platform.platform(), 'python': platform.python_version(),
+            'width': width, 'height': height, 'render': render, 'threads': threads,
+            'repeat': repeat, 'frames': frames, 'results': results}
+
+def compare(current, baseline, threshold=0.1):
+    """
+    compare results with baseline by throughput, frames per second if timed by frames
+    and cells per second otherwise, return list of (name, baseline, current, ratio, regressed),
+    regressed if current is slower than baseline by more than threshold
+    """
+    base = dict((r['name'], r) for r in baseline['results'])
+    rows = []
+    for r in current['results']:
+        b = base.get(r['name'])
+        if b is None:
+            continue
+        key = 'frames_per_sec' if 'frames_per_sec' in r else 'cells_per_sec'
+        if b.get(key, 0.0) <= 0.0:
+            continue
+        ratio = r[key] / b[key]
+        rows.append((r['name'], b[key], r[key], ratio, ratio < 1.0 - threshold))
+    return rows
+
+def _print_result(result):
+    if 'frames_per_sec' in result:
+        print('%-40s %10.4f s %12.4g cells/s %10.2f frames/s' % (result['name'], result['seconds'],
+              result['cells_per_sec'], result['frames_per_sec']))
+    else:
+        print('%-40s %10.4f s %12.4g cells/s' % (result['name'], result['seconds'], result['cells_per_sec']))
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m MPGLGrid.bench', description=__doc__.strip())
+    parser.add_argument('--sizes', type=int, nargs='+', default=[64, 128, 256], help='grid sizes, up to 512')
+    parser.add_argument('--local-coef', type=int, nargs='+', default=[0, 1], choices=[0, 1])
+    parser.add_argument('--methods', type=int, nargs='+', default=[0, 1], choices=sorted(METHODS))
+    parser.add_argument('--kinds', type=int, nargs='+', default=sorted(KINDS), choices=sorted(KINDS))
+    parser.add_argument('--width', type=int, default=640)
+    parser.add_argument('--height', type=int, default=480)
+    parser.add_argument('--render', type=int, default=1, choices=[0, 1, 2], help='0:list 1:buffer 2:instance')
+    parser.add_argument('--repeat', type=int, default=3, help='best of repeat')
+    parser.add_argument('--frames', type=int, default=10, help='frames per repeat')
+    parser.add_argument('--threads', type=int, default=0)
+    parser.add_argument('--out', help='write results as JSON')
+    parser.add_argument('--baseline', help='compare results with JSON of saved results')
+    parser.add_argument('--threshold', type=float, default=0.1, help='allowed slowdown against baseline')
+    args = parser.parse_args(argv)
+    current = run(args.sizes, args.local_coef, args.methods, args.kinds, args.width, args.height,
+                  args.render, args.repeat, args.frames, args.threads, _print_result)
+    if args.out:
+        with open(args.out, 'w') as f:
+            json.dump(current, f, indent=1)
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        rows = compare(current, baseline, args.threshold)
+        for name, b, c, ratio, regressed in rows:
+            print('%-40s %12.4g %12.4g %6.2f%s' % (name, b, c, ratio, ' REGRESSED' if regressed else ''))
+        if any(row[4] for row in rows):
+            return 1
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,583 @@
+"""
+Regression tests of render paths by headless offscreen rendering,
+frames of buffer, instance, merge and refresh are compared with the list path
+"""
+import json
+import pickle
+import sys
+import threading
+import numpy as np
+import pytest
+import MPGrid
+import MPGLGrid
+from MPGLGrid import batch, bench
+
+W, H = 160, 120
+N = 16
+
+@pytest.fixture(scope='module')
+def off():
+  try:
+    return MPGLGrid.offscreen(W, H)
+  except RuntimeError:
+    pytest.skip('no offscreen context')
+
+@pytest.fixture
+def grid():
+  return bench.make_grid(N, 1)
+
+def scene():
+  s = MPGLGrid.scene()
+  s.light_add(1.0, 1.0, 1.0, 0.0)
+  return s
+
+def model(grid):
+  m = MPGLGrid.model((0, 0, 1, 0, 1, 0), MPGLGrid.draw().region(grid))
+  m.rot_z(0.6)
+  m.rot_y(0.4)
+  return m
+
+def new_draw(**kw):
+  draw = MPGLGrid.draw()
+  for key, value in kw.items():
+    setattr(draw, key, value)
+  return draw
+
+def render(off, grid, draw, cmp=None):
+  if cmp is None:
+    cmp = MPGLGrid.colormap()
+    draw.cmp_range(grid, cmp)
+  return off.render(scene(), model(grid), draw, grid, cmp).astype(int)
+
+def drawn(image):
+  return (image != image[0, 0]).any(axis=2).sum()
+
+def diff(a, b):
+  return (np.abs(a - b).max(axis=2) > 0).sum()
+
+def cracks(image):
+  # background pixels between drawn pixels
+  bg = (image == image[0, 0]).all(axis=2)
+  return (bg[1:-1, 1:-1] & ~bg[:-2, 1:-1] & ~bg[2:, 1:-1] & ~bg[1:-1, :-2] & ~bg[1:-1, 2:]).sum()
+
+def values(grid):
+  nx, ny, nz = grid.size
+  return np.array([grid.get_val((x, y, z)) for z in range(nz) for y in range(ny) for x in range(nx)])
+
+@pytest.mark.parametrize('method', (0, 1))
+@pytest.mark.parametrize('kind', (0, 1, 2))
+def test_buffer(off, grid, method, kind):
+  ref = render(off, grid, new_draw(method=method, kind=kind))
+  assert drawn(ref) > 0
+  image = render(off, grid, new_draw(method=method, kind=kind, render=1))
+  # vertices of buffers are in grid coordinates, edges of lists may be rasterized differently
+  assert diff(image, ref) <= W * H // 1000
+  assert diff(render(off, grid, new_draw(method=method, kind=kind, render=1, texture=1)), image) == 0
+  # faces are merged within bricks
+  assert diff(render(off, grid, new_draw(method=method, kind=kind, render=1, brick=4)), image) <= W * H // 1000
+
+@pytest.mark.parametrize('kind', (0, 2))
+def test_instance(off, grid, kind):
+  ref = render(off, grid, new_draw(method=1, kind=kind))
+  image = render(off, grid, new_draw(method=1, kind=kind, render=2))
+  # edges of cubes may be rasterized differently by instanced draws
+  assert diff(image, ref) <= W * H // 1000
+
+@pytest.mark.parametrize('method', (0, 1))
+def test_merge(off, grid, method):
+  cmp = MPGLGrid.colormap()
+  count = [len(new_draw(method=method, merge=merge).mesh(grid, cmp)[3]) for merge in (0, 1)]
+  assert count[1] < count[0]
+  ref = render(off, grid, new_draw(method=method, render=1, merge=0))
+  image = render(off, grid, new_draw(method=method, render=1, merge=1))
+  # merged faces overlap neighbors slightly, pixels on borders of colors may differ but none is left open
+  assert diff(image, ref) <= W * H // 1000
+  assert cracks(ref) == 0 and cracks(image) == 0
+
+@pytest.mark.parametrize('method', (0, 1))
+def test_merge_block(method):
+  # faces of a uniform block of N x 2 x 1 cells merge into a quad of two triangles for each side
+  grid = MPGrid.new(N, 2, 1, 2, 0)
+  cmp = MPGLGrid.colormap()
+  vertices, normals, colors, triangles = new_draw(method=method, merge=1).mesh(grid, cmp)
+  assert len(vertices) == 6 * 4 and len(triangles) == 6 * 2
+  assert len(new_draw(method=method, merge=0).mesh(grid, cmp)[3]) == 2 * 2 * (2 * N + N + 2)
+
+def test_refresh(off, grid):
+  draw = new_draw(method=1, kind=2, render=1)
+  cmp = MPGLGrid.colormap()
+  draw.cmp_range(grid, cmp)
+  before = render(off, grid, draw, cmp)
+  mask = np.zeros(grid.ntot, dtype=np.uint8)
+  for x in range(N):
+    grid.set_val(1.0 - grid.get_val((x, 0, N - 1)), (x, 0, N - 1))
+    mask[(N - 1) * N * N + x] = 1
+  assert draw.refresh(grid, cmp, mask) > 0
+  image = render(off, grid, draw, cmp)
+  assert diff(image, before) > 0
+  assert diff(image, render(off, grid, new_draw(method=1, kind=2, render=1), cmp)) == 0
+
+@pytest.mark.parametrize('method', (0, 1))
+def test_stats(grid, method):
+  draw = new_draw(method=method, kind=2, threads=2)
+  draw.set_disp(1, 0)
+  stats = draw.range_stats(grid, 16, (0.0, 10.0, 50.0, 99.0, 100.0))
+  val = values(grid).reshape(N, N, N)
+  if method == 1:
+    types = np.array([grid.get_type((x, y, z)) for z in range(N) for y in range(N) for x in range(N)]).reshape(N, N, N)
+    sel = val[types != 1]
+  else:
+    shell = np.ones((N, N, N), dtype=bool)
+    shell[1:-1, 1:-1, 1:-1] = False
+    sel = val[shell]
+  assert stats['count'] == sel.size
+  assert stats['min'] == sel.min() and stats['max'] == sel.max()
+  assert abs(stats['mean'] - sel.mean()) < 1e-9
+  assert np.allclose(stats['percentiles'], np.percentile(sel, (0.0, 10.0, 50.0, 99.0, 100.0)), rtol=1e-12, atol=0.0)
+  assert list(stats['hist']) == list(np.histogram(sel, 16, (sel.min(), sel.max()))[0])
+
+def test_stats_edit(grid):
+  # statistics follow values edited in place
+  draw = new_draw(method=1, kind=2, threads=2)
+  cmp = MPGLGrid.colormap()
+  draw.range_stats(grid, 16)
+  draw.cmp_range(grid, cmp)
+  grid.set_val(5.0, (0, 0, 0))
+  grid.set_val(-5.0, (N - 1, N - 1, N - 1))
+  stats = draw.range_stats(grid, 16, (0.0, 50.0, 100.0))
+  sel = values(grid)
+  assert stats['min'] == -5.0 and stats['max'] == 5.0
+  assert stats['percentiles'] == (-5.0, np.percentile(sel, 50.0), 5.0)
+  assert list(stats['hist']) == list(np.histogram(sel, 16, (-5.0, 5.0))[0])
+  draw.cmp_range(grid, cmp)
+  assert cmp.range == (-5.0, 5.0)
+  grid.fill_val(2.0, (0, 0, 0), (N - 1, N - 1, N - 1))
+  stats = draw.range_stats(grid, 4, (10.0, 90.0))
+  assert stats['min'] == stats['max'] == 2.0 and stats['percentiles'] == (2.0, 2.0)
+  assert list(stats['hist']) == [N ** 3, 0, 0, 0]
+
+@pytest.mark.parametrize('method', (0, 1))
+def test_pick(method):
+  grid = MPGrid.new(N, N, N, 2, 0)
+  grid.fill_type(1, (0, 0, 0), (N - 1, N - 1, N - 1))
+  draw = new_draw(method=method)
+  s = MPGLGrid.scene()
+  s.resize(200, 200)
+  m = MPGLGrid.model((0, 0, 1, 0, 1, 0), draw.region(grid))
+  hit = draw.pick(grid, m, s, 100, 100)
+  assert hit is not None and hit['face'] == 5 and hit['index'][2] == N - 1
+  # quads are drawn on hidden types too, cubes are not
+  draw.set_disp(1, 0)
+  hit = draw.pick(grid, m, s, 100, 100)
+  assert (hit is not None and hit['index'][2] == N - 1) if method == 0 else hit is None
+  assert draw.pick(grid, m, s, 0, 0) is None
+
+def test_isosurface(off):
+  # the surface cut by range is open and seen from its back side
+  grid = MPGrid.new(N, N, N, 2, 0)
+  grid.grad_val(2, 0.0, 1.0)
+  draw = new_draw(method=3, kind=2, iso_level=0.5)
+  vertices, normals, indices = draw.isosurface(grid, 0.5)
+  assert len(indices) > 0
+  for angle in (0.0, 1.6, 3.0):
+    m = MPGLGrid.model((0, 0, 1, 0, 1, 0), draw.region(grid))
+    m.rot_x(angle)
+    cmp = MPGLGrid.colormap()
+    draw.cmp_range(grid, cmp)
+    assert drawn(off.render(scene(), m, draw, grid, cmp)) > 0
+
+def test_edit(off, grid):
+  # list render shows edits of the grid at once, buffer render after touch
+  cmp = MPGLGrid.colormap()
+  cmp.range = (0.0, 1.0)
+  draw, buffer = new_draw(method=1, kind=2), new_draw(method=1, kind=2, render=1)
+  before = render(off, grid, draw, cmp)
+  render(off, grid, buffer, cmp)
+  for x in range(N):
+    grid.set_val(1.0 - grid.get_val((x, 0, N - 1)), (x, 0, N - 1))
+  assert diff(render(off, grid, draw, cmp), before) > 0
+  buffer.touch((0, 0, N - 1), (N - 1, 0, N - 1))
+  assert diff(render(off, grid, buffer, cmp), render(off, grid, new_draw(method=1, kind=2, render=1), cmp)) == 0
+
+def test_keep_grid(off):
+  grid = bench.make_grid(N, 0)
+  count = sys.getrefcount(grid)
+  draw = new_draw(render=1)
+  render(off, grid, draw)
+  assert sys.getrefcount(grid) == count + 1
+  del draw
+  assert sys.getrefcount(grid) == count
+
+def test_batch(off, grid):
+  # a grid solved in place keeps its address, as a new grid taking the address of a freed one
+  def steps(g):
+    for axis in range(3):
+      g.grad_val(axis, 0.0, 1.0)
+      yield g
+  draw = new_draw(method=1, kind=2, render=1)
+  cmp = MPGLGrid.colormap()
+  images = list(batch.frames(off, steps(MPGrid.new(N, N, N, 2, 0)), scene(), model(grid), draw, cmp, cmp_range=(0.0, 1.0)))
+  assert len(images) == 3
+  cmp.range = (0.0, 1.0)
+  for g, image in zip(steps(MPGrid.new(N, N, N, 2, 0)), images):
+    assert diff(image.astype(int), render(off, g, new_draw(method=1, kind=2, render=1), cmp)) == 0
+
+def test_export(off, grid, tmp_path):
+  # snapshot files are rendered by a pool of processes as by frames in this process
+  files = []
+  for axis in range(3):
+    g = MPGrid.new(N, N, N, 2, 0)
+    g.grad_val(axis, 0.0, 1.0)
+    files.append(str(tmp_path / ('step%d.mpg' % axis)))
+    g.write(files[-1], 0)
+  s, m, draw, cmp = scene(), model(grid), new_draw(method=1, kind=2, render=1), MPGLGrid.colormap()
+  done = []
+  outs = batch.export(files, s, m, draw, cmp, out=str(tmp_path / 'frame%d.npy'), width=W, height=H,
+    processes=2, cmp_range=(0.0, 1.0), progress=lambda *args: done.append(args))
+  assert outs == [str(tmp_path / ('frame%d.npy' % i)) for i in range(3)]
+  assert [d[:2] for d in done] == [(1, 3), (2, 3), (3, 3)] and sorted(d[2] for d in done) == outs
+  images = batch.frames(off, (MPGrid.read(f) for f in files), s, m, draw, cmp, cmp_range=(0.0, 1.0))
+  for out, image in zip(outs, images):
+    assert diff(np.load(out).astype(int), image.astype(int)) == 0
+  # failed frames are reported after the others are written
+  with pytest.raises(RuntimeError, match='missing.mpg'):
+    batch.export(files + [str(tmp_path / 'missing.mpg')], s, m, draw, cmp, out=str(tmp_path / 'failed%d.npy'),
+      width=W, height=H, processes=2)
+  assert all((tmp_path / ('failed%d.npy' % i)).exists() for i in range(3))
+
+def test_read_async(off, grid):
+  # frames come out of the ring of pixel buffers in order, the oldest when all buffers are pending
+  s, m, cmp = scene(), model(grid), MPGLGrid.colormap()
+  draws = [new_draw(method=1, range=(0, 0, 0, n, N - 1, N - 1)) for n in range(0, N, 3)]
+  refs = [off.render(s, m, draw, grid, cmp) for draw in draws]
+  assert all(diff(refs[i].astype(int), refs[i + 1].astype(int)) > 0 for i in range(len(refs) - 1))
+  assert off.buffers == 2
+  for buffers in (2, 3):
+    off.buffers = buffers
+    images = [off.render_async(s, m, draw, grid, cmp) for draw in draws]
+    if images[0] is not None:
+      off.buffers = 2
+      pytest.skip('no pixel buffers')
+    assert images[:buffers - 1] == [None] * (buffers - 1)
+    images = images[buffers - 1:] + off.flush()
+    assert len(images) == len(refs) and all((a == b).all() for a, b in zip(images, refs))
+    assert off.flush() == []
+  # frames read back with alpha have 4 channels, buffers are not changed while frames are pending
+  off.buffers = 2
+  assert off.read_async(alpha=1) is None
+  with pytest.raises(RuntimeError):
+    off.buffers = 2
+  assert off.read_async().shape == (H, W, 4) and off.flush()[0].shape == (H, W, 3)
+  with pytest.raises(ValueError):
+    off.buffers = 4
+
+def test_step_colors():
+  cmp = MPGLGrid.colormap()
+  cmp.nstep = 2
+  colors = cmp.step_colors([0, 1, 2, 15, -1])
+  assert list(colors[0]) == [0, 0, 255] and list(colors[1]) == [0, 255, 255]
+  # ids out of nstep are white as drawn
+  assert (colors[2:] == 255).all()
+
+def test_busy(off, grid):
+  # calls reading or changing draw fail while it draws in another thread
+  draw = new_draw(method=1, kind=2)
+  cmp = MPGLGrid.colormap()
+  s = MPGLGrid.scene()
+  s.resize(200, 200)
+  m = MPGLGrid.model((0, 0, 1, 0, 1, 0), draw.region(grid))
+  stop = threading.Event()
+  def worker():
+    MPGLGrid.offscreen(W, H).make_current()
+    for i in range(1000):
+      if stop.is_set():
+        break
+      draw.invalidate()
+      draw.draw(grid, cmp)
+  calls = {'pick': lambda: draw.pick(grid, m, s, 100, 100), 'region': lambda: draw.region(grid),
+    'get_disp': lambda: draw.get_disp(1), 'range': lambda: draw.range, 'kind': lambda: setattr(draw, 'kind', 2)}
+  busy = set()
+  th = threading.Thread(target=worker)
+  th.start()
+  while th.is_alive() and len(busy) < len(calls):
+    for name, call in calls.items():
+      try:
+        call()
+      except RuntimeError:
+        busy.add(name)
+  stop.set()
+  th.join()
+  assert busy == set(calls)
+  assert draw.kind == 2 and draw.pick(grid, m, s, 100, 100) is not None
+
+def test_pickle(off, grid):
+  # public attributes are pickled by name and frames of copies are the same
+  draw = new_draw(method=1, kind=2, render=1, lod=2, glyph_scale=0.5, range=(1, 2, 3, N - 2, N - 3, N - 4), slice=(3, 4, 5))
+  draw.set_disp(1, 0)
+  cmp = MPGLGrid.colormap()
+  cmp.mode, cmp.range, cmp.font_color = 0, (0.2, 0.8), (1.0, 0.0, 0.5)
+  cmp.set_step_color(3, 0.25, 0.5, 0.75)
+  cmp.set_label(3, 'three')
+  s = scene()
+  s.light_diffuse(0, 0.1, 0.2, 0.3, 1.0)
+  s.clear_color = (0.5, 0.5, 0.5, 1.0)
+  m = model(grid)
+  copies = [pickle.loads(pickle.dumps(obj)) for obj in (draw, cmp, s, m)]
+  for name in ('method', 'kind', 'render', 'lod', 'glyph_scale', 'range', 'slice'):
+    assert getattr(copies[0], name) == getattr(draw, name)
+  assert copies[0].get_disp(1) == 0 and copies[0].get_disp(0) == 1
+  assert copies[1].range == cmp.range and copies[1].font_color == cmp.font_color
+  assert copies[1].step_color(3) == cmp.step_color(3)
+  assert copies[2].clear_color == s.clear_color
+  assert copies[3].mat == m.mat and copies[3].scale == m.scale
+  image = off.render(s, m, draw, grid, cmp).astype(int)
+  assert diff(off.render(*copies[2:], copies[0], grid, copies[1]).astype(int), image) == 0
+  with pytest.raises(ValueError):
+    MPGLGrid.draw().__setstate__(b'state')
+
+def blocks(size):
+  # grid of random types and values uniform in blocks of size^3 cells
+  grid = MPGrid.new(N, N, N, 4, 0)
+  rng = np.random.RandomState(1)
+  for z in range(0, N, size):
+    for y in range(0, N, size):
+      for x in range(0, N, size):
+        p1 = (x + size - 1, y + size - 1, z + size - 1)
+        grid.fill_type(int(rng.randint(4)), (x, y, z), p1)
+        grid.fill_val(float(rng.rand()), (x, y, z), p1)
+  return grid
+
+def interact_frame(off, s, m, draw, grid, cmp):
+  # draw with model as the viewer does, the frame is cleared by rendering no type
+  blank = new_draw(method=1)
+  for t in range(4):
+    blank.set_disp(t, 0)
+  off.render(s, m, blank, grid, cmp)
+  m.transform()
+  refine = draw.draw(grid, cmp, m)
+  image = off.read().astype(int)
+  # lights of the next setup are placed by the view of the scene
+  s.resize(W, H)
+  return refine, image
+
+def test_lod_levels(off, grid):
+  # levels get coarser while frames exceed budget during interaction and finer by one after it
+  draw = new_draw(method=1, lod=2, lod_budget=-1.0)
+  cmp, s, m = MPGLGrid.colormap(), scene(), model(grid)
+  m.button(0, 0, 1)
+  levels = [(interact_frame(off, s, m, draw, grid, cmp)[0], draw.lod_level) for i in range(3)]
+  assert levels == [(0, 1), (0, 2), (0, 2)]
+  m.button(0, 0, 0)
+  levels = [(interact_frame(off, s, m, draw, grid, cmp)[0], draw.lod_level) for i in range(3)]
+  assert levels == [(1, 1), (0, 0), (0, 0)]
+  # frames in budget stay at full resolution
+  draw = new_draw(method=1, lod=2, lod_budget=1.0e9)
+  m.button(0, 0, 1)
+  assert [interact_frame(off, s, m, draw, grid, cmp)[0] for i in range(2)] == [0, 0] and draw.lod_level == 0
+  m.button(0, 0, 0)
+
+@pytest.mark.parametrize('method', (0, 1))
+@pytest.mark.parametrize('kind', (0, 2))
+def test_lod_coarse(off, method, kind):
+  # coarse cells take the most frequent type and mean value of blocks, so blocks of uniform cells look the same
+  cmp = MPGLGrid.colormap()
+  cmp.range = (0.0, 1.0)
+  for size, same in ((2, True), (1, False)):
+    grid = blocks(size)
+    s, m = scene(), model(grid)
+    m.button(0, 0, 1)
+    ref = interact_frame(off, s, m, new_draw(method=method, kind=kind, render=1), grid, cmp)[1]
+    draw = new_draw(method=method, kind=kind, render=1, lod=1, lod_budget=-1.0)
+    image = interact_frame(off, s, m, draw, grid, cmp)[1]
+    assert draw.lod_level == 1
+    assert (diff(image, ref) <= W * H // 1000) == same
+
+def test_volume(off, grid):
+  cmp = MPGLGrid.colormap()
+  s, m = scene(), model(grid)
+  new_draw(kind=2).cmp_range(grid, cmp)
+  cubes = off.render(s, m, new_draw(method=1, kind=2), grid, cmp).astype(int)
+  images = [off.render(s, m, new_draw(method=2, kind=2, volume_opacity=a), grid, cmp).astype(int) for a in (0.0, 0.05, 0.5)]
+  if diff(images[0], cubes) == 0:
+    pytest.skip('no shaders')
+  # rays accumulate more color as opacity rises, none without it
+  assert drawn(images[0]) == 0
+  assert 0 < images[1].sum() < images[2].sum()
+  # opacity is zero at lower end of colormap range and hidden types are skipped
+  low = MPGLGrid.colormap()
+  low.range = (cmp.range[1] + 1.0, cmp.range[1] + 2.0)
+  assert drawn(off.render(s, m, new_draw(method=2, kind=2, volume_opacity=5.0), grid, low)) == 0
+  hidden = new_draw(method=2, kind=2, volume_opacity=5.0)
+  for t in range(4):
+    hidden.set_disp(t, 0)
+  assert drawn(off.render(s, m, hidden, grid, cmp)) == 0
+  # type kind is drawn by cubes
+  assert diff(render(off, grid, new_draw(method=2, kind=0)), render(off, grid, new_draw(method=1, kind=0))) == 0
+
+def test_slice(off):
+  grid = MPGrid.new(N, N, N, 2, 0)
+  grid.grad_val(0, 0.0, 1.0)
+  cmp = MPGLGrid.colormap()
+  cmp.range = (0.0, 1.0)
+  s, m = scene(), model(grid)
+  def image(draw):
+    return off.render(s, m, draw, grid, cmp).astype(int)
+  # planes off or out of range are not drawn
+  assert drawn(image(new_draw(method=4, kind=2))) == 0
+  assert drawn(image(new_draw(method=4, kind=2, slice=(-1, -1, N)))) == 0
+  # planes are textured with colors of cells, without lighting
+  top = image(new_draw(method=4, kind=2, slice=(-1, -1, N - 1)))
+  assert drawn(top) > 0
+  colors = set(map(tuple, cmp.grad_colors(values(grid)).astype(int))) | {tuple(top[0, 0])}
+  assert set(map(tuple, top.reshape(-1, 3))) <= colors
+  # a moved plane and edited cells are drawn as by a new draw
+  draw = new_draw(method=4, kind=2, slice=(3, 4, 5))
+  before = image(draw)
+  draw.slice = (3, 4, 9)
+  assert diff(image(draw), before) > 0
+  assert diff(image(draw), image(new_draw(method=4, kind=2, slice=(3, 4, 9)))) == 0
+  before = image(draw)
+  grid.fill_val(0.5, (0, 0, 9), (N - 1, N - 1, 9))
+  assert diff(image(draw), before) > 0
+  assert diff(image(draw), image(new_draw(method=4, kind=2, slice=(3, 4, 9)))) == 0
+  # cells of hidden types are transparent
+  draw.set_disp(0, 0)
+  assert drawn(image(draw)) == 0
+  # cells of one color drawn after planes keep their material
+  grid.fill_val(0.5, (0, 0, 0), (N - 1, N - 1, N - 1))
+  cubes = image(new_draw(method=1, kind=2))
+  image(new_draw(method=4, kind=2, slice=(3, 4, 9)))
+  assert diff(image(new_draw(method=1, kind=2)), cubes) == 0
+
+def test_glyph(off, grid):
+  cmp = MPGLGrid.colormap()
+  new_draw(kind=2).cmp_range(grid, cmp)
+  s, m = scene(), model(grid)
+  def faces(draw, g=grid):
+    image = off.render(s, m, draw, g, cmp).astype(int)
+    return draw.stats()['last']['faces'], drawn(image), image
+  # a glyph is drawn at every glyph_stride cells in each direction by one draw call
+  count = {stride: faces(new_draw(method=5, kind=2, glyph_stride=stride, profile=1)) for stride in (1, 2, 4)}
+  for stride in (2, 4):
+    assert count[stride][0] * stride ** 3 == count[1][0]
+  assert count[1][1] > count[2][1] > count[4][1] > 0
+  assert faces(new_draw(method=5, kind=2, glyph_stride=2, glyph_scale=0.5, profile=1))[1] < count[2][1]
+  hidden = new_draw(method=5, kind=2, glyph_stride=2, profile=1)
+  for t in range(4):
+    hidden.set_disp(t, 0)
+  assert faces(hidden)[:2] == (0, 0)
+  # glyphs are oriented by local coefficients and the longest one is glyph_scale long, zero vectors are not drawn
+  images = []
+  for coef in ((0.0, 0.0, 0.0), (1.0, 0.0, 0.0), (2.0, 0.0, 0.0), (0.0, 0.0, 1.0)):
+    g = MPGrid.new(N, N, N, 2, 1)
+    g.fill_local_coef(coef, (0, 0, 0), (N - 1, N - 1, N - 1))
+    images.append(faces(new_draw(method=5, kind=1, glyph_stride=4, profile=1), g))
+  assert images[0][:2] == (0, 0)
+  assert diff(images[1][2], images[2][2]) == 0 and diff(images[1][2], images[3][2]) > 0
+  # grids without local coefficients are drawn by cubes
+  g = bench.make_grid(N, 0)
+  assert diff(render(off, g, new_draw(method=5, kind=2)), render(off, g, new_draw(method=1, kind=2))) == 0
+
+def test_text(off):
+  s = scene()
+  # extents add up by characters and heights grow with font, unknown font types are 12pt
+  for font in (0, 1, 2):
+    width, height = s.text_extent('MPGL', font)
+    assert width == s.text_extent('MP', font)[0] + s.text_extent('GL', font)[0] > 0
+    assert s.text_extent('', font) == (0, height)
+  assert s.text_extent('MPGL', 0)[1] < s.text_extent('MPGL', 1)[1] < s.text_extent('MPGL', 2)[1]
+  assert s.text_extent('MPGL', 5) == s.text_extent('MPGL', 1)
+  # characters of the atlas are drawn in the extent above the baseline at (x, y) from top left,
+  # a string laid out again from the cache is drawn the same at another position
+  grid = MPGrid.new(4, 4, 4, 2, 0)
+  blank = new_draw(method=1)
+  blank.set_disp(0, 0)
+  cmp, m = MPGLGrid.colormap(), model(grid)
+  for font in (0, 1, 2):
+    width, height = s.text_extent('MPGL', font)
+    images = []
+    for x, y in ((20, 40), (60, 80), (20, 40)):
+      off.render(s, m, blank, grid, cmp)
+      s.front_text(x, y, 'MPGL', font)
+      image = off.read().astype(int)
+      s.resize(W, H)
+      ys, xs = np.nonzero((image != image[0, 0]).any(axis=2))
+      assert len(xs) > 0
+      assert x <= xs.min() and xs.max() < x + width and y - height <= ys.min() and ys.max() < y
+      images.append(image)
+    assert diff(images[0][:-40, :-40], images[1][40:, 40:]) == 0 and diff(images[0], images[2]) == 0
+
+def test_bench_grid():
+  grid = bench.make_grid(N, 1)
+  assert grid.size == (N, N, N) and grid.local_coef
+  assert grid.get_type((N // 2, N // 2, N // 2)) == 1
+  assert grid.get_val((0, 0, 0)) < grid.get_val((0, 0, N - 1))
+  assert grid.get_update((0, 0, 0)) == 1 and grid.get_update((N - 1, N - 1, N - 1)) == 0
+  assert not bench.make_grid(N, 0).local_coef
+
+def test_bench(off, tmp_path):
+  done = []
+  current = bench.run(sizes=(8,), kinds=(0, 2, 3), width=64, height=48, repeat=1, frames=2, progress=done.append)
+  names = [r['name'] for r in current['results']]
+  assert done == current['results'] and len(set(names)) == len(names)
+  # value kinds time cmp_range, local coefficient kinds only grids having them
+  expect = ['8/%s/%s/%s/%s' % (coef, stage, method, kind) for coef in ('nocoef', 'coef') for kind in ('type', 'val', 'cx')
+    for stage in ('build', 'draw') for method in ('quads', 'cubes') if coef == 'coef' or kind != 'cx']
+  expect += ['8/%s/cmp_range/%s/%s' % (coef, kind, mode) for coef in ('nocoef', 'coef') for kind in ('val', 'cx')
+    for mode in ('minmax', 'percentile') if coef == 'coef' or kind != 'cx']
+  assert sorted(names) == sorted(expect + ['8/nocoef/colorbar', '8/coef/colorbar', 'text'])
+  for r in current['results']:
+    assert r['seconds'] > 0.0 and ('frames_per_sec' in r) == ('/cmp_range/' not in r['name'])
+  # throughputs are compared by frames if timed by frames, names missing from baseline are skipped
+  baseline = json.loads(json.dumps(current))
+  for r in baseline['results']:
+    for key in ('cells_per_sec', 'frames_per_sec'):
+      if key in r:
+        r[key] *= 2.0 if r['name'] == 'text' else 0.5
+  baseline['results'] = baseline['results'][1:]
+  rows = bench.compare(current, baseline)
+  assert [row[0] for row in rows] == names[1:]
+  for name, b, c, ratio, regressed in rows:
+    assert ratio == pytest.approx(0.5 if name == 'text' else 2.0) and regressed == (name == 'text')
+  assert not any(row[4] for row in bench.compare(current, baseline, threshold=0.6))
+  # command line writes results and exits with 1 on regressions against baseline
+  out, base = tmp_path / 'out.json', tmp_path / 'base.json'
+  args = ['--sizes', '8', '--local-coef', '0', '--kinds', '0', '--width', '64', '--height', '48', '--repeat', '1', '--frames', '1']
+  assert bench.main(args + ['--out', str(out)]) == 0
+  results = json.loads(out.read_text())
+  for r in results['results']:
+    r['frames_per_sec'] = 1.0e-9
+  base.write_text(json.dumps(results))
+  assert bench.main(args + ['--baseline', str(base)]) == 0
+  for r in results['results']:
+    r['frames_per_sec'] = 1.0e12
+  base.write_text(json.dumps(results))
+  assert bench.main(args + ['--baseline', str(base)]) == 1
+
+def test_profile(off, grid):
+  cmp = MPGLGrid.colormap()
+  s, m = scene(), model(grid)
+  draw = new_draw(method=1, kind=0)
+  off.render(s, m, draw, grid, cmp)
+  assert draw.stats()['frames'] == 0
+  # list cubes count cells of range and 12 faces of a cube, the last profile_history frames are kept from the oldest
+  draw.profile, draw.profile_history = 1, 3
+  for n in range(1, 6):
+    draw.range = (0, 0, 0, n - 1, N - 1, N - 1)
+    off.render(s, m, draw, grid, cmp)
+  stats = draw.stats()
+  assert stats['frames'] == 5
+  assert [frame['cells'] for frame in stats['history']] == [n * N * N for n in (3, 4, 5)]
+  assert stats['last'] == stats['history'][-1]
+  assert stats['total']['cells'] == 15 * N * N and stats['total']['faces'] == 12 * stats['total']['cells']
+  for frame in stats['history']:
+    assert frame['faces'] == 12 * frame['cells'] and frame['calls'] == frame['cells'] and frame['bytes'] == 0
+    assert frame['total'] >= frame['submit'] > 0
+  # reset clears counters after they are returned
+  assert draw.stats(reset=1) == stats
+  stats = draw.stats()
+  assert stats['frames'] == 0 and stats['history'] == [] and stats['total']['cells'] == 0
+  off.render(s, m, draw, grid, cmp)
+  draw.profile = 0
+  off.render(s, m, draw, grid, cmp)
+  assert draw.stats()['frames'] == 1 and len(draw.stats()['history']) == 1
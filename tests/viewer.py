@@ -18,12 +18,14 @@ class GLWidget(QtOpenGL.QGLWidget):
     self.colorMode = [0, 0]
     self.grid = None
     self.draw = MPGLGrid.draw()
+    self.draw.brick = 32
     self.scene = MPGLGrid.scene()
     self.model = None
     self.cmp = MPGLGrid.colormap()
     self.axis_disp = True
     self.cmp_disp = True
     self.step_disp = True
+    self.setMouseTracking(True)
 
   def minimumSizeHint(self):
     return QtCore.QSize(320, 240)
@@ -40,7 +42,8 @@ class GLWidget(QtOpenGL.QGLWidget):
     if self.grid:
       GL.glPushMatrix()
       self.model.transform()
-      self.draw.draw(self.grid, self.cmp)
+      if self.draw.draw(self.grid, self.cmp, self.model):
+        QtCore.QTimer.singleShot(0, self.updateGL)
       if self.axis_disp:
         GL.glTranslatef(-2.0, -2.0, -2.0)
         self.draw.draw_axis(self.grid.size)
@@ -76,6 +79,8 @@ class GLWidget(QtOpenGL.QGLWidget):
   def mouseReleaseEvent(self, event):
     if self.model:
       self.model.button(event.x(), event.y(), 0)
+      if self.draw.lod > 0:
+        self.updateGL()
 
   def mouseMoveEvent(self, event):
     if self.model:
@@ -86,6 +91,13 @@ class GLWidget(QtOpenGL.QGLWidget):
           ctrl = 0
         if self.model.motion(self.scene, event.x(), event.y(), ctrl):
           self.updateGL()
+      elif self.grid:
+        pick = self.draw.pick(self.grid, self.model, self.scene, event.x(), event.y())
+        if pick:
+          QtWidgets.QToolTip.showText(event.globalPos(), '(%d, %d, %d) type %d val %g' %
+            (pick['index'] + (pick['type'], pick['val'])), self)
+        else:
+          QtWidgets.QToolTip.hideText()
 
   def cmpRange(self):
     if self.grid:
@@ -192,6 +204,7 @@ class FillDialog(QtWidgets.QDialog):
     x1 = self.spinx1.value()
     y1 = self.spiny1.value()
     z1 = self.spinz1.value()
+    self.box = ((x0, y0, z0), (x1, y1, z1))
     if self.method == 'Fill':
       if self.item == 'Type':
         self.grid.fill_type(self.spin.value(), (x0, y0, z0), (x1, y1, z1))
@@ -916,8 +929,24 @@ class DrawDialog(QtWidgets.QDialog):
     self.combo = QtWidgets.QComboBox()
     self.combo.addItem("Quads")
     self.combo.addItem("Cubes")
+    self.combo.addItem("Volume")
+    self.combo.addItem("Isosurface")
+    self.combo.addItem("Slice")
+    self.combo.addItem("Glyph")
     self.combo.setCurrentIndex(glwidget.draw.method) 
     hbox.addWidget(self.combo)
+    hbox2 = QtWidgets.QHBoxLayout()
+    vbox.addLayout(hbox2)
+    label2 = QtWidgets.QLabel()
+    label2.setText("Slice (x, y, z)")
+    hbox2.addWidget(label2)
+    self.spins = []
+    for i in range(3):
+      spin = QtWidgets.QSpinBox()
+      spin.setRange(-1, glwidget.grid.size[i] - 1)
+      spin.setValue(glwidget.draw.slice[i])
+      hbox2.addWidget(spin)
+      self.spins.append(spin)
     self.table = QtWidgets.QTableWidget(glwidget.grid.ntype, 2)
     self.SetTable()
     vbox.addWidget(self.table)
@@ -951,6 +980,7 @@ class DrawDialog(QtWidgets.QDialog):
 
   def Accept(self):
     self.glwidget.draw.method = self.combo.currentIndex()
+    self.glwidget.draw.slice = tuple(spin.value() for spin in self.spins)
     for row in range(self.table.rowCount()):
       item = self.table.item(row, 1)
       if item.checkState() == QtCore.Qt.Checked:
@@ -1148,6 +1178,7 @@ class MainWindow(QtWidgets.QMainWindow):
       dlg = FillDialog(self, self.glwidget.grid, 'Fill', self.sender().text())
       ok = dlg.exec_()
       if ok:
+        self.glwidget.draw.touch(*dlg.box)
         self.glwidget.cmpRange()
         self.glwidget.updateGL()
 
@@ -1156,6 +1187,7 @@ class MainWindow(QtWidgets.QMainWindow):
       dlg = FillDialog(self, self.glwidget.grid, 'Ellipsoid', self.sender().text())
       ok = dlg.exec_()
       if ok:
+        self.glwidget.draw.touch(*dlg.box)
         self.glwidget.cmpRange()
         self.glwidget.updateGL()      
 
@@ -1164,6 +1196,7 @@ class MainWindow(QtWidgets.QMainWindow):
       dlg = FillDialog(self, self.glwidget.grid, 'Cylinder', self.sender().text())
       ok = dlg.exec_()
       if ok:
+        self.glwidget.draw.touch(*dlg.box)
         self.glwidget.cmpRange()
         self.glwidget.updateGL()
 